@@ -1,23 +1,42 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, request, jsonify, send_from_directory, Response, abort
+from werkzeug.utils import safe_join
 from flask_cors import CORS
 from pymongo import MongoClient
 import os
 import logging
 from dotenv import load_dotenv
+from lazy import LazyClient, STARTUP, warm_in_background
 
 # === Import Blueprints ===
-from chatbot import chatbot_bp
-from auth import auth_bp
+with STARTUP.step("import_chatbot"):
+    from chatbot import chatbot_bp, warm_up
+    from chatbot import KB, RESPONSE_CACHE, LLM, PROMPT_CACHE_STATS
+with STARTUP.step("import_auth"):
+    from auth import auth_bp
+from db import pool_stats
+from metrics import render_prometheus
+from static_assets import StaticAssets, STATIC_PRECOMPRESS, cache_control_for
+from llm_resilience import LLM_INSTANCES
 
 # === Load environment variables from .env ===
 load_dotenv()
 
 # === Initialize Flask App ===
-app = Flask(__name__, static_folder="frontend/build", static_url_path="")
+# The React build is served by the routes at the bottom (no built-in static route,
+# which would shadow the SPA catch-all)
+app = Flask(__name__, static_folder=None)
+STATIC_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "frontend", "build")
+
+# === React build: read and precompressed once (shared copy-on-write with gunicorn --preload) ===
+STATIC = StaticAssets(STATIC_ROOT)
+if STATIC_PRECOMPRESS:
+    with STARTUP.step("static_assets"):
+        STATIC.load()
 
 # === Enable CORS (Frontend origin from Azure Static Web App) ===
+FRONTEND_ORIGIN = os.getenv("FRONTEND_ORIGIN", "https://yellow-hill-0dae7d700.6.azurestaticapps.net")
 CORS(app, resources={r"/*": {
-    "origins": [os.getenv("FRONTEND_ORIGIN", "https://yellow-hill-0dae7d700.6.azurestaticapps.net")]
+    "origins": [FRONTEND_ORIGIN]
 }}, supports_credentials=True)
 
 # === MongoDB URI from Environment Variable ===
@@ -26,15 +45,30 @@ if not mongo_uri:
     raise RuntimeError("❌ MONGO_URI environment variable is missing. Set it in Azure App Service → Configuration.")
 
 # === MongoDB Setup (local or Azure CosmosDB) ===
-try:
-    client = MongoClient(mongo_uri)
-    client.admin.command("ping")     # Test connection
-    db = client.get_database("sanathana_chatbot_v1")
-    app.mongo_chatbot = db
-    app.logger.info("✅ Connected to MongoDB: sanathana_chatbot_v1")
-except Exception as e:
-    print(f"❌ MongoDB connection failed: {e}")
-    app.mongo_chatbot = None
+# The client is created on first use in each worker (MongoClient is not fork-safe);
+# the connectivity check runs in the background warm-up instead of blocking import.
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+
+def _connect_mongo():
+    client = MongoClient(mongo_uri, serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS)
+    return client.get_database("sanathana_chatbot_v1")
+
+app.mongo_chatbot = LazyClient("MongoDB", _connect_mongo)
+
+def ping_mongo():
+    try:
+        app.mongo_chatbot.client.admin.command("ping")     # Test connection
+        app.logger.info("✅ Connected to MongoDB: sanathana_chatbot_v1")
+    except Exception as e:
+        print(f"❌ MongoDB connection failed: {e}")
+
+# === Warm clients and start background watchers ===
+# Called from gunicorn.conf.py's post_fork hook or the __main__ block below, never on
+# import: importing must stay side-effect free for the master before fork and for
+# processes that re-import this module (multiprocessing spawn children).
+def start_warm_up():
+    warm_in_background("mongo-ping", [("MongoDB ping", ping_mongo)])
+    warm_up(app.mongo_chatbot, app)
 
 # === Register Blueprints ===
 app.register_blueprint(chatbot_bp, url_prefix="/chatbot")
@@ -43,12 +77,69 @@ app.register_blueprint(auth_bp, url_prefix="/auth")
 # === Health Check Route ===
 @app.route('/health', methods=["GET"])
 def health_check():
-    return jsonify({"status": "healthy"}), 200
+    return jsonify({"status": "healthy", "kb_version": KB.current.version}), 200
+
+# === Prometheus metrics (per worker process) ===
+@app.route('/metrics', methods=["GET"])
+def metrics():
+    pool = pool_stats()
+    breaker_open = 1 if LLM.breaker.state == "open" else 0
+    gauges = {
+        "mysql_pool_idle_connections": ("Idle pooled MySQL connections", pool.get("idle", 0)),
+        "mysql_pool_in_use_connections": ("Checked-out MySQL connections", pool.get("in_use", 0)),
+        "response_cache_entries": ("Entries in the in-process answer cache", len(RESPONSE_CACHE)),
+        "deepseek_circuit_open": ("1 while the DeepSeek circuit breaker is open", breaker_open),
+        "deepseek_prompt_cache_hit_tokens": ("Prompt tokens served from DeepSeek's context cache", PROMPT_CACHE_STATS.hit_tokens),
+        "deepseek_prompt_cache_miss_tokens": ("Prompt tokens not found in DeepSeek's context cache", PROMPT_CACHE_STATS.miss_tokens),
+        "app_startup_seconds": ("Time to import the app in this process", STARTUP.steps.get("app_import", 0)),
+        "static_assets_bytes": ("In-memory React build incl. compressed variants", STATIC.nbytes()),
+    }
+    # One set per DeepSeek wrapper in this worker (deepseek, and deepseek_async under asgi.py)
+    for name, llm in LLM_INSTANCES.items():
+        gauges.update({
+            f"{name}_attempts": ("DeepSeek attempts since start", llm.attempts),
+            f"{name}_failures": ("Failed DeepSeek attempts since start", llm.failures),
+            f"{name}_hedged": ("Hedge requests fired since start", llm.hedged),
+            f"{name}_hedges_skipped": ("Hedges not fired because LLM_MAX_HEDGES were in flight", llm.hedges_skipped),
+            f"{name}_deadline_exceeded": ("Requests that ran out of their DeepSeek budget", llm.deadline_exceeded),
+        })
+    return Response(render_prometheus(gauges), mimetype="text/plain; version=0.0.4")
 
 # === Serve Static Files (React build) ===
+# Hashed files are cached by browsers for a year; index.html and other
+# unhashed files are revalidated with their ETag (304 when unchanged)
+def asset_response(asset):
+    body, encoding, etag = asset.select(request.headers.get("Accept-Encoding"))
+    if request.if_none_match.contains(etag):
+        STATIC.not_modified += 1
+        resp = app.response_class(status=304)
+    else:
+        STATIC.served += 1
+        resp = app.response_class(body, content_type=asset.mimetype)
+        if encoding:
+            resp.headers["Content-Encoding"] = encoding
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = asset.cache_control
+    resp.headers["Vary"] = "Accept-Encoding"
+    return resp
+
+def build_file_response(path):
+    """
+    Response for a file of the build, or None if there is no such file.
+    """
+    asset = STATIC.get(path) if STATIC_PRECOMPRESS else None
+    if asset is not None:
+        return asset_response(asset)
+    full_path = safe_join(STATIC_ROOT, path)
+    if full_path is None or not os.path.isfile(full_path):
+        return None
+    resp = send_from_directory(STATIC_ROOT, path)
+    resp.headers["Cache-Control"] = cache_control_for(path)
+    return resp
+
 @app.route('/static/<path:filename>')
 def serve_static(filename):
-    return send_from_directory(os.path.join(app.static_folder, "static"), filename)
+    return build_file_response(f"static/{filename}") or abort(404)
 
 # === Catch-all for SPA routes (React frontend) ===
 @app.route("/", defaults={"path": ""})
@@ -57,9 +148,14 @@ def serve_react_app(path):
     # Prevent intercepting API routes
     if path.startswith(("auth", "chatbot", "api")):
         return jsonify({"error": "API route not found"}), 404
-    return send_from_directory(app.static_folder, "index.html")
+    # Top-level build files (favicon.ico, manifest.json, ...), else the SPA shell
+    return (path and build_file_response(path)) or build_file_response("index.html") or abort(404)
+
+STARTUP.steps["app_import"] = STARTUP.total()
+STARTUP.log("App import")
 
 # === Run Server ===
 if __name__ == "__main__":
+    start_warm_up()
     port = int(os.environ.get("PORT", 5000))
     app.run(host="0.0.0.0", port=port, debug=False)
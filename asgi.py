@@ -0,0 +1,243 @@
+import os
+import json
+import time
+import asyncio
+import logging
+from a2wsgi import WSGIMiddleware
+from app import app as flask_app, FRONTEND_ORIGIN, STATIC
+from chatbot_async import ask_deepseek_async, stream_deepseek_async, answer_batch_async
+from metrics import observe_request
+from chatbot import REQUEST_LOG, admit_chat_request, admit_batch_request, parse_batch_request, CHAT_BATCH_MAX_MESSAGES
+from rate_limit import ADMISSION, retry_after_header
+from static_assets import STATIC_PRECOMPRESS, etag_matches
+
+# === ASGI entrypoint ===
+# The chat endpoints run natively on the event loop (one worker holds many in-flight
+# DeepSeek calls); every other route is served by the Flask app on a bounded thread
+# pool, so a slow login or sections request never holds up the others.
+#   gunicorn asgi:application -k uvicorn.workers.UvicornWorker
+ASGI_WSGI_THREADS = int(os.getenv("ASGI_WSGI_THREADS", "16"))
+
+
+def wsgi_adapter(wsgi_app, threads=ASGI_WSGI_THREADS):
+    # asgiref's WsgiToAsgi runs every sync request on one shared thread; a2wsgi uses a pool
+    return WSGIMiddleware(wsgi_app, workers=threads)
+
+
+wsgi_fallback = wsgi_adapter(flask_app)
+
+
+def cors_headers(scope):
+    # Same policy as flask_cors in app.py (preflight OPTIONS still goes through Flask)
+    origin = dict(scope.get("headers") or []).get(b"origin", b"").decode("latin-1")
+    if origin != FRONTEND_ORIGIN:
+        return []
+    return [
+        (b"access-control-allow-origin", origin.encode("latin-1")),
+        (b"access-control-allow-credentials", b"true"),
+        (b"vary", b"Origin"),
+    ]
+
+
+async def read_json(receive):
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            break
+    try:
+        return json.loads(body or b"{}")
+    except ValueError:
+        return None
+
+
+async def send_json(scope, send, payload, status=200, headers=None):
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+        + (headers or []) + cors_headers(scope),
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+def parse_chat_request(data):
+    if not isinstance(data, dict):
+        return None, None
+    user_input = str(data.get("message", "")).strip()
+    if not user_input or len(user_input) > 500:
+        return None, None
+    return user_input, data.get("emp_id")
+
+
+# === Admission control (same buckets as the Flask endpoints) ===
+async def admit(scope, user_input, emp_id, admit_fn=admit_chat_request):
+    headers = {k.decode("latin-1").title(): v.decode("latin-1") for k, v in scope.get("headers") or []}
+    remote_addr = (scope.get("client") or [None])[0]
+    if ADMISSION.shared is None:
+        return admit_fn(user_input, emp_id, headers, remote_addr)
+
+    # The shared counter is a blocking Mongo round trip
+    def _admit():
+        with flask_app.app_context():
+            return admit_fn(user_input, emp_id, headers, remote_addr)
+    return await asyncio.to_thread(_admit)
+
+
+async def send_rate_limited(scope, send, wait):
+    await send_json(scope, send, {"error": "Too many requests, please retry later"}, 429,
+                    headers=[(b"retry-after", retry_after_header(wait).encode())])
+
+
+# === /chatbot/chat-response (async) ===
+async def chat_response(scope, receive, send):
+    try:
+        user_input, emp_id = parse_chat_request(await read_json(receive))
+        if not user_input:
+            await send_json(scope, send, {"error": "Invalid input"}, 400)
+            return
+        wait = await admit(scope, user_input, emp_id)
+        if wait:
+            await send_rate_limited(scope, send, wait)
+            return
+        start_time = time.time()
+        meta = {}
+        with flask_app.app_context():
+            reply = await ask_deepseek_async(user_input, emp_id, meta)
+        observe_request("chat-response", meta.get("source"), time.time() - start_time)
+        REQUEST_LOG.record("chat-response", user_input, emp_id, meta, time.time() - start_time)
+        logging.info(f"Total response time: {time.time() - start_time:.2f}s | Chars: {len(reply)} | Meta: {meta}")
+        await send_json(scope, send, {"response": reply, "meta": meta})
+    except Exception as e:
+        logging.error(f"Endpoint Error: {str(e)}")
+        await send_json(scope, send, {"response": "Internal server error"}, 500)
+
+
+# === /chatbot/chat-stream (async server-sent events) ===
+def sse_event(payload, event=None):
+    data = json.dumps(payload, ensure_ascii=False)
+    return ((f"event: {event}\n" if event else "") + f"data: {data}\n\n").encode("utf-8")
+
+
+async def chat_stream(scope, receive, send):
+    user_input, emp_id = parse_chat_request(await read_json(receive))
+    if not user_input:
+        await send_json(scope, send, {"error": "Invalid input"}, 400)
+        return
+    wait = await admit(scope, user_input, emp_id)
+    if wait:
+        await send_rate_limited(scope, send, wait)
+        return
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [
+            (b"content-type", b"text/event-stream"),
+            (b"cache-control", b"no-cache"),
+            (b"x-accel-buffering", b"no"),
+        ] + cors_headers(scope),
+    })
+    start_time = time.time()
+    parts = []
+    meta = {}
+    try:
+        with flask_app.app_context():
+            async for delta in stream_deepseek_async(user_input, emp_id, meta):
+                parts.append(delta)
+                await send({"type": "http.response.body", "body": sse_event({"delta": delta}), "more_body": True})
+        final = sse_event({"response": "".join(parts).strip(), "meta": meta}, event="done")
+    except Exception as e:
+        logging.error(f"Stream Endpoint Error: {str(e)}")
+        final = sse_event({"error": "Internal server error"}, event="error")
+    await send({"type": "http.response.body", "body": final})
+    observe_request("chat-stream", meta.get("source"), time.time() - start_time)
+    REQUEST_LOG.record("chat-stream", user_input, emp_id, meta, time.time() - start_time)
+    logging.info(f"Total stream time: {time.time() - start_time:.2f}s | Chars: {sum(len(p) for p in parts)}")
+
+
+# === /chatbot/chat-batch (async) ===
+async def chat_batch(scope, receive, send):
+    try:
+        questions, emp_id = parse_batch_request(await read_json(receive))
+        if questions is None:
+            await send_json(scope, send, {"error": f"messages must be a list of 1-{CHAT_BATCH_MAX_MESSAGES} "
+                                                  "non-empty strings (max 500 chars each)"}, 400)
+            return
+        wait = await admit(scope, questions, emp_id, admit_fn=admit_batch_request)
+        if wait:
+            await send_rate_limited(scope, send, wait)
+            return
+        start_time = time.time()
+        with flask_app.app_context():
+            results, llm_calls = await answer_batch_async(questions, emp_id)
+        response_time = time.time() - start_time
+        for question, result in zip(questions, results):
+            observe_request("chat-batch", result["meta"].get("source"), response_time)
+            REQUEST_LOG.record("chat-batch", question, emp_id, result["meta"], response_time)
+        logging.info(f"Total batch time: {response_time:.2f}s | Questions: {len(questions)} | DeepSeek calls: {llm_calls}")
+        await send_json(scope, send, {
+            "responses": [dict(result, message=q) for q, result in zip(questions, results)],
+            "meta": {"count": len(questions), "llm_calls": llm_calls, "response_time": round(response_time, 3)},
+        })
+    except Exception as e:
+        logging.error(f"Batch Endpoint Error: {str(e)}")
+        await send_json(scope, send, {"error": "Internal server error"}, 500)
+
+
+# === React build files straight from memory (no thread hop through the WSGI pool) ===
+async def static_asset(scope, send):
+    """
+    Serves exact build files only; SPA deep links and every other route fall
+    through to Flask. Returns True when the request was handled.
+    """
+    path = scope["path"].lstrip("/") or "index.html"
+    asset = STATIC.get(path)
+    if asset is None:
+        return False
+    request_headers = dict(scope.get("headers") or [])
+    body, encoding, etag = asset.select(request_headers.get(b"accept-encoding", b"").decode("latin-1"))
+    headers = [
+        (b"etag", f'"{etag}"'.encode()),
+        (b"cache-control", asset.cache_control.encode()),
+        (b"vary", b"Accept-Encoding"),
+    ] + cors_headers(scope)
+    if etag_matches(request_headers.get(b"if-none-match", b"").decode("latin-1"), etag):
+        STATIC.not_modified += 1
+        await send({"type": "http.response.start", "status": 304, "headers": headers})
+        await send({"type": "http.response.body", "body": b""})
+        return True
+    STATIC.served += 1
+    headers += [(b"content-type", asset.mimetype.encode()), (b"content-length", str(len(body)).encode())]
+    if encoding:
+        headers.append((b"content-encoding", encoding.encode()))
+    await send({"type": "http.response.start", "status": 200, "headers": headers})
+    await send({"type": "http.response.body", "body": b"" if scope["method"] == "HEAD" else body})
+    return True
+
+
+ASYNC_ROUTES = {
+    ("POST", "/chatbot/chat-response"): chat_response,
+    ("POST", "/chatbot/chat-stream"): chat_stream,
+    ("POST", "/chatbot/chat-batch"): chat_batch,
+}
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "http":
+        handler = ASYNC_ROUTES.get((scope["method"], scope["path"]))
+        if handler is not None:
+            await handler(scope, receive, send)
+            return
+        if STATIC_PRECOMPRESS and scope["method"] in ("GET", "HEAD") and await static_asset(scope, send):
+            return
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+    await wsgi_fallback(scope, receive, send)
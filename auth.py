@@ -1,27 +1,53 @@
 from flask import Blueprint, request, jsonify
 import mysql.connector
 import logging
-import bcrypt
-from db import get_db_connection
+from db import db_connection, pool_stats
+from password_hasher import HASHER, HasherBusy
+from metrics import backend_timer
+from rate_limit import ADMISSION, client_ip, rate_limited_response
+from ops_auth import ops_only
 
 auth_bp = Blueprint("auth", __name__)
 logging.basicConfig(level=logging.INFO)
 
-# 🔁 Helper: fetch one row from DB
-def fetch_one(query, params):
-    conn = get_db_connection()
-    if not conn:
-        logging.error("❌ Could not establish database connection.")
-        raise Exception("Database connection failed.")
-
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute(query, params)
-    result = cursor.fetchone()
-    cursor.close()
-    conn.close()
+# 🔁 Helper: fetch one row from DB (reuses `conn` if given, else checks one out of the pool)
+def fetch_one(query, params, conn=None):
+    if conn is None:
+        with db_connection() as pooled:
+            return fetch_one(query, params, pooled)
+
+    with backend_timer("mysql", "fetch_one"):
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(query, params)
+        result = cursor.fetchone()
+        cursor.close()
     return result
 
 
+# 🚦 Helper: fast rejection when the hashing pool is saturated
+def busy_response():
+    resp = jsonify({"error": "Server busy, please retry shortly"})
+    resp.headers["Retry-After"] = "1"
+    return resp, 503
+
+
+# 🔐 Helper: upgrade a hash stored with an outdated bcrypt cost (best effort)
+def rehash_password(user_id, password):
+    try:
+        with backend_timer("bcrypt", "hash"):
+            new_hash = HASHER.hash_password(password)
+        with db_connection() as conn, backend_timer("mysql", "update_password"):
+            cursor = conn.cursor()
+            cursor.execute("UPDATE users SET password = %s WHERE user_id = %s", (new_hash, user_id))
+            conn.commit()
+            cursor.close()
+        logging.info(f"🔐 Rehashed password for {user_id} at cost {HASHER.rounds}")
+    except HasherBusy:
+        logging.info(f"⏭️ Skipped rehash for {user_id}: hashing pool busy")
+    except Exception as e:
+        logging.warning(f"⚠️ Rehash failed for {user_id}: {e}")
+
+
 # ✅ Signup
 @auth_bp.route("/signup", methods=["POST"])
 def signup():
@@ -40,32 +66,43 @@ def signup():
             logging.warning("⚠️ user_id or password is empty after stripping.")
             return jsonify({"error": "user_id or password is empty"}), 400
 
-        logging.info(f"🔍 Checking EMP ID existence: {user_id}")
-        emp_check = fetch_one("SELECT emp_id FROM employee_details WHERE emp_id = %s", (user_id,))
-        if not emp_check:
-            logging.warning(f"❌ EMP ID not found: {user_id}")
-            return jsonify({"error": "Invalid EMP ID"}), 403
-
-        logging.info(f"🔍 Checking if user already exists: {user_id}")
-        user_check = fetch_one("SELECT user_id FROM users WHERE user_id = %s", (user_id,))
-        if user_check:
-            logging.warning(f"⚠️ User ID already exists: {user_id}")
-            return jsonify({"error": "User ID already exists"}), 409
-
+        wait = ADMISSION.admit_auth(user_id, client_ip(request.headers, request.remote_addr))
+        if wait:
+            logging.warning(f"🚦 Signup rate limited for {user_id}")
+            return rate_limited_response(wait)
+
+        # Both checks share one pooled connection
+        with db_connection() as conn:
+            logging.info(f"🔍 Checking EMP ID existence: {user_id}")
+            emp_check = fetch_one("SELECT emp_id FROM employee_details WHERE emp_id = %s", (user_id,), conn)
+            if not emp_check:
+                logging.warning(f"❌ EMP ID not found: {user_id}")
+                return jsonify({"error": "Invalid EMP ID"}), 403
+
+            logging.info(f"🔍 Checking if user already exists: {user_id}")
+            user_check = fetch_one("SELECT user_id FROM users WHERE user_id = %s", (user_id,), conn)
+            if user_check:
+                logging.warning(f"⚠️ User ID already exists: {user_id}")
+                return jsonify({"error": "User ID already exists"}), 409
+
+        # Hash outside the checkout so the connection isn't held during bcrypt
         logging.info(f"🔐 Hashing password for: {user_id}")
-        hashed = bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
+        with backend_timer("bcrypt", "hash"):
+            hashed = HASHER.hash_password(password)
 
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        logging.info(f"📝 Inserting new user: {user_id}")
-        cursor.execute("INSERT INTO users (user_id, password) VALUES (%s, %s)", (user_id, hashed))
-        conn.commit()
-        cursor.close()
-        conn.close()
+        with db_connection() as conn, backend_timer("mysql", "insert_user"):
+            cursor = conn.cursor()
+            logging.info(f"📝 Inserting new user: {user_id}")
+            cursor.execute("INSERT INTO users (user_id, password) VALUES (%s, %s)", (user_id, hashed))
+            conn.commit()
+            cursor.close()
 
         logging.info(f"✅ Signup successful for user: {user_id}")
         return jsonify({"message": "Signup successful!"}), 201
 
+    except HasherBusy as e:
+        logging.warning(f"⚠️ Signup rejected, hashing pool saturated: {e}")
+        return busy_response()
     except Exception as e:
         logging.exception("❌ Exception in signup:")
         return jsonify({"error": "Internal server error"}), 500
@@ -93,13 +130,35 @@ def login():
         if not user_id or not password:
             return jsonify({"error": "Missing user_id or password"}), 400
 
+        wait = ADMISSION.admit_auth(user_id, client_ip(request.headers, request.remote_addr))
+        if wait:
+            logging.warning(f"🚦 Login rate limited for {user_id}")
+            return rate_limited_response(wait)
+
         user = fetch_one("SELECT * FROM users WHERE user_id = %s", (user_id,))
-        if not user or not bcrypt.checkpw(password.encode(), user["password"].encode()):
+        if not user:
             return jsonify({"error": "Invalid credentials"}), 401
+        with backend_timer("bcrypt", "verify"):
+            valid = HASHER.verify_password(password, user["password"])
+        if not valid:
+            return jsonify({"error": "Invalid credentials"}), 401
+
+        if HASHER.needs_rehash(user["password"]):
+            rehash_password(user_id, password)
 
         logging.info(f"✅ Login successful for user: {user_id}")
         return jsonify({"message": "Login successful!"}), 200
 
+    except HasherBusy as e:
+        logging.warning(f"⚠️ Login rejected, hashing pool saturated: {e}")
+        return busy_response()
     except Exception as e:
         logging.exception("❌ Login error:")
         return jsonify({"error": "Internal server error"}), 500
+
+
+# 📊 Pool metrics (checkouts, wait time, health-check failures); ops token required
+@auth_bp.route("/db-stats", methods=["GET"])
+@ops_only
+def db_stats():
+    return jsonify({"mysql_pool": pool_stats(), "password_hasher": HASHER.stats(), "rate_limit": ADMISSION.stats()}), 200
@@ -0,0 +1,94 @@
+"""
+Imports the Flask app with every external service replaced by a local fake:
+DeepSeek -> bench.stub_llm, Google Sheets / MongoDB / MySQL -> bench.fakes.
+Must run before anything imports app, chatbot or auth.
+"""
+import os
+import sys
+import json
+import base64
+import tempfile
+import bcrypt
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from bench import fakes
+from bench.stub_llm import StubConfig, start_stub
+from employee_directory import parse_employees
+
+
+class BenchEnv:
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+def boot(llm_url=None, llm_latency=0.8, llm_jitter=0.3, sheets_latency=0.3, mongo_latency=0.002,
+         mysql_latency=0.001, users=20, password="bench-pass", warm_up=True):
+    stub_server = stub_config = None
+    if llm_url is None:
+        stub_config = StubConfig(latency=llm_latency, jitter=llm_jitter)
+        stub_server, llm_url = start_stub(config=stub_config)
+
+    with open(os.path.join(ROOT, "kb_content.txt"), encoding="utf-8") as f:
+        employees = parse_employees(f.read())
+    emp_ids = [e.emp_id for e in employees]
+
+    os.environ["DEEPSEEK_BASE_URL"] = llm_url
+    os.environ.setdefault("DEEPSEEK_API_KEY", "bench")
+    os.environ["MONGO_URI"] = "mongodb://bench.invalid"
+    os.environ["GOOGLE_CREDS_BASE64"] = base64.b64encode(json.dumps({"type": "bench"}).encode()).decode()
+    os.environ["LEAVE_SPREADSHEET_ID"] = "bench-spreadsheet"
+    # Measure raw capacity; set RATE_LIMIT_ENABLED=1 to benchmark admission control
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+    os.environ.setdefault("REQUEST_LOG_PATH", os.path.join(tempfile.gettempdir(), "bench-requests.jsonl"))
+
+    # Google Sheets
+    import gspread
+    from oauth2client.service_account import ServiceAccountCredentials
+    sheets = fakes.leave_sheets(emp_ids)
+    ServiceAccountCredentials.from_json_keyfile_dict = classmethod(lambda cls, data, scopes: None)
+    gspread.authorize = lambda creds: fakes.FakeGspreadClient(sheets, latency=sheets_latency)
+
+    # MongoDB (app.py does `from pymongo import MongoClient` at import time)
+    import pymongo
+    fakes.FakeMongoClient.latency = mongo_latency
+    pymongo.MongoClient = fakes.FakeMongoClient
+    sections = fakes.FakeMongoClient().get_database("sanathana_chatbot_v1")["sections"]
+    if not sections.count_documents({}):
+        sections.insert_many(fakes.sample_sections())
+
+    from app import app
+    import db
+
+    # MySQL -> SQLite, with bcrypt users seeded at the configured cost
+    from password_hasher import BCRYPT_ROUNDS
+    db_path = os.path.join(tempfile.mkdtemp(prefix="bench-mysql-"), "bench.sqlite3")
+    fakes.create_sqlite_db(db_path, emp_ids)
+    db.POOL.connect = lambda: fakes.SQLiteConnection(db_path, latency=mysql_latency)
+    hashed = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode("utf-8")
+    seeded = emp_ids[:users]
+    with db.db_connection() as conn:
+        cursor = conn.cursor()
+        for emp_id in seeded:
+            cursor.execute("INSERT OR REPLACE INTO users (user_id, password) VALUES (%s, %s)", (emp_id, hashed))
+        conn.commit()
+        cursor.close()
+
+    if warm_up:
+        from app import start_warm_up
+        start_warm_up()
+
+    return BenchEnv(
+        app=app,
+        llm_url=llm_url,
+        stub_server=stub_server,
+        stub_config=stub_config,
+        employees=employees,
+        emp_ids=emp_ids,
+        users=seeded,
+        password=password,
+        sections=fakes.sample_sections(),
+        db_path=db_path,
+    )
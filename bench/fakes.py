@@ -0,0 +1,286 @@
+"""
+In-memory stand-ins for Google Sheets (gspread), MongoDB (pymongo) and
+Azure MySQL (mysql.connector), with optional per-call latency so the
+benchmark sees realistic round trips without any network access.
+"""
+import copy
+import time
+import sqlite3
+import calendar
+import threading
+from datetime import datetime
+import gspread
+from pymongo.errors import DuplicateKeyError, OperationFailure
+
+
+# === gspread ===
+class FakeWorksheet:
+    def __init__(self, title, records, latency):
+        self.title = title
+        self._records = records
+        self._latency = latency
+
+    def get_all_records(self):
+        time.sleep(self._latency)
+        return [dict(r) for r in self._records]
+
+
+class FakeSpreadsheet:
+    def __init__(self, sheets, latency):
+        self._sheets = sheets       # title -> records
+        self._latency = latency
+        self.lastUpdateTime = "2024-01-01T00:00:00.000Z"
+
+    def worksheet(self, title):
+        time.sleep(self._latency)
+        if title not in self._sheets:
+            raise gspread.exceptions.WorksheetNotFound(title)
+        return FakeWorksheet(title, self._sheets[title], self._latency)
+
+    def get_lastUpdateTime(self):
+        time.sleep(self._latency)
+        return self.lastUpdateTime
+
+
+class FakeGspreadClient:
+    def __init__(self, sheets, latency=0.3):
+        self.spreadsheet = FakeSpreadsheet(sheets, latency)
+
+    def open_by_key(self, key):
+        return self.spreadsheet
+
+
+def leave_sheets(emp_ids, months=3, today=None):
+    """
+    "<Month> <Year>" worksheets for the current and previous months, one row per employee.
+    """
+    today = today or datetime.now()
+    sheets = {}
+    year, month = today.year, today.month
+    for _ in range(months):
+        rows = []
+        for i, emp_id in enumerate(emp_ids):
+            rows.append({
+                "EMP ID": emp_id,
+                "EMP NAME": f"Employee {emp_id}",
+                "PRESENT COUNT": 20 - i % 3,
+                "ABSENT COUNT": i % 3,
+                "CASUAL LEAVE COUNT": i % 2,
+                "CASUAL LEAVE BALANCE": 10 - i % 2,
+                "SICK LEAVE COUNT": i % 4 // 3,
+                "SICK LEAVE BALANCE": 8,
+            })
+        sheets[f"{calendar.month_name[month]} {year}"] = rows
+        month, year = (month - 1, year) if month > 1 else (12, year - 1)
+    return sheets
+
+
+# === pymongo ===
+_MONGO_DATA = {}        # db name -> {collection name -> FakeCollection}, shared by every client
+_MONGO_LOCK = threading.Lock()
+
+
+def _matches(doc, query):
+    for field, cond in (query or {}).items():
+        value = doc.get(field)
+        if isinstance(cond, dict):
+            for op, operand in cond.items():
+                if op == "$gt" and not (value is not None and value > operand):
+                    return False
+                if op == "$lt" and not (value is not None and value < operand):
+                    return False
+                if op == "$eq" and value != operand:
+                    return False
+        elif value != cond:
+            return False
+    return True
+
+
+def _project(doc, projection):
+    if not projection:
+        return copy.deepcopy(doc)
+    include = {k for k, v in projection.items() if v and k != "_id"}
+    if include:
+        out = {k: copy.deepcopy(doc[k]) for k in include if k in doc}
+        if projection.get("_id", 1) and "_id" in doc:
+            out["_id"] = doc["_id"]
+        return out
+    return {k: copy.deepcopy(v) for k, v in doc.items() if projection.get(k, 1)}
+
+
+class FakeCollection:
+    def __init__(self, latency):
+        self._docs = {}
+        self._lock = threading.Lock()
+        self._latency = latency
+        self._next_id = 0
+
+    def insert_many(self, docs):
+        with self._lock:
+            for doc in docs:
+                doc = copy.deepcopy(doc)
+                if "_id" not in doc:
+                    self._next_id += 1
+                    doc["_id"] = self._next_id
+                self._docs[doc["_id"]] = doc
+
+    def find(self, query=None, projection=None):
+        time.sleep(self._latency)
+        with self._lock:
+            return [_project(d, projection) for d in self._docs.values() if _matches(d, query)]
+
+    def find_one(self, query=None, projection=None, max_time_ms=None):
+        found = self.find(query, projection)
+        return found[0] if found else None
+
+    def bulk_write(self, ops, ordered=True):
+        time.sleep(self._latency)
+        with self._lock:
+            for op in ops:
+                # pymongo.UpdateOne keeps its arguments in _filter/_doc
+                query, update = op._filter, op._doc
+                target = next((d for d in self._docs.values() if _matches(d, query)), None)
+                if target is None:
+                    target = dict(query)
+                    self._docs[target["_id"]] = target
+                target.update(update.get("$set", {}))
+
+    def find_one_and_update(self, query, update, upsert=False, return_document=False, **kwargs):
+        time.sleep(self._latency)
+        with self._lock:
+            target = next((d for d in self._docs.values() if _matches(d, query)), None)
+            before = copy.deepcopy(target)
+            if target is None:
+                if not upsert:
+                    return None
+                if query.get("_id") in self._docs:
+                    raise DuplicateKeyError(f"E11000 duplicate key: {query['_id']}")
+                target = {k: v for k, v in query.items() if not isinstance(v, dict)}
+                target.update(update.get("$setOnInsert", {}))
+                self._docs[target["_id"]] = target
+            target.update(update.get("$set", {}))
+            for field, amount in update.get("$inc", {}).items():
+                target[field] = target.get(field, 0) + amount
+            return copy.deepcopy(target) if return_document else before
+
+    def create_index(self, *args, **kwargs):
+        return "bench_index"
+
+    def watch(self, *args, **kwargs):
+        # What a standalone mongod answers; the section tree falls back to polling
+        message = "The $changeStream stage is only supported on replica sets"
+        raise OperationFailure(message, code=40573, details={"ok": 0.0, "errmsg": message, "code": 40573,
+                                                             "codeName": "Location40573"})
+
+    def count_documents(self, query):
+        return len(self.find(query))
+
+
+class FakeDatabase:
+    def __init__(self, name, latency, client=None):
+        self.name = name
+        self.client = client
+        self._latency = latency
+        with _MONGO_LOCK:
+            self._collections = _MONGO_DATA.setdefault(name, {})
+
+    def __getitem__(self, name):
+        with _MONGO_LOCK:
+            if name not in self._collections:
+                self._collections[name] = FakeCollection(self._latency)
+            return self._collections[name]
+
+    get_collection = __getitem__
+
+
+class FakeAdmin:
+    def command(self, name, *args, **kwargs):
+        return {"ok": 1.0}
+
+
+class FakeMongoClient:
+    latency = 0.002
+
+    def __init__(self, uri=None, **kwargs):
+        self.admin = FakeAdmin()
+
+    def get_database(self, name):
+        return FakeDatabase(name, self.latency, self)
+
+    __getitem__ = get_database
+
+
+def sample_sections():
+    return [
+        {"section_name": "HR Policies", "questions": [
+            {"question": "How do I apply for leave?", "answer": "Apply through the HRMS portal under Leave > Apply."},
+            {"question": "What is the notice period?", "answer": "The notice period is 60 days for confirmed employees."},
+        ], "sub_sections": [
+            {"sub_section_name": "Payroll", "questions": [
+                {"question": "When is salary credited?", "answer": "Salary is credited on the last working day of the month."},
+                {"question": "How do I download my payslip?", "answer": "Payslips are available in the HRMS portal under Payroll."},
+            ]},
+        ]},
+        {"section_name": "IT Support", "questions": [
+            {"question": "How do I reset my password?", "answer": "Use the self-service reset link on the login page."},
+            {"question": "Who do I contact for laptop issues?", "answer": "Raise a ticket with the IT helpdesk."},
+        ]},
+        {"section_name": "Office", "questions": [
+            {"question": "What are the office timings?", "answer": "Office hours are 9:30 AM to 6:30 PM, Monday to Friday."},
+        ]},
+    ]
+
+
+# === mysql.connector (SQLite stand-in) ===
+class SQLiteCursor:
+    def __init__(self, cursor, dictionary):
+        self._cursor = cursor
+        self._dictionary = dictionary
+
+    def execute(self, query, params=()):
+        self._cursor.execute(query.replace("%s", "?"), params)
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is None or not self._dictionary:
+            return row
+        return {col[0]: value for col, value in zip(self._cursor.description, row)}
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    """
+    The subset of a mysql.connector connection that auth.py and db.py use.
+    """
+
+    def __init__(self, path, latency=0.0):
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._latency = latency
+
+    def cursor(self, dictionary=False):
+        time.sleep(self._latency)
+        return SQLiteCursor(self._conn.cursor(), dictionary)
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def is_connected(self):
+        return True
+
+    def close(self):
+        self._conn.close()
+
+
+def create_sqlite_db(path, emp_ids):
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("CREATE TABLE IF NOT EXISTS employee_details (emp_id TEXT PRIMARY KEY)")
+    conn.execute("CREATE TABLE IF NOT EXISTS users (user_id TEXT PRIMARY KEY, password TEXT NOT NULL)")
+    conn.executemany("INSERT OR IGNORE INTO employee_details (emp_id) VALUES (?)", [(e,) for e in emp_ids])
+    conn.commit()
+    conn.close()
@@ -0,0 +1,258 @@
+"""
+Replays a mixed workload against the app booted on local fakes and reports
+throughput and p50/p95/p99 latency per workload kind.
+
+    python -m bench.run                                  # in-process (Flask test client)
+    python -m bench.run --target http://127.0.0.1:8000   # a running server (see bench/serve.py)
+    python -m bench.run --requests 2000 --concurrency 32 --mix faq=30,cached=25,leave=15,birthday=10,llm=10,login=5,sections=5
+    python -m bench.run --replay requests.jsonl          # replay captured chat traffic (request_log.py)
+"""
+import json
+import time
+import random
+import argparse
+import threading
+import http.client
+from urllib.parse import urlsplit
+
+DEFAULT_MIX = "faq=30,cached=25,leave=15,birthday=10,llm=10,login=5,sections=5"
+POPULAR_QUESTIONS = ["What is Sanathana?", "who are the founders of sanathana", "When was Sanathana founded?", "company name"]
+LEAVE_QUESTIONS = ["How many leaves do I have?", "Show my attendance", "leave balance for last month"]
+LLM_TOPICS = ["canteen menu", "parking rules", "travel reimbursement", "team outing", "training budget",
+              "dress code", "referral bonus", "remote work", "holiday calendar", "insurance claim"]
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(p / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+# === Workload generation ===
+class Workload:
+    def __init__(self, env, mix, seed=7):
+        self.rng = random.Random(seed)
+        self.kinds, self.weights = zip(*mix.items())
+        self.faq_questions = []
+        for section in env.sections:
+            for q in section.get("questions", []):
+                self.faq_questions.append(q["question"])
+            for sub in section.get("sub_sections", []):
+                for q in sub.get("questions", []):
+                    self.faq_questions.append(q["question"])
+        self.emp_ids = env.emp_ids
+        self.names = [e.name.split()[0] for e in env.employees]
+        self.users = env.users
+        self.password = env.password
+        self._lock = threading.Lock()
+        self._llm_counter = 0
+
+    def _chat(self, kind, message, emp_id=None):
+        payload = {"message": message}
+        if emp_id:
+            payload["emp_id"] = emp_id
+        return kind, "POST", "/chatbot/chat-response", payload
+
+    def next(self):
+        with self._lock:
+            kind = self.rng.choices(self.kinds, self.weights)[0]
+            r = self.rng
+            if kind == "faq":
+                q = r.choice(self.faq_questions)
+                return self._chat(kind, r.choice([q, q.lower().rstrip("?"), "please tell me " + q.lower()]))
+            if kind == "cached":
+                return self._chat(kind, r.choice(POPULAR_QUESTIONS))
+            if kind == "leave":
+                return self._chat(kind, r.choice(LEAVE_QUESTIONS), r.choice(self.emp_ids))
+            if kind == "birthday":
+                if r.random() < 0.5:
+                    return self._chat(kind, f"When is {r.choice(self.names)}'s birthday?")
+                return self._chat(kind, f"Birthdays in {r.choice(['January', 'March', 'July', 'October'])}")
+            if kind == "llm":
+                self._llm_counter += 1
+                # Mostly distinct questions, with some repeats that the caches should absorb
+                topic = r.choice(LLM_TOPICS)
+                suffix = self._llm_counter if r.random() < 0.7 else ""
+                return self._chat(kind, f"Tell me about the {topic} policy {suffix}".strip())
+            if kind == "login":
+                return kind, "POST", "/auth/login", {"user_id": r.choice(self.users), "password": self.password}
+            return kind, "GET", "/chatbot/sections", None
+
+
+class ReplayWorkload:
+    """
+    Replays logged chat requests in order (cycling), labelled by the branch
+    that answered them in production. Logged requests only record whether an
+    emp_id was present, so a seeded employee is substituted.
+    """
+
+    def __init__(self, env, records):
+        self.records = [r for r in records if r.get("ep", "chat-response") in ("chat-response", "chat-stream")]
+        if not self.records:
+            raise SystemExit("No chat requests found in the replay file")
+        self.emp_ids = env.emp_ids
+        self._lock = threading.Lock()
+        self._pos = 0
+
+    def next(self):
+        with self._lock:
+            entry = self.records[self._pos % len(self.records)]
+            emp_id = self.emp_ids[self._pos % len(self.emp_ids)] if entry.get("emp") else None
+            self._pos += 1
+        payload = {"message": entry["q"]}
+        if emp_id:
+            payload["emp_id"] = emp_id
+        return entry.get("branch") or "unknown", "POST", "/chatbot/chat-response", payload
+
+
+# === Transports ===
+class InProcessTransport:
+    def __init__(self, app):
+        self.app = app
+        self._local = threading.local()
+
+    def request(self, method, path, payload):
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        resp = client.open(path, method=method, json=payload)
+        return resp.status_code, resp.get_data()
+
+
+class HTTPTransport:
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self._local = threading.local()
+
+    def request(self, method, path, payload):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+        body = json.dumps(payload).encode("utf-8") if payload is not None else None
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            resp = conn.getresponse()
+            return resp.status, resp.read()
+        except Exception:
+            conn.close()
+            self._local.conn = None
+            raise
+
+
+# === Runner ===
+def run(transport, workload, total, concurrency):
+    results = []            # (kind, seconds, ok, source)
+    lock = threading.Lock()
+    remaining = [total]
+
+    def worker():
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+            kind, method, path, payload = workload.next()
+            start = time.perf_counter()
+            source = None
+            try:
+                status, body = transport.request(method, path, payload)
+                ok = status < 400
+                if ok and path.startswith("/chatbot/chat"):
+                    source = json.loads(body).get("meta", {}).get("source")
+            except Exception:
+                ok = False
+            elapsed = time.perf_counter() - start
+            with lock:
+                results.append((kind, elapsed, ok, source))
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results, time.perf_counter() - started
+
+
+def summarize(results, wall):
+    by_kind = {}
+    for kind, seconds, ok, source in results:
+        entry = by_kind.setdefault(kind, {"latencies": [], "errors": 0, "sources": {}})
+        entry["latencies"].append(seconds)
+        entry["errors"] += 0 if ok else 1
+        if source:
+            entry["sources"][source] = entry["sources"].get(source, 0) + 1
+    report = {}
+    for kind, entry in sorted(by_kind.items()) + [("ALL", {
+        "latencies": [r[1] for r in results], "errors": sum(1 for r in results if not r[2]), "sources": {}})]:
+        lat = sorted(entry["latencies"])
+        report[kind] = {
+            "requests": len(lat),
+            "errors": entry["errors"],
+            "throughput_rps": round(len(lat) / wall, 1) if wall else 0.0,
+            "p50_ms": round(percentile(lat, 50) * 1000, 2),
+            "p95_ms": round(percentile(lat, 95) * 1000, 2),
+            "p99_ms": round(percentile(lat, 99) * 1000, 2),
+            "max_ms": round(lat[-1] * 1000, 2) if lat else 0.0,
+            "sources": entry["sources"],
+        }
+    return report
+
+
+def print_report(report, wall):
+    print(f"\n{'kind':<10} {'reqs':>6} {'errs':>5} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}  sources")
+    for kind, r in report.items():
+        sources = ", ".join(f"{k}={v}" for k, v in sorted(r["sources"].items()))
+        print(f"{kind:<10} {r['requests']:>6} {r['errors']:>5} {r['throughput_rps']:>8} {r['p50_ms']:>9} "
+              f"{r['p95_ms']:>9} {r['p99_ms']:>9} {r['max_ms']:>9}  {sources}")
+    print(f"\nwall time {wall:.2f}s")
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        kind, _, weight = part.partition("=")
+        if float(weight or 0) > 0:
+            mix[kind.strip()] = float(weight)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", default="inprocess", help='"inprocess" or a base URL such as http://127.0.0.1:8000')
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=50, help="requests sent (and discarded) before measuring")
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument("--replay", help="request log (JSONL) to replay instead of the synthetic mix")
+    parser.add_argument("--llm-latency", type=float, default=0.8)
+    parser.add_argument("--sheets-latency", type=float, default=0.3)
+    parser.add_argument("--mongo-latency", type=float, default=0.002)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    from bench.boot import boot
+    env = boot(llm_latency=args.llm_latency, sheets_latency=args.sheets_latency, mongo_latency=args.mongo_latency)
+    transport = InProcessTransport(env.app) if args.target == "inprocess" else HTTPTransport(args.target)
+    if args.replay:
+        from request_log import read_records
+        workload = ReplayWorkload(env, read_records(args.replay))
+    else:
+        workload = Workload(env, parse_mix(args.mix), seed=args.seed)
+
+    if args.warmup:
+        run(transport, workload, args.warmup, args.concurrency)
+    results, wall = run(transport, workload, args.requests, args.concurrency)
+    report = summarize(results, wall)
+    print_report(report, wall)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "wall_seconds": wall, "report": report}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+"""
+WSGI/ASGI entrypoints with all external services faked, for load tests over real HTTP:
+
+    python -m bench.stub_llm --port 8765 &
+    BENCH_LLM_URL=http://127.0.0.1:8765/v1 gunicorn bench.serve:app -b 127.0.0.1:8000 -w 4
+    BENCH_LLM_URL=http://127.0.0.1:8765/v1 gunicorn bench.serve:application -k uvicorn.workers.UvicornWorker -b 127.0.0.1:8000
+    python -m bench.run --target http://127.0.0.1:8000
+
+Without BENCH_LLM_URL each worker starts its own in-process stub.
+"""
+import os
+from bench.boot import boot
+
+ENV = boot(
+    llm_url=os.getenv("BENCH_LLM_URL"),
+    sheets_latency=float(os.getenv("BENCH_SHEETS_LATENCY", "0.3")),
+    mongo_latency=float(os.getenv("BENCH_MONGO_LATENCY", "0.002")),
+    mysql_latency=float(os.getenv("BENCH_MYSQL_LATENCY", "0.001")),
+)
+app = ENV.app
+
+from asgi import application  # noqa: E402,F401  (needs the patched environment)
@@ -0,0 +1,168 @@
+"""
+OpenAI-compatible stub for POST /v1/chat/completions (plain and stream=True).
+
+    python -m bench.stub_llm --port 8765 --latency 0.8 --jitter 0.3
+
+Point the app at it with DEEPSEEK_BASE_URL=http://127.0.0.1:8765/v1.
+"""
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubConfig:
+    def __init__(self, latency=0.8, jitter=0.3, token_delay=0.01, error_rate=0.0):
+        self.latency = latency          # seconds before the first byte
+        self.jitter = jitter            # +/- uniform jitter on latency
+        self.token_delay = token_delay  # seconds between streamed chunks
+        self.error_rate = error_rate    # fraction of requests answered with 503
+        self.requests = 0
+        self.streamed = 0
+        self.errors = 0
+        self.prompt_chars = 0
+        self.lock = threading.Lock()
+
+    def delay(self):
+        return max(0.0, self.latency + random.uniform(-self.jitter, self.jitter))
+
+
+def _answer(messages):
+    question = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+    question = question.rsplit("Question: ", 1)[-1]
+    topic = " ".join(question.split()[:8]) or "your question"
+    # Three sentences so the app's two-sentence cutoff is exercised
+    return (f"This is a benchmark answer about {topic}. "
+            "It has a second sentence with a few more details. "
+            "A third sentence should be cut off by the app.")
+
+
+_SEEN_PREFIXES = set()
+
+
+def _usage(messages, text):
+    prompt = sum(len(m.get("content", "")) for m in messages) // 4
+    completion = len(text) // 4
+    # Mimic DeepSeek's context cache: a system message seen before is a hit
+    system = messages[0].get("content", "") if messages and messages[0].get("role") == "system" else ""
+    hit = len(system) // 4 if system in _SEEN_PREFIXES else 0
+    _SEEN_PREFIXES.add(system)
+    return {
+        "prompt_tokens": prompt,
+        "completion_tokens": completion,
+        "total_tokens": prompt + completion,
+        "prompt_cache_hit_tokens": hit,
+        "prompt_cache_miss_tokens": prompt - hit,
+    }
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    config = StubConfig()
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_json(400, {"error": {"message": "invalid JSON"}})
+            return
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"unknown path {self.path}"}})
+            return
+
+        cfg = self.config
+        messages = body.get("messages") or []
+        with cfg.lock:
+            cfg.requests += 1
+            cfg.prompt_chars += sum(len(m.get("content", "")) for m in messages)
+        time.sleep(cfg.delay())
+        if random.random() < cfg.error_rate:
+            with cfg.lock:
+                cfg.errors += 1
+            self._send_json(503, {"error": {"message": "stub overloaded", "type": "server_error"}})
+            return
+
+        text = _answer(messages)
+        model = body.get("model", "deepseek-chat")
+        created = int(time.time())
+        if not body.get("stream"):
+            self._send_json(200, {
+                "id": "chatcmpl-bench",
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": _usage(messages, text),
+            })
+            return
+
+        with cfg.lock:
+            cfg.streamed += 1
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        try:
+            for word in text.split(" "):
+                chunk = {
+                    "id": "chatcmpl-bench", "object": "chat.completion.chunk", "created": created, "model": model,
+                    "choices": [{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}],
+                }
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+                time.sleep(cfg.token_delay)
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # The app closes the stream early at its two-sentence cutoff
+            pass
+
+
+def start_stub(host="127.0.0.1", port=0, config=None):
+    """
+    Starts the stub on a daemon thread; returns (server, base_url).
+    """
+    handler = type("BenchStubHandler", (StubHandler,), {"config": config or StubConfig()})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="stub-llm", daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/v1"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.8)
+    parser.add_argument("--jitter", type=float, default=0.3)
+    parser.add_argument("--token-delay", type=float, default=0.01)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    config = StubConfig(args.latency, args.jitter, args.token_delay, args.error_rate)
+    server, base_url = start_stub(args.host, args.port, config)
+    print(f"Stub DeepSeek listening on {base_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -5,21 +5,43 @@ import re
 import json
 from datetime import datetime
 from openai import OpenAI
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context, has_app_context
 import gspread, base64
 from oauth2client.service_account import ServiceAccountCredentials
 import traceback
-
-# === Load knowledge base from txt file ===
+from concurrent.futures import ThreadPoolExecutor, wait
+from kb_manager import KBManager
+from response_cache import ResponseCache, normalize_key
+from shared_cache import MongoAnswerCache, TieredCache
+from semantic_cache import SemanticCache, SEMANTIC_CACHE_ENABLED
+from leave_store import LeaveStore
+from employee_directory import QUESTION_WORDS
+from section_tree import SectionTree
+from faq_index import FAQMatcher, FAQ_MATCH_ENABLED
+from singleflight import SingleFlight
+from metrics import stage_timer, observe_request, CHAT_STAGE_SECONDS
+from llm_resilience import ResilientLLM, LLM_INSTANCES, CircuitOpen, DeadlineExceeded, LLM_DEGRADED_SIMILARITY, LLM_REQUEST_DEADLINE
+from lazy import LazyClient, STARTUP, warm_in_background
+from request_log import RequestLog, WarmLease, warm_answer_cache, CACHE_WARM_TOP_N
+from prompt_prefix import PromptCacheStats
+from rate_limit import ADMISSION, client_ip, rate_limited_response
+from ops_auth import ops_only
+
+# === Knowledge base: versioned snapshot (text, retrieval index, employee
+# directory, prompt prefix), hot-reloaded when kb_content.txt changes ===
 KB_PATH = os.path.join(os.path.dirname(__file__), "kb_content.txt")
-with open(KB_PATH, "r", encoding="utf-8") as f:
-    knowledge_text = f.read()
+KB = KBManager(KB_PATH)
+with STARTUP.step("kb_load"):
+    KB.load()
 
 # === Configure DeepSeek ===
 DEEPSEEK_API_KEY = os.getenv("DEEPSEEK_API_KEY")
-DEEPSEEK_BASE_URL = "https://api.deepseek.com/v1"
+DEEPSEEK_BASE_URL = os.getenv("DEEPSEEK_BASE_URL", "https://api.deepseek.com/v1")
 MODEL_NAME = "deepseek-chat"
-client = OpenAI(api_key=DEEPSEEK_API_KEY, base_url=DEEPSEEK_BASE_URL)
+# Retries, timeouts and the circuit breaker live in ResilientLLM, not in the SDK.
+# The client (and its connection pool) is created on first use in each worker.
+client = LazyClient("DeepSeek", lambda: OpenAI(api_key=DEEPSEEK_API_KEY, base_url=DEEPSEEK_BASE_URL, max_retries=0))
+LLM = ResilientLLM(client, name="deepseek")
 
 # === Google Sheets Config ===
 LEAVE_SPREADSHEET_ID = os.getenv("LEAVE_SPREADSHEET_ID")
@@ -31,40 +53,59 @@ scope = [
     'https://www.googleapis.com/auth/drive'
 ]
 
-creds_data = base64.b64decode(os.getenv("GOOGLE_CREDS_BASE64"))
-creds_dict = json.loads(creds_data)
-creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, scope)
-client_gsheet = gspread.authorize(creds)
+def _authorize_gsheet():
+    creds_data = base64.b64decode(os.getenv("GOOGLE_CREDS_BASE64"))
+    creds_dict = json.loads(creds_data)
+    creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, scope)
+    return gspread.authorize(creds)
+
+client_gsheet = LazyClient("Google Sheets", _authorize_gsheet)
+
+# === Leave data cache: worksheets indexed by EMP ID, refreshed in the background ===
+LEAVE_STORE = LeaveStore(client_gsheet.get, LEAVE_SPREADSHEET_ID)
+LEAVE_PRELOAD = os.getenv("LEAVE_PRELOAD", "1") == "1"
 
 # === Flask Setup ===
 chatbot_bp = Blueprint("chatbot", __name__, url_prefix="/chatbot")
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-# Simple cache
-RESPONSE_CACHE = {
+# === Response cache ===
+# L1: bounded LRU + TTL per worker, keys normalized, entries stamped with KB version
+# L2: shared across workers/restarts in Mongo (sanathana_chatbot_v1.answer_cache), written behind
+def _mongo_for_cache():
+    if not has_app_context():
+        return None
+    return getattr(current_app, "mongo_chatbot", None)
+
+RESPONSE_CACHE = TieredCache(ResponseCache(kb_version=KB.current.version), MongoAnswerCache(), db_provider=_mongo_for_cache)
+SEED_ANSWERS = {
     "who are the founders of sanathana?": "Founders: Sri Ranganatha Raju, Srinatha Raju, Sainatha Raju",
     "when was sanathana founded?": "Founded in 2017",
     "what is sanathana?": "Sanathana Analytics is a rural tech company providing recruitment, research, and e-commerce services."
 }
+for _q, _a in SEED_ANSWERS.items():
+    RESPONSE_CACHE.set(_q, _a, pinned=True)
+
+# === Semantic cache: reuse DeepSeek answers for paraphrased questions ===
+with STARTUP.step("semantic_idf"):
+    SEMANTIC_CACHE = SemanticCache(kb_version=KB.current.version)
+    SEMANTIC_CACHE.fit_idf(KB.current.text.splitlines())
+
+# === On KB change: drop only answers built from the previous version ===
+def _on_kb_change(snapshot):
+    SEMANTIC_CACHE.fit_idf(snapshot.text.splitlines())
+    SEMANTIC_CACHE.set_kb_version(snapshot.version)
+    RESPONSE_CACHE.set_kb_version(snapshot.version)
+
+KB.on_change(_on_kb_change)
 
 # === Helper: Extract birthdays by month ===
 def extract_birthdays_by_month(month_name):
-    pattern = re.compile(
-        r'EMPLOYEE NAME\s*:\s*([^,\n]+).*?DATE OF BIRTH\s*:\s*([0-9\-]+)', re.IGNORECASE | re.DOTALL)
-    matches = pattern.findall(knowledge_text)
     try:
         month_num = datetime.strptime(month_name, "%B").month
     except Exception:
         return []
-    results = []
-    for name, dob in matches:
-        try:
-            dob_dt = datetime.strptime(dob, "%d-%m-%Y")
-            if dob_dt.month == month_num:
-                results.append(f"{name.strip()} - {dob_dt.strftime('%d-%b')}")
-        except Exception:
-            continue
-    return results
+    return KB.current.directory.birthdays_in_month(month_num)
 
 # === Helper: Find month-year from user question or fallback to current ===
 def detect_month_year_from_question(question):
@@ -101,22 +142,24 @@ def detect_month_year_from_question(question):
         year = now.strftime("%Y")
     return month, year
 
+# === Helper: Leave questions are answered from the "<Month> <Year>" worksheet ===
+def wants_leave_data(lower_question, emp_id):
+    return bool(emp_id) and ("leave" in lower_question or "leaves" in lower_question or "attendance" in lower_question)
+
+def leave_worksheet_name(question):
+    month, year = detect_month_year_from_question(question or "")
+    return f"{month} {year}"
+
 # === Get leave data for EMP ID, and dynamic sheet based on month/year ===
 def get_leave_data(emp_id, question=None):
     try:
-        sh = client_gsheet.open_by_key(LEAVE_SPREADSHEET_ID)
-        month, year = detect_month_year_from_question(question or "")
-        worksheet_name = f"{month} {year}"
+        worksheet_name = leave_worksheet_name(question)
         logging.info(f"[LEAVE DATA] Trying worksheet: {worksheet_name}")
-        try:
-            sheet = sh.worksheet(worksheet_name)
-        except Exception:
+        row, sheet_found = LEAVE_STORE.lookup(worksheet_name, emp_id)
+        if not sheet_found:
             return f"No leave data sheet found for {worksheet_name}."
-        records = sheet.get_all_records()
-        user_leaves = [row for row in records if str(row.get("EMP ID")).strip() == str(emp_id).strip()]
-        if not user_leaves:
+        if not row:
             return f"No leave data found for your EMP ID ({emp_id}) in {worksheet_name}."
-        row = user_leaves[0]
         emp_name = row.get("EMP NAME") or row.get("EMPLOYEE NAME") or "N/A"
 
         # Prepare structured message
@@ -145,146 +188,324 @@ def get_leave_data(emp_id, question=None):
         logging.error(f"[LEAVE DATA ERROR] {e}\n{traceback.format_exc()}")
         return "Error fetching leave data. Please try again later."
 
-def ask_deepseek(user_question, emp_id=None):
-    import time
-
-    def call_deepseek_with_retry(messages, model=MODEL_NAME, max_tokens=2000, max_retries=3):
-        delays = [1, 2, 4]
-        last_exception = None
-        for attempt in range(max_retries):
-            try:
-                start_time = time.time()
-                response = client.chat.completions.create(
-                    model=model,
-                    messages=messages,
-                    temperature=1.0,
-                    max_tokens=max_tokens,
-                    stream=False
-                )
-                duration = time.time() - start_time
-                if duration > 8:
-                    logging.warning(f"[DeepSeek SLOW] Took {duration:.2f}s")
-                return response
-            except Exception as e:
-                last_exception = e
-                logging.warning(f"DeepSeek attempt {attempt+1} failed: {str(e)}")
-                if attempt < len(delays):
-                    time.sleep(delays[attempt])
-        raise RuntimeError(f"DeepSeek API failed after {max_retries} retries. Last error: {last_exception}")
-
-    def find_birthday_by_name(name, kb_text):
-        # Robust name search (allows partial names)
-        pattern = re.compile(r"EMPLOYEE NAME\s*:\s*(.+?)\s*[\r\n,].*?DATE OF BIRTH\s*:\s*([0-9\-]+)", re.IGNORECASE | re.DOTALL)
-        matches = pattern.findall(kb_text)
-        for emp_name, dob in matches:
-            if name.lower() in emp_name.lower():
-                try:
-                    dob_dt = datetime.strptime(dob, "%d-%m-%Y")
-                    return f"{emp_name.strip()}'s birthday is {dob_dt.strftime('%d-%b-%Y')}."
-                except Exception:
-                    return f"{emp_name.strip()}'s birthday is {dob}."
-        return None
-
-    try:
-        user_question = user_question.strip()
-        lower_question = user_question.lower()
-
-        # 1. Fast cache for popular queries
-        if lower_question in RESPONSE_CACHE:
-            return RESPONSE_CACHE[lower_question]
-
-        # 2. Local logic (leave data)
-        if emp_id and ("leave" in lower_question or "leaves" in lower_question or "attendance" in lower_question):
+# === DeepSeek call with retry (shared by blocking and streaming paths) ===
+def call_deepseek_with_retry(messages, model=MODEL_NAME, max_tokens=2000, max_retries=3, stream=False,
+                             deadline=LLM_REQUEST_DEADLINE):
+    # Adaptive per-attempt timeouts, jittered backoff and an overall deadline;
+    # raises CircuitOpen immediately while DeepSeek is failing
+    start_time = time.time()
+    response = LLM.create(
+        max_retries=max_retries,
+        deadline=deadline,
+        model=model,
+        messages=messages,
+        temperature=1.0,
+        max_tokens=max_tokens,
+        stream=stream
+    )
+    duration = time.time() - start_time
+    if duration > 8:
+        logging.warning(f"[DeepSeek SLOW] Took {duration:.2f}s")
+    return response
+
+# === Helper: Find birthday by (partial) employee name ===
+def find_birthday_by_name(name):
+    # Exact / prefix / substring / fuzzy match on the precomputed name index
+    lines = [e.birthday_line() for e in KB.current.directory.find(name)]
+    lines = [l for l in lines if l]
+    return "\n".join(lines) if lines else None
+
+# === Helper: Answer birthday questions from the employee directory ===
+UPCOMING_DAYS_RE = re.compile(r"(?:next|coming|upcoming)\s+(\d{1,3})\s+days?")
+
+def answer_birthday_question(user_question):
+    lower_question = user_question.lower()
+
+    # a. Upcoming birthdays ("next 10 days", "this week", "today", "upcoming")
+    days = None
+    days_match = UPCOMING_DAYS_RE.search(lower_question)
+    if days_match:
+        days = int(days_match.group(1))
+    elif "today" in lower_question:
+        days = 0
+    elif "tomorrow" in lower_question:
+        days = 1
+    elif "this week" in lower_question or "next week" in lower_question:
+        days = 7
+    elif "upcoming" in lower_question or "coming up" in lower_question:
+        days = 30
+    if days is not None:
+        upcoming = KB.current.directory.upcoming_birthdays(days)
+        if not upcoming:
+            return "No birthdays today." if days == 0 else f"No birthdays in the next {days} days."
+        when = {0: " (today)", 1: " (tomorrow)"}
+        lines = [
+            f"{e.name} - {nxt.strftime('%d-%b')}" + when.get(left, f" (in {left} days)")
+            for e, nxt, left in upcoming
+        ]
+        return f"Upcoming birthdays (next {days} days):\n- " + "\n- ".join(lines)
+
+    # b. Name-based lookup, e.g., "What is Amruth's birthday?"
+    name_match = re.search(r"(?i)birthday of (\w+)", user_question)
+    if not name_match:
+        name_match = re.search(r"(?i)(\w+)'s birthday", user_question)
+    if not name_match:
+        # fallback: look for any word before "birthday"
+        name_match = re.search(r"(?i)what is (\w+)[’'s ]*birthday", user_question)
+    if name_match and name_match.group(1).lower() not in QUESTION_WORDS and len(name_match.group(1)) > 2:
+        result = find_birthday_by_name(name_match.group(1))
+        if result:
+            return result
+    employees = KB.current.directory.find_in_question(user_question)
+    lines = [l for l in (e.birthday_line() for e in employees) if l]
+    if lines:
+        return "\n".join(lines)
+
+    # c. Month-based listing
+    months = [
+        "january", "february", "march", "april", "may", "june",
+        "july", "august", "september", "october", "november", "december"
+    ]
+    month = next((m.capitalize() for m in months if m in lower_question), None)
+    if month is None and "this month" in lower_question:
+        month = datetime.now().strftime("%B")
+    if month:
+        bdays = extract_birthdays_by_month(month)
+        if bdays:
+            return f"Birthdays in {month}:\n- " + "\n- ".join(bdays)
+        return f"No birthdays found in {month}."
+    return None
+
+# === Pipeline steps 1-5: answer from cache / leave sheet / birthdays / curated FAQ / paraphrase cache without the LLM ===
+def resolve_locally(user_question, emp_id=None, meta=None):
+    """
+    Returns a reply if the question can be answered without DeepSeek, otherwise None.
+    If a meta dict is given, meta["source"] records which step answered.
+    """
+    meta = meta if meta is not None else {}
+    lower_question = user_question.lower()
+
+    # 1. Local logic (leave data). Answered per employee, so it runs before the
+    # shared cache, which may hold a generic answer to the same wording
+    if wants_leave_data(lower_question, emp_id):
+        meta["source"] = "leave"
+        with stage_timer("leave"):
             return get_leave_data(emp_id, user_question)
 
-        # 3. Direct name-based birthday lookup (if user asks for someone's birthday)
-        if ("birthday" in lower_question or "birth date" in lower_question):
-            # Extract possible name from the question, e.g., "What is Amruth's birthday?"
-            name_match = re.search(r"(?i)birthday of (\w+)", user_question)
-            if not name_match:
-                name_match = re.search(r"(?i)(\w+)'s birthday", user_question)
-            if not name_match:
-                # fallback: look for any word before "birthday"
-                name_match = re.search(r"(?i)what is (\w+)[’'s ]*birthday", user_question)
-            if name_match:
-                name = name_match.group(1)
-                result = find_birthday_by_name(name, knowledge_text)
-                if result:
-                    RESPONSE_CACHE[lower_question] = result
-                    return result
-            # fallback to months extraction if a month is in the question
-            months = [
-                "january", "february", "march", "april", "may", "june",
-                "july", "august", "september", "october", "november", "december"
-            ]
-            for m in months:
-                if m in lower_question:
-                    bdays = extract_birthdays_by_month(m.capitalize())
-                    if bdays:
-                        reply = f"Birthdays in {m.capitalize()}:\n- " + "\n- ".join(bdays)
-                    else:
-                        reply = f"No birthdays found in {m.capitalize()}."
-                    RESPONSE_CACHE[lower_question] = reply
-                    return reply
-
-        # 4. Compose DeepSeek system prompt
-        system_content = (
-            "You are a concise and resourceful Sanathana assistant. "
-            "Always use the knowledge provided to find and present helpful answers, even if the exact information is not available. "
-            "Carefully search, analyze, and extract any facts or related content that may assist the user. "
-            "If there is no exact answer, present the most closely related information, summaries, or inferred details from the knowledge base.\n\n"
-            "Knowledge Base:\n"
-            + knowledge_text +
-            "\n\n"
-            "Instructions:\n"
-            "1. Use ONLY the knowledge provided—never make up facts.\n"
-            "2. If you cannot find an exact match, provide any relevant, related, or inferred information from the knowledge base.\n"
-            "3. Never respond with phrases like 'I don't have that information' or 'I am unable to answer'.\n"
-            "4. Be direct—avoid greetings, sign-offs, or apologies.\n"
-            "5. Always keep sentences short and crisp.\n"
-            "6. Use clear, simple language that is easy to understand.\n"
-            "7. For list-type queries (such as 'list features' or 'show benefits'):\n"
-            "   - Present information as bullet points\n"
-            "   - Group related items together logically\n"
-            "   - Avoid blank lines between bullets\n"
-            "8. For all other queries, respond with brief, fact-based sentences using the most relevant knowledge.\n"
-            "9. Only include contact details if specifically requested.\n"
-            "10. Always try to give the user the most useful response possible using the available knowledge.\n"
-        )
-
-
-        # 5. Call DeepSeek with retry logic
-        start_time = time.time()
+    # 2. Birthday lookups from the employee directory (date-dependent, never cached)
+    if ("birthday" in lower_question or "birth date" in lower_question):
+        with stage_timer("birthday"):
+            reply = answer_birthday_question(user_question)
+        if reply:
+            meta["source"] = "birthday"
+            return reply
+
+    # 3. Fast cache for popular queries
+    with stage_timer("cache"):
+        cached = RESPONSE_CACHE.get(user_question)
+    if cached is not None:
+        meta["source"] = "cache"
+        return cached
+
+    # 4. Curated answer from the sections Q&A corpus
+    if FAQ_MATCH_ENABLED and has_app_context():
+        with stage_timer("faq"):
+            faq = match_faq(user_question)
+        if faq:
+            logging.info(f"[FAQ] '{user_question}' ≈ '{faq['question']}' ({faq['score']:.3f})")
+            meta["source"] = "faq"
+            meta["faq"] = {k: faq[k] for k in ("question", "section", "sub_section", "score")}
+            return faq["answer"]
+
+    # 5. Paraphrase of a question DeepSeek already answered
+    if SEMANTIC_CACHE_ENABLED:
+        with stage_timer("semantic_cache"):
+            match = SEMANTIC_CACHE.lookup(user_question)
+        meta["semantic"] = {
+            "threshold": SEMANTIC_CACHE.threshold,
+            "hit_rate": SEMANTIC_CACHE.hit_rate(),
+            "matched_question": match["question"] if match else None,
+            "similarity": match["similarity"] if match else None,
+        }
+        if match:
+            logging.info(f"[SEMANTIC CACHE] '{user_question}' ≈ '{match['question']}' ({match['similarity']:.3f})")
+            RESPONSE_CACHE.set(user_question, match["answer"])
+            meta["source"] = "semantic_cache"
+            return match["answer"]
+
+    return None
+
+# === Helper: Remember a DeepSeek answer in the exact and paraphrase caches ===
+def remember_reply(user_question, reply, kb_version=None):
+    # An answer built from a KB version that was swapped out mid-call is not cached
+    if kb_version is not None and kb_version != KB.current.version:
+        logging.info(f"[KB] Not caching answer from superseded KB version {kb_version}")
+        return
+    RESPONSE_CACHE.set(user_question, reply)
+    if SEMANTIC_CACHE_ENABLED:
+        SEMANTIC_CACHE.add(user_question, reply)
+
+# === Pipeline step 4: retrieve relevant KB chunks and compose DeepSeek messages ===
+# The system message is a byte-stable prefix built once per KB version (see
+# KBSnapshot.prompt), so DeepSeek's prompt cache can serve it; only the user turn varies.
+PROMPT_CACHE_STATS = PromptCacheStats()
+
+def build_messages(user_question):
+    return KB.current.prompt.build(user_question)
+
+# === Helper: Keep only the first two sentences ===
+def truncate_reply(text):
+    """
+    Returns (reply, was_cut). was_cut is True once a third sentence has started,
+    which lets the streaming path stop the upstream generation early.
+    """
+    sentences = text.split('. ')
+    if len(sentences) > 2:
+        return '. '.join(sentences[:2]) + '.', True
+    return text, False
+
+# === Helper: Canned answers when DeepSeek is unavailable ===
+def fallback_reply(lower_question):
+    if "founder" in lower_question:
+        return "Founders: Sri Ranganatha Raju, Srinatha Raju, Sainatha Raju"
+    elif "founded" in lower_question or "when" in lower_question:
+        return "Founded in 2017"
+    elif "what" in lower_question and "sanathana" in lower_question:
+        return "Sanathana Analytics is a rural tech company providing recruitment and tech services."
+    return "I'm having trouble answering right now. Please try again."
+
+# === Helper: Best answer we can give without DeepSeek (circuit open / deadline / error) ===
+def degraded_reply(user_question, error, meta):
+    lower_question = user_question.lower()
+    if isinstance(error, CircuitOpen):
+        meta["llm_error"] = "circuit_open"
+    elif isinstance(error, DeadlineExceeded):
+        meta["llm_error"] = "deadline"
+    else:
+        meta["llm_error"] = "error"
+    # A looser paraphrase match beats the canned text
+    if SEMANTIC_CACHE_ENABLED:
+        match = SEMANTIC_CACHE.lookup(user_question, threshold=LLM_DEGRADED_SIMILARITY)
+        if match:
+            meta["source"] = "semantic_cache"
+            meta["degraded"] = True
+            return match["answer"]
+    meta["source"] = "fallback"
+    return fallback_reply(lower_question)
+
+# === Steps 6-9: DeepSeek call, coalesced per normalized question ===
+LLM_FLIGHTS = SingleFlight("deepseek")
+
+def answer_with_deepseek(user_question, deadline=LLM_REQUEST_DEADLINE):
+    # 6. Compose DeepSeek prompt
+    kb_version = KB.current.version
+    with stage_timer("prompt_build"):
+        messages = build_messages(user_question)
+
+    # 7. Call DeepSeek with retry logic
+    start_time = time.time()
+    with stage_timer("upstream"):
         response = call_deepseek_with_retry(
-            messages=[
-                {"role": "system", "content": system_content},
-                {"role": "user", "content": user_question}
-            ],
-            max_tokens=600  # Lower for faster reply, can adjust
+            messages=messages,
+            max_tokens=600,  # Lower for faster reply, can adjust
+            deadline=deadline
         )
-        response_time = time.time() - start_time
-        logging.info(f"DeepSeek response time: {response_time:.2f}s")
-
-        # 6. Truncate answer to keep short (first two sentences)
-        reply = response.choices[0].message.content.strip()
-        sentences = reply.split('. ')
-        if len(sentences) > 2:
-            reply = '. '.join(sentences[:2]) + '.'
-
-        # 7. Store in cache
-        RESPONSE_CACHE[lower_question] = reply
+    response_time = time.time() - start_time
+    PROMPT_CACHE_STATS.record(getattr(response, "usage", None))
+    logging.info(f"DeepSeek response time: {response_time:.2f}s")
+
+    # 8. Truncate answer to keep short (first two sentences)
+    with stage_timer("truncate"):
+        reply, _ = truncate_reply(response.choices[0].message.content.strip())
+
+    # 9. Store in cache
+    with stage_timer("remember"):
+        remember_reply(user_question, reply, kb_version)
+    return reply
+
+def ask_deepseek(user_question, emp_id=None, meta=None):
+    meta = meta if meta is not None else {}
+    user_question = user_question.strip()
+    try:
+        # 1-5. Cache, leave data, birthdays, curated FAQ, paraphrase cache
+        reply = resolve_locally(user_question, emp_id, meta)
+        if reply is not None:
+            return reply
+
+        # 6-9. One DeepSeek call per distinct question in flight; identical
+        # concurrent questions wait for it and share the answer
+        reply, shared = LLM_FLIGHTS.do(normalize_key(user_question), lambda: answer_with_deepseek(user_question))
+        meta["source"] = "llm"
+        if shared:
+            meta["coalesced"] = True
         return reply
 
     except Exception as e:
         logging.error(f"DeepSeek Error: {str(e)}")
-        # Optional: fallback for common queries
-        if "founder" in lower_question:
-            return "Founders: Sri Ranganatha Raju, Srinatha Raju, Sainatha Raju"
-        elif "founded" in lower_question or "when" in lower_question:
-            return "Founded in 2017"
-        elif "what" in lower_question and "sanathana" in lower_question:
-            return "Sanathana Analytics is a rural tech company providing recruitment and tech services."
-        return "I'm having trouble answering right now. Please try again."
+        # Fail fast to a cached or canned answer
+        return degraded_reply(user_question, e, meta)
+
+# === Streaming variant: yields text deltas, stops upstream at the two-sentence cutoff ===
+def stream_deepseek(user_question, emp_id=None, meta=None):
+    meta = meta if meta is not None else {}
+    user_question = user_question.strip()
+    try:
+        reply = resolve_locally(user_question, emp_id, meta)
+    except Exception as e:
+        logging.error(f"[STREAM] Local lookup error: {str(e)}")
+        reply = None
+    if reply is not None:
+        yield reply
+        return
+
+    stream = None
+    buffer = ""
+    sent = 0
+    completed = False
+    kb_version = KB.current.version
+    try:
+        with stage_timer("prompt_build"):
+            messages = build_messages(user_question)
+        start_time = time.time()
+        with stage_timer("upstream_connect"):
+            stream = call_deepseek_with_retry(
+                messages=messages,
+                max_tokens=600,
+                stream=True
+            )
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content or ""
+            if not delta:
+                continue
+            buffer += delta
+            visible, was_cut = truncate_reply(buffer.lstrip())
+            if len(visible) > sent:
+                yield visible[sent:]
+                sent = len(visible)
+            if was_cut:
+                logging.info("[STREAM] Two-sentence cutoff reached, closing upstream early")
+                break
+        completed = True
+        meta["source"] = "llm"
+        CHAT_STAGE_SECONDS.observe(time.time() - start_time, stage="upstream_stream")
+        logging.info(f"DeepSeek stream time: {time.time() - start_time:.2f}s")
+    except Exception as e:
+        logging.error(f"[STREAM] DeepSeek Error: {str(e)}")
+        if not sent:
+            yield degraded_reply(user_question, e, meta)
+    finally:
+        if stream is not None:
+            try:
+                stream.close()
+            except Exception:
+                pass
+
+    if completed:
+        reply, _ = truncate_reply(buffer.strip())
+        if reply:
+            remember_reply(user_question, reply, kb_version)
 
 
 
@@ -299,6 +520,9 @@ def get_mongo_chatbot():
         raise RuntimeError("Database connection issue")
     return db
 
+# === Section hierarchy held in memory (name -> node index), kept in sync with Mongo ===
+SECTION_TREE = SectionTree()
+
 # === Flatten Mongo Questions ===
 def flatten_questions(sections):
     flat = []
@@ -322,15 +546,62 @@ def flatten_questions(sections):
             _subs(sec["sub_sections"])
     return flat
 
+# === FAQ index over the flattened sections corpus, rebuilt when the tree changes ===
+FAQ_MATCHER = FAQMatcher()
+SECTION_TREE.on_change(lambda snapshot: FAQ_MATCHER.rebuild(flatten_questions(snapshot.docs), snapshot.version))
+
+def match_faq(user_question):
+    try:
+        SECTION_TREE.get(get_mongo_chatbot())   # first call loads the tree and builds the index
+    except Exception as e:
+        logging.warning(f"[FAQ] Section tree unavailable: {e}")
+        return None
+    return FAQ_MATCHER.match(user_question)
+
+# === Request log (JSONL) and replay of popular questions into the answer cache ===
+REQUEST_LOG = RequestLog()
+
+def warm_popular_answers(flask_app):
+    # App context so cache lookups and writes reach the shared Mongo tier
+    with flask_app.app_context():
+        # One worker across all instances replays; the others read its answers from L2
+        lease = WarmLease(flask_app.mongo_chatbot)
+        if not lease.claim():
+            return
+        warm_answer_cache(
+            answer_fn=lambda q: ask_deepseek(q, None, {}),
+            is_cached=lambda q: RESPONSE_CACHE.get(q) is not None,
+            should_stop=lambda: LLM.breaker.state == "open" or not lease.renew(),
+        )
+
+# === Background warm-up, run once per worker after fork (see gunicorn.conf.py) ===
+def warm_up(mongo_db=None, flask_app=None):
+    KB.start()
+    tasks = [("DeepSeek client", client.get), ("Google Sheets client", client_gsheet.get)]
+    if LEAVE_PRELOAD and LEAVE_SPREADSHEET_ID:
+        tasks.append(("leave sheet", lambda: LEAVE_STORE.get_sheet(datetime.now().strftime("%B %Y"))))
+    if mongo_db is not None:
+        tasks.append(("section tree", lambda: SECTION_TREE.get(mongo_db)))
+    if flask_app is not None and CACHE_WARM_TOP_N > 0:
+        tasks.append(("answer cache", lambda: warm_popular_answers(flask_app)))
+    warm_in_background("chatbot-warm-up", tasks)
+
+# === Helper: JSON response with ETag; 304 if the client already has this version ===
+def etag_response(payload, etag):
+    if request.if_none_match.contains(etag):
+        resp = current_app.response_class(status=304)
+    else:
+        resp = jsonify(payload)
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
+
 # === /sections endpoint ===
 @chatbot_bp.route("/sections", methods=["GET"])
 def get_sections():
     try:
-        coll = get_mongo_chatbot()["sections"]
-        docs = coll.find({}, {"_id": 0, "section_name": 1})
-        lst = [d["section_name"] for d in docs]
-        logging.info("✅ Sections fetched: %s", lst)
-        return jsonify({"sections": lst}), 200
+        tree = SECTION_TREE.get(get_mongo_chatbot())
+        return etag_response({"sections": tree.section_names}, tree.version)
     except Exception as e:
         logging.error("❌ Error fetching sections: %s", e)
         return jsonify({"error": "Failed to fetch sections"}), 500
@@ -342,46 +613,25 @@ def get_section_questions():
     if not name:
         return jsonify({"error": "Section name is required"}), 400
     try:
-        coll = get_mongo_chatbot()["sections"]
-        sec = coll.find_one({"section_name": name})
-        if sec:
-            if sec.get("sub_sections"):
-                return jsonify({"sub_sections": [s["sub_section_name"] for s in sec["sub_sections"]]}), 200
-            return jsonify({"questions": sec.get("questions", [])}), 200
-
-        parent = coll.find_one({"sub_sections.sub_section_name": name})
-        if parent:
-            for s in parent["sub_sections"]:
-                if s["sub_section_name"] == name:
-                    return jsonify({
-                        "sub_sections": [ss["sub_section_name"] for ss in s.get("sub_sections", [])],
-                        "questions": s.get("questions", [])
-                    }), 200
-
-        def find_sub(subs):
-            for s in subs:
-                if s["sub_section_name"] == name:
-                    return s
-                if s.get("sub_sections"):
-                    found = find_sub(s["sub_sections"])
-                    if found:
-                        return found
-            return None
-
-        for doc in coll.find({}, {"_id": 0, "sub_sections": 1}):
-            if doc.get("sub_sections"):
-                f = find_sub(doc["sub_sections"])
-                if f:
-                    return jsonify({
-                        "sub_sections": [ss["sub_section_name"] for ss in f.get("sub_sections", [])],
-                        "questions": f.get("questions", [])
-                    }), 200
-
-        return jsonify({"error": "Section not found"}), 404
+        tree = SECTION_TREE.get(get_mongo_chatbot())
+        node = tree.lookup(name)
+        if node is None:
+            return jsonify({"error": "Section not found"}), 404
+        return etag_response(node, tree.version)
     except Exception as e:
         logging.error("❌ get_section_questions: %s", e)
         return jsonify({"error": "Failed to fetch questions"}), 500
 
+# === Admission control: per-IP, per-identity and global token buckets, cached answers first ===
+def admit_chat_request(user_input, emp_id, headers, remote_addr):
+    ip = client_ip(headers, remote_addr)
+    return ADMISSION.admit_chat(ip, emp_id, cacheable=RESPONSE_CACHE.contains(user_input))
+
+def admit_batch_request(questions, emp_id, headers, remote_addr):
+    cached = sum(1 for q in questions if RESPONSE_CACHE.contains(q))
+    ip = client_ip(headers, remote_addr)
+    return ADMISSION.admit_chat_batch(ip, emp_id, cached=cached, uncached=len(questions) - cached)
+
 # === /chat-response endpoint ===
 @chatbot_bp.route("/chat-response", methods=["POST"])
 def chatbot_reply():
@@ -392,14 +642,226 @@ def chatbot_reply():
 
         if not user_input or len(user_input) > 500:
             return jsonify({"error": "Invalid input"}), 400
+        wait_seconds = admit_chat_request(user_input, emp_id, request.headers, request.remote_addr)
+        if wait_seconds:
+            return rate_limited_response(wait_seconds)
 
         start_time = time.time()
-        reply = ask_deepseek(user_input, emp_id)  # <-- Pass emp_id here!
+        meta = {}
+        reply = ask_deepseek(user_input, emp_id, meta)  # <-- Pass emp_id here!
         response_time = time.time() - start_time
+        observe_request("chat-response", meta.get("source"), response_time)
+        REQUEST_LOG.record("chat-response", user_input, emp_id, meta, response_time)
 
-        logging.info(f"Total response time: {response_time:.2f}s | Chars: {len(reply)}")
-        return jsonify({"response": reply}), 200
+        logging.info(f"Total response time: {response_time:.2f}s | Chars: {len(reply)} | Meta: {meta}")
+        return jsonify({"response": reply, "meta": meta}), 200
 
     except Exception as e:
         logging.error(f"Endpoint Error: {str(e)}")
         return jsonify({"response": "Internal server error"}), 500
+
+# === /chat-stream endpoint (server-sent events) ===
+def sse_event(payload, event=None):
+    data = json.dumps(payload, ensure_ascii=False)
+    return (f"event: {event}\n" if event else "") + f"data: {data}\n\n"
+
+@chatbot_bp.route("/chat-stream", methods=["POST"])
+def chatbot_stream():
+    data = request.get_json(silent=True) or {}
+    user_input = data.get("message", "").strip()
+    emp_id = data.get("emp_id")
+
+    if not user_input or len(user_input) > 500:
+        return jsonify({"error": "Invalid input"}), 400
+    wait_seconds = admit_chat_request(user_input, emp_id, request.headers, request.remote_addr)
+    if wait_seconds:
+        return rate_limited_response(wait_seconds)
+
+    def generate():
+        start_time = time.time()
+        parts = []
+        meta = {}
+        try:
+            for delta in stream_deepseek(user_input, emp_id, meta):
+                parts.append(delta)
+                yield sse_event({"delta": delta})
+            yield sse_event({"response": "".join(parts).strip(), "meta": meta}, event="done")
+        except Exception as e:
+            logging.error(f"Stream Endpoint Error: {str(e)}")
+            yield sse_event({"error": "Internal server error"}, event="error")
+        observe_request("chat-stream", meta.get("source"), time.time() - start_time)
+        REQUEST_LOG.record("chat-stream", user_input, emp_id, meta, time.time() - start_time)
+        logging.info(f"Total stream time: {time.time() - start_time:.2f}s | Chars: {sum(len(p) for p in parts)}")
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return Response(stream_with_context(generate()), mimetype="text/event-stream", headers=headers)
+
+# === Batch chat Config ===
+CHAT_BATCH_MAX_MESSAGES = int(os.getenv("CHAT_BATCH_MAX_MESSAGES", "10"))
+# One deadline for the whole batch; DeepSeek calls still running then get the degraded answer
+CHAT_BATCH_DEADLINE = float(os.getenv("CHAT_BATCH_DEADLINE", str(LLM_REQUEST_DEADLINE)))
+CHAT_BATCH_WORKERS = int(os.getenv("CHAT_BATCH_WORKERS", "16"))
+
+_batch_pool = None
+_batch_pool_pid = None
+
+def batch_pool():
+    # One pool per worker process (created after gunicorn fork)
+    global _batch_pool, _batch_pool_pid
+    if _batch_pool_pid != os.getpid():
+        _batch_pool = ThreadPoolExecutor(max_workers=CHAT_BATCH_WORKERS, thread_name_prefix="chat-batch")
+        _batch_pool_pid = os.getpid()
+    return _batch_pool
+
+def parse_batch_request(data):
+    """
+    Returns (questions, emp_id); questions is None when the body is invalid.
+    """
+    if not isinstance(data, dict):
+        return None, None
+    messages = data.get("messages")
+    if not isinstance(messages, list) or not 0 < len(messages) <= CHAT_BATCH_MAX_MESSAGES:
+        return None, None
+    questions = [m.strip() if isinstance(m, str) else "" for m in messages]
+    if any(not q or len(q) > 500 for q in questions):
+        return None, None
+    return questions, data.get("emp_id")
+
+def prefetch_leave_sheets(questions, emp_id):
+    # Each worksheet the batch needs starts downloading now, once, all in parallel;
+    # errors surface (and are reported) when get_leave_data reads the sheet
+    names = {leave_worksheet_name(q) for q in questions if wants_leave_data(q.lower(), emp_id)}
+    return [batch_pool().submit(LEAVE_STORE.get_sheet, name) for name in names]
+
+def plan_batch(questions, emp_id):
+    """
+    Steps 1-5 for every question. Returns (results, pending, deferred):
+    results[i] is set for locally answered questions; pending maps a
+    normalized question to (question, [indexes]) for the DeepSeek calls still
+    needed; deferred lists leave questions, answered by resolve_deferred once
+    their worksheets (prefetched meanwhile) are in. They never need DeepSeek.
+    """
+    prefetch_leave_sheets(questions, emp_id)
+    results = [None] * len(questions)
+    pending = {}
+    deferred = []
+    for i, question in enumerate(questions):
+        if wants_leave_data(question.lower(), emp_id):
+            deferred.append(i)
+            continue
+        meta = {}
+        try:
+            reply = resolve_locally(question, emp_id, meta)
+        except Exception as e:
+            logging.error(f"[BATCH] Local lookup error: {str(e)}")
+            reply = None
+        if reply is not None:
+            results[i] = {"response": reply, "meta": meta}
+        else:
+            pending.setdefault(normalize_key(question), (question, []))[1].append(i)
+    return results, pending, deferred
+
+def resolve_deferred(results, questions, deferred, emp_id):
+    for i in deferred:
+        meta = {}
+        try:
+            reply = resolve_locally(questions[i], emp_id, meta)
+        except Exception as e:
+            logging.error(f"[BATCH] Leave lookup error: {str(e)}")
+            reply, meta = "Error fetching leave data. Please try again later.", {"source": "leave"}
+        results[i] = {"response": reply, "meta": meta}
+    return results
+
+def settle_batch(results, pending, outcomes):
+    """
+    outcomes maps a pending key to (reply, shared) or the exception raised;
+    keys missing from it did not finish before the batch deadline.
+    """
+    for key, (question, indexes) in pending.items():
+        outcome = outcomes.get(key) or DeadlineExceeded(f"Batch deadline of {CHAT_BATCH_DEADLINE:.0f}s reached")
+        meta = {}
+        if isinstance(outcome, Exception):
+            reply = degraded_reply(question, outcome, meta)
+        else:
+            reply, shared = outcome
+            meta["source"] = "llm"
+            if shared:
+                meta["coalesced"] = True
+        for i in indexes:
+            results[i] = {"response": reply, "meta": dict(meta)}
+    return results
+
+def answer_batch(questions, emp_id=None, deadline=CHAT_BATCH_DEADLINE):
+    end = time.time() + deadline
+    results, pending, deferred = plan_batch(questions, emp_id)
+    flask_app = current_app._get_current_object() if has_app_context() else None
+
+    def _ask(question):
+        # Pool threads need the app context for the Mongo-backed caches
+        if flask_app is None:
+            return answer_with_deepseek(question, deadline=max(0.1, end - time.time()))
+        with flask_app.app_context():
+            return answer_with_deepseek(question, deadline=max(0.1, end - time.time()))
+
+    futures = {
+        batch_pool().submit(LLM_FLIGHTS.do, key, lambda q=question: _ask(q)): key
+        for key, (question, _) in pending.items()
+    }
+    # Leave answers are built while DeepSeek works
+    resolve_deferred(results, questions, deferred, emp_id)
+    if not futures:
+        return results, 0
+    done, _ = wait(futures, timeout=max(0.0, end - time.time()))
+    # Calls still running finish in the background and land in the cache
+    outcomes = {futures[f]: f.exception() or f.result() for f in done}
+    return settle_batch(results, pending, outcomes), len(pending)
+
+# === /chat-batch endpoint: several questions for one emp_id in one round trip ===
+@chatbot_bp.route("/chat-batch", methods=["POST"])
+def chatbot_batch():
+    try:
+        questions, emp_id = parse_batch_request(request.get_json(silent=True))
+        if questions is None:
+            return jsonify({"error": f"messages must be a list of 1-{CHAT_BATCH_MAX_MESSAGES} "
+                                     "non-empty strings (max 500 chars each)"}), 400
+        wait_seconds = admit_batch_request(questions, emp_id, request.headers, request.remote_addr)
+        if wait_seconds:
+            return rate_limited_response(wait_seconds)
+
+        start_time = time.time()
+        results, llm_calls = answer_batch(questions, emp_id)
+        response_time = time.time() - start_time
+        for question, result in zip(questions, results):
+            observe_request("chat-batch", result["meta"].get("source"), response_time)
+            REQUEST_LOG.record("chat-batch", question, emp_id, result["meta"], response_time)
+
+        logging.info(f"Total batch time: {response_time:.2f}s | Questions: {len(questions)} | DeepSeek calls: {llm_calls}")
+        return jsonify({
+            "responses": [dict(result, message=q) for q, result in zip(questions, results)],
+            "meta": {"count": len(questions), "llm_calls": llm_calls, "response_time": round(response_time, 3)},
+        }), 200
+
+    except Exception as e:
+        logging.error(f"Batch Endpoint Error: {str(e)}")
+        return jsonify({"error": "Internal server error"}), 500
+
+# === /cache-stats endpoint (monitoring, ops token required) ===
+@chatbot_bp.route("/cache-stats", methods=["GET"])
+@ops_only
+def cache_stats():
+    return jsonify({
+        "response_cache": RESPONSE_CACHE.stats(),
+        "semantic_cache": SEMANTIC_CACHE.stats(),
+        "leave_store": LEAVE_STORE.stats(),
+        "section_tree": SECTION_TREE.stats(),
+        "faq": FAQ_MATCHER.stats(),
+        "deepseek": LLM.stats(),
+        # Registered by chatbot_async when the worker serves asgi.py
+        "deepseek_async": LLM_INSTANCES["deepseek_async"].stats() if "deepseek_async" in LLM_INSTANCES else None,
+        "prompt_cache": dict(PROMPT_CACHE_STATS.stats(), prefix=KB.current.prompt.prefix_id),
+        "kb": KB.stats(),
+        "rate_limit": ADMISSION.stats(),
+        "request_log": REQUEST_LOG.stats(),
+        "clients": {"deepseek": client.stats(), "google_sheets": client_gsheet.stats()},
+        "single_flight": {"deepseek": LLM_FLIGHTS.stats(), "leave_sheets": LEAVE_STORE.flights.stats()},
+    }), 200
@@ -0,0 +1,175 @@
+import os
+import time
+import asyncio
+import logging
+from openai import AsyncOpenAI
+from chatbot import (
+    MODEL_NAME, DEEPSEEK_API_KEY, DEEPSEEK_BASE_URL,
+    KB, LLM, PROMPT_CACHE_STATS, resolve_locally, build_messages, truncate_reply, degraded_reply, remember_reply,
+    plan_batch, resolve_deferred, settle_batch, CHAT_BATCH_DEADLINE,
+)
+from response_cache import normalize_key
+from singleflight import AsyncSingleFlight
+from llm_resilience import AsyncResilientLLM, LLM_REQUEST_DEADLINE
+from lazy import LazyClient
+
+# === Async serving Config ===
+# Upper bound on concurrent DeepSeek calls held by one worker's event loop
+ASYNC_MAX_INFLIGHT = int(os.getenv("ASYNC_MAX_INFLIGHT", "500"))
+
+async_client = LazyClient("DeepSeek (async)",
+                          lambda: AsyncOpenAI(api_key=DEEPSEEK_API_KEY, base_url=DEEPSEEK_BASE_URL, max_retries=0))
+# Same breaker and latency percentiles as the sync client: one view of DeepSeek's health
+ASYNC_LLM = AsyncResilientLLM(async_client, breaker=LLM.breaker, latency=LLM.latency, name="deepseek_async")
+_inflight = None
+LLM_FLIGHTS_ASYNC = AsyncSingleFlight("deepseek-async")
+
+
+def _semaphore():
+    # Created lazily so it binds to the running event loop
+    global _inflight
+    if _inflight is None:
+        _inflight = asyncio.Semaphore(ASYNC_MAX_INFLIGHT)
+    return _inflight
+
+
+# === DeepSeek call with adaptive timeouts, breaker and non-blocking backoff ===
+async def call_deepseek_with_retry_async(messages, model=MODEL_NAME, max_tokens=2000, max_retries=3, stream=False,
+                                         deadline=LLM_REQUEST_DEADLINE):
+    start_time = time.time()
+    response = await ASYNC_LLM.create_async(
+        max_retries=max_retries,
+        deadline=deadline,
+        model=model,
+        messages=messages,
+        temperature=1.0,
+        max_tokens=max_tokens,
+        stream=stream
+    )
+    duration = time.time() - start_time
+    if duration > 8:
+        logging.warning(f"[DeepSeek SLOW] Took {duration:.2f}s")
+    return response
+
+
+async def resolve_locally_async(user_question, emp_id=None, meta=None):
+    # Cache/leave/birthday steps may touch Mongo (L2 cache) or Google Sheets (first load
+    # of a worksheet); run them on a thread so the event loop keeps serving other requests
+    return await asyncio.to_thread(resolve_locally, user_question, emp_id, meta)
+
+
+async def answer_with_deepseek_async(user_question, deadline=LLM_REQUEST_DEADLINE):
+    kb_version = KB.current.version
+    messages = build_messages(user_question)
+    start_time = time.time()
+    async with _semaphore():
+        response = await call_deepseek_with_retry_async(messages=messages, max_tokens=600, deadline=deadline)
+    PROMPT_CACHE_STATS.record(getattr(response, "usage", None))
+    logging.info(f"DeepSeek response time: {time.time() - start_time:.2f}s")
+
+    reply, _ = truncate_reply(response.choices[0].message.content.strip())
+    remember_reply(user_question, reply, kb_version)
+    return reply
+
+
+# === Async version of ask_deepseek ===
+async def ask_deepseek_async(user_question, emp_id=None, meta=None):
+    meta = meta if meta is not None else {}
+    user_question = user_question.strip()
+    try:
+        reply = await resolve_locally_async(user_question, emp_id, meta)
+        if reply is not None:
+            return reply
+
+        # Identical questions already waiting on DeepSeek share that call
+        reply, shared = await LLM_FLIGHTS_ASYNC.do(
+            normalize_key(user_question), lambda: answer_with_deepseek_async(user_question))
+        meta["source"] = "llm"
+        if shared:
+            meta["coalesced"] = True
+        return reply
+
+    except Exception as e:
+        logging.error(f"DeepSeek Error: {str(e)}")
+        return degraded_reply(user_question, e, meta)
+
+
+# === Async batch: local answers on a thread, DeepSeek calls concurrently on the loop ===
+async def answer_batch_async(questions, emp_id=None, deadline=CHAT_BATCH_DEADLINE):
+    loop = asyncio.get_running_loop()
+    end = loop.time() + deadline
+    results, pending, deferred = await asyncio.to_thread(plan_batch, questions, emp_id)
+    tasks = {
+        asyncio.ensure_future(LLM_FLIGHTS_ASYNC.do(
+            key, lambda q=question: answer_with_deepseek_async(q, deadline=max(0.1, end - loop.time())))): key
+        for key, (question, _) in pending.items()
+    }
+    # Leave answers are built while DeepSeek works
+    if deferred:
+        await asyncio.to_thread(resolve_deferred, results, questions, deferred, emp_id)
+    if not tasks:
+        return results, 0
+    done, not_done = await asyncio.wait(tasks, timeout=max(0.0, end - loop.time()))
+    # Only our waits are cancelled; the shared DeepSeek calls finish and land in the cache
+    for task in not_done:
+        task.cancel()
+    outcomes = {tasks[t]: t.exception() or t.result() for t in done}
+    return settle_batch(results, pending, outcomes), len(pending)
+
+
+# === Async streaming variant (same two-sentence cutoff as chatbot.stream_deepseek) ===
+async def stream_deepseek_async(user_question, emp_id=None, meta=None):
+    meta = meta if meta is not None else {}
+    user_question = user_question.strip()
+    try:
+        reply = await resolve_locally_async(user_question, emp_id, meta)
+    except Exception as e:
+        logging.error(f"[STREAM] Local lookup error: {str(e)}")
+        reply = None
+    if reply is not None:
+        yield reply
+        return
+
+    stream = None
+    buffer = ""
+    sent = 0
+    completed = False
+    kb_version = KB.current.version
+    try:
+        async with _semaphore():
+            start_time = time.time()
+            stream = await call_deepseek_with_retry_async(
+                messages=build_messages(user_question), max_tokens=600, stream=True)
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content or ""
+                if not delta:
+                    continue
+                buffer += delta
+                visible, was_cut = truncate_reply(buffer.lstrip())
+                if len(visible) > sent:
+                    yield visible[sent:]
+                    sent = len(visible)
+                if was_cut:
+                    logging.info("[STREAM] Two-sentence cutoff reached, closing upstream early")
+                    break
+            completed = True
+            meta["source"] = "llm"
+            logging.info(f"DeepSeek stream time: {time.time() - start_time:.2f}s")
+    except Exception as e:
+        logging.error(f"[STREAM] DeepSeek Error: {str(e)}")
+        if not sent:
+            yield degraded_reply(user_question, e, meta)
+    finally:
+        if stream is not None:
+            try:
+                await stream.close()
+            except Exception:
+                pass
+
+    if completed:
+        reply, _ = truncate_reply(buffer.strip())
+        if reply:
+            remember_reply(user_question, reply, kb_version)
+
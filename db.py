@@ -1,8 +1,20 @@
 import os
+import time
+import queue
+import logging
+import threading
+from contextlib import contextmanager
 import mysql.connector
+from metrics import backend_timer
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
+# === Pool Config ===
+MYSQL_POOL_SIZE = int(os.getenv("MYSQL_POOL_SIZE", "5"))
+MYSQL_POOL_TIMEOUT = float(os.getenv("MYSQL_POOL_TIMEOUT", "5"))          # max seconds to wait for a free connection
+MYSQL_POOL_RECYCLE = int(os.getenv("MYSQL_POOL_RECYCLE", "1800"))         # reconnect connections older than this
+MYSQL_POOL_PING_AFTER = int(os.getenv("MYSQL_POOL_PING_AFTER", "30"))     # health-check connections idle longer than this
+
 def get_db_connection():
     return mysql.connector.connect(
         host="sanathanamysql.mysql.database.azure.com",
@@ -11,3 +23,162 @@ def get_db_connection():
         database="sanathana_chatbot_db",
         ssl_ca=os.path.join(BASE_DIR, "DigiCertGlobalRootG2.crt.pem")
     )
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+# === Connection pool (per worker process) ===
+class ConnectionPool:
+    """
+    Keeps up to `size` open MySQL connections per process.
+    Idle connections are health-checked on checkout and recycled when older than `recycle`.
+    After a fork (gunicorn workers) the child starts with an empty pool.
+    """
+
+    def __init__(self, connect=get_db_connection, size=MYSQL_POOL_SIZE, timeout=MYSQL_POOL_TIMEOUT,
+                 recycle=MYSQL_POOL_RECYCLE, ping_after=MYSQL_POOL_PING_AFTER):
+        self.connect = connect
+        self.size = size
+        self.timeout = timeout
+        self.recycle = recycle
+        self.ping_after = ping_after
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._stats_lock = threading.Lock()
+        self._idle = queue.LifoQueue()              # (conn, created_at, last_used)
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._created_at = {}                       # id(conn) -> created_at for checked-out connections
+        self.stats_data = {
+            "checkouts": 0,
+            "created": 0,
+            "recycled": 0,
+            "health_check_failures": 0,
+            "timeouts": 0,
+            "discarded": 0,
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0,
+        }
+
+    def after_fork(self):
+        # Connections inherited from the parent share its sockets; drop them without closing
+        self._reset()
+
+    def _ensure_process(self):
+        if self._pid != os.getpid():
+            self.after_fork()
+
+    def _count(self, key, value=1):
+        with self._stats_lock:
+            self.stats_data[key] += value
+
+    def _new_connection(self):
+        conn = self.connect()
+        if not conn:
+            raise Exception("Database connection failed.")
+        self._count("created")
+        return conn, time.time()
+
+    def acquire(self):
+        self._ensure_process()
+        start = time.time()
+        if not self._slots.acquire(timeout=self.timeout):
+            self._count("timeouts")
+            logging.warning(f"⚠️ MySQL pool exhausted: waited {self.timeout}s for a connection")
+            raise PoolTimeout(f"No MySQL connection available within {self.timeout}s")
+        waited = time.time() - start
+        with self._stats_lock:
+            self.stats_data["checkouts"] += 1
+            self.stats_data["wait_seconds_total"] += waited
+            self.stats_data["wait_seconds_max"] = max(self.stats_data["wait_seconds_max"], waited)
+
+        try:
+            while True:
+                try:
+                    conn, created_at, last_used = self._idle.get_nowait()
+                except queue.Empty:
+                    conn, created_at = self._new_connection()
+                    break
+                now = time.time()
+                if now - created_at > self.recycle:
+                    self._count("recycled")
+                    self._close(conn)
+                    continue
+                if now - last_used > self.ping_after and not self._healthy(conn):
+                    self._count("health_check_failures")
+                    self._close(conn)
+                    continue
+                break
+        except Exception:
+            self._slots.release()
+            raise
+        self._created_at[id(conn)] = created_at
+        return conn
+
+    def release(self, conn, discard=False):
+        created_at = self._created_at.pop(id(conn), time.time())
+        if self._pid != os.getpid():
+            return
+        if not discard:
+            # End any open transaction so the next user doesn't read a stale snapshot
+            try:
+                conn.rollback()
+            except Exception:
+                discard = True
+        if discard:
+            self._count("discarded")
+            self._close(conn)
+        else:
+            self._idle.put((conn, created_at, time.time()))
+        self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        with backend_timer("mysql", "acquire"):
+            conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    @staticmethod
+    def _healthy(conn):
+        try:
+            return conn.is_connected()
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def stats(self):
+        with self._stats_lock:
+            data = dict(self.stats_data)
+        data["size"] = self.size
+        data["idle"] = self._idle.qsize()
+        data["in_use"] = len(self._created_at)
+        data["wait_seconds_avg"] = round(data["wait_seconds_total"] / data["checkouts"], 6) if data["checkouts"] else 0.0
+        return data
+
+
+POOL = ConnectionPool()
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=POOL.after_fork)
+
+
+def db_connection():
+    """
+    Usage: `with db_connection() as conn:` — checks a pooled connection out and back in.
+    """
+    return POOL.connection()
+
+
+def pool_stats():
+    return POOL.stats()
@@ -0,0 +1,153 @@
+import re
+import difflib
+from datetime import date, datetime, timedelta
+
+RECORD_RE = re.compile(r"Employee ID\s*:\s*(?P<emp_id>[A-Za-z0-9]+)", re.IGNORECASE)
+NAME_RE = re.compile(r"EMPLOYEE NAME\s*:\s*(?P<name>.+?)\s*(?:,|DATE OF BIRTH|$)", re.IGNORECASE)
+DOB_RE = re.compile(r"DATE OF BIRTH\s*:\s*(?P<dob>[0-9]{1,2}-[0-9]{1,2}-[0-9]{4})", re.IGNORECASE)
+WORD_RE = re.compile(r"[a-z]+")
+
+# Words in a question that are never part of a name
+QUESTION_WORDS = {
+    "what", "when", "which", "who", "whose", "is", "are", "the", "of", "in", "on", "for", "date",
+    "birth", "birthday", "birthdays", "bday", "dob", "tell", "me", "please", "upcoming", "next",
+    "this", "month", "week", "days", "today", "tomorrow", "coming", "employee", "employees", "and",
+    "my", "your", "his", "her", "their", "any", "all", "list", "show", "has", "have",
+    "january", "february", "march", "april", "may", "june",
+    "july", "august", "september", "october", "november", "december",
+}
+
+
+class Employee:
+    __slots__ = ("emp_id", "name", "name_lower", "tokens", "dob", "dob_raw")
+
+    def __init__(self, emp_id, name, dob_raw):
+        self.emp_id = emp_id
+        self.name = name
+        self.name_lower = name.lower()
+        self.tokens = tuple(WORD_RE.findall(self.name_lower))
+        self.dob_raw = dob_raw
+        try:
+            self.dob = datetime.strptime(dob_raw, "%d-%m-%Y").date() if dob_raw else None
+        except ValueError:
+            self.dob = None
+
+    def birthday_line(self):
+        if self.dob:
+            return f"{self.name}'s birthday is {self.dob.strftime('%d-%b-%Y')}."
+        if self.dob_raw:
+            return f"{self.name}'s birthday is {self.dob_raw}."
+        return None
+
+
+def parse_employees(kb_text):
+    """
+    One record per KB line: "Employee ID: X, EMPLOYEE NAME : Y, DATE OF BIRTH: dd-mm-yyyy, ..."
+    Records without a date of birth are kept (dob=None).
+    """
+    employees = []
+    for line in kb_text.splitlines():
+        id_match = RECORD_RE.search(line)
+        name_match = NAME_RE.search(line)
+        if not id_match or not name_match:
+            continue
+        name = name_match.group("name").strip().rstrip(".").strip()
+        dob_match = DOB_RE.search(line)
+        employees.append(Employee(id_match.group("emp_id"), name, dob_match.group("dob") if dob_match else None))
+    return employees
+
+
+# === Employee directory: month index + name prefix index, built once per KB load ===
+class EmployeeDirectory:
+    def __init__(self, kb_text):
+        self.employees = parse_employees(kb_text)
+        self.by_month = {m: [] for m in range(1, 13)}
+        self.by_token = {}
+        self.by_prefix = {}
+        for emp in self.employees:
+            if emp.dob:
+                self.by_month[emp.dob.month].append(emp)
+            for tok in emp.tokens:
+                self.by_token.setdefault(tok, []).append(emp)
+                for i in range(2, len(tok) + 1):
+                    self.by_prefix.setdefault(tok[:i], []).append(emp)
+        for emps in self.by_month.values():
+            emps.sort(key=lambda e: e.dob.day)
+        self._token_list = sorted(self.by_token)
+
+    def __len__(self):
+        return len(self.employees)
+
+    def birthdays_in_month(self, month_num):
+        return [f"{e.name} - {e.dob.strftime('%d-%b')}" for e in self.by_month.get(month_num, [])]
+
+    def find(self, name, limit=5):
+        """
+        Exact name token, then token prefix, then substring of the full name, then fuzzy token match.
+        """
+        query = name.strip().lower()
+        if not query:
+            return []
+        words = WORD_RE.findall(query)
+        if len(words) == 1:
+            word = words[0]
+            for index in (self.by_token, self.by_prefix):
+                if word in index:
+                    return _unique(index[word])[:limit]
+        matches = [e for e in self.employees if query in e.name_lower]
+        if matches:
+            return matches[:limit]
+        fuzzy = []
+        for word in words:
+            for tok in difflib.get_close_matches(word, self._token_list, n=3, cutoff=0.8):
+                fuzzy.extend(self.by_token[tok])
+        return _unique(fuzzy)[:limit]
+
+    def find_in_question(self, question, limit=5):
+        """
+        Employees whose name tokens appear in the question ("when is shiva kumar's birthday").
+        If several words match, prefer employees matching all of them.
+        """
+        words = [w for w in WORD_RE.findall(question.lower().replace("'s", "")) if w not in QUESTION_WORDS]
+        hits = [set(map(id, self.by_token[w])) for w in words if w in self.by_token]
+        if not hits:
+            return []
+        best = set.intersection(*hits) or set.union(*hits)
+        return [e for e in self.employees if id(e) in best][:limit]
+
+    def upcoming_birthdays(self, days, today=None):
+        """
+        Returns [(employee, next_birthday, days_until)] for birthdays within `days` days, soonest first.
+        """
+        today = today or date.today()
+        upcoming = []
+        for emp in self.employees:
+            if not emp.dob:
+                continue
+            nxt = _next_birthday(emp.dob, today)
+            delta = (nxt - today).days
+            if delta <= days:
+                upcoming.append((emp, nxt, delta))
+        upcoming.sort(key=lambda item: item[2])
+        return upcoming
+
+
+def _unique(emps):
+    seen, out = set(), []
+    for e in emps:
+        if id(e) not in seen:
+            seen.add(id(e))
+            out.append(e)
+    return out
+
+
+def _next_birthday(dob, today):
+    for year in (today.year, today.year + 1):
+        try:
+            candidate = dob.replace(year=year)
+        except ValueError:
+            # 29-Feb in a non-leap year: celebrate on 28-Feb
+            candidate = date(year, 2, 28)
+        if candidate >= today:
+            return candidate
+    return today + timedelta(days=366)
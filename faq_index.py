@@ -0,0 +1,167 @@
+import os
+import math
+import difflib
+import logging
+import threading
+from response_cache import normalize_key
+from semantic_cache import _guard_terms
+from kb_index import tokenize
+
+# === FAQ matching Config ===
+FAQ_MATCH_ENABLED = os.getenv("FAQ_MATCH_ENABLED", "1") == "1"
+# Combined score needed before a curated answer is returned instead of calling DeepSeek
+FAQ_MATCH_THRESHOLD = float(os.getenv("FAQ_MATCH_THRESHOLD", "0.82"))
+FAQ_MAX_CANDIDATES = int(os.getenv("FAQ_MAX_CANDIDATES", "20"))
+# The best match must beat the runner-up by this much, otherwise the question is ambiguous
+FAQ_MIN_MARGIN = float(os.getenv("FAQ_MIN_MARGIN", "0.03"))
+FAQ_TOKEN_WEIGHT = 0.6      # idf-weighted token overlap; the rest is the fuzzy string ratio
+FAQ_TYPO_CUTOFF = 0.85
+
+
+# === Inverted index over the flattened Q&A corpus ===
+class FAQIndex:
+    """
+    Built from flatten_questions() output. A question is scored against the
+    candidates sharing at least one (possibly typo-corrected) token:
+      token score = idf-weighted Dice overlap of content tokens
+      fuzzy score = difflib ratio of the normalized question strings
+    Query words the corpus has never seen ("interns", "maternity") count at the
+    highest idf: they make the question more specific than any stored one.
+    Numbers and month names must agree, as in the semantic cache.
+    """
+
+    def __init__(self, entries, version=None):
+        self.version = version
+        self.entries = []
+        self.postings = {}          # token -> [entry position]
+        seen = set()
+        for item in entries:
+            question = (item.get("question") or "").strip()
+            answer = (item.get("answer") or "").strip()
+            key = normalize_key(question)
+            if not key or not answer or key in seen:
+                continue
+            seen.add(key)
+            tokens = set(tokenize(question))
+            pos = len(self.entries)
+            self.entries.append({
+                "question": question,
+                "answer": answer,
+                "section": item.get("section"),
+                "sub_section": item.get("sub_section"),
+                "key": key,
+                "tokens": tokens,
+                "guard": _guard_terms(key),
+            })
+            for tok in tokens:
+                self.postings.setdefault(tok, []).append(pos)
+        n = len(self.entries)
+        self.idf = {tok: math.log(1 + n / len(ids)) for tok, ids in self.postings.items()}
+        self.unknown_idf = math.log(1 + n)     # as rare as a word in a single entry
+        self._vocab = sorted(self.postings)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _query_tokens(self, question):
+        """
+        Returns (indexed tokens, number of words not in the index).
+        """
+        tokens = set()
+        unknown = set()
+        for tok in tokenize(question):
+            if tok in self.postings:
+                tokens.add(tok)
+                continue
+            # Typo tolerance: map an unknown word onto the closest indexed word
+            close = difflib.get_close_matches(tok, self._vocab, n=1, cutoff=FAQ_TYPO_CUTOFF) if len(tok) > 3 else []
+            if close:
+                tokens.update(close)
+            elif len(tok) > 2:     # not the "s" of "what's"
+                unknown.add(tok)
+        return tokens, len(unknown)
+
+    def search(self, question, limit=1):
+        """
+        Returns [(score, entry)] best first.
+        """
+        key = normalize_key(question)
+        tokens, unknown = self._query_tokens(question)
+        if not key or not tokens:
+            return []
+        counts = {}
+        for tok in tokens:
+            for pos in self.postings[tok]:
+                counts[pos] = counts.get(pos, 0.0) + self.idf[tok]
+        candidates = sorted(counts, key=counts.get, reverse=True)[:FAQ_MAX_CANDIDATES]
+
+        guard = _guard_terms(key)
+        query_weight = sum(self.idf[t] for t in tokens) + unknown * self.unknown_idf
+        scored = []
+        for pos in candidates:
+            entry = self.entries[pos]
+            if entry["guard"] != guard:
+                continue
+            entry_weight = sum(self.idf.get(t, 0.0) for t in entry["tokens"])
+            token_score = 2 * counts[pos] / (query_weight + entry_weight)
+            fuzzy_score = difflib.SequenceMatcher(None, key, entry["key"]).ratio()
+            score = FAQ_TOKEN_WEIGHT * token_score + (1 - FAQ_TOKEN_WEIGHT) * fuzzy_score
+            scored.append((score, entry))
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return scored[:limit]
+
+
+# === Current FAQ index, rebuilt whenever the section tree changes ===
+class FAQMatcher:
+    def __init__(self, threshold=FAQ_MATCH_THRESHOLD, min_margin=FAQ_MIN_MARGIN):
+        self.threshold = threshold
+        self.min_margin = min_margin
+        self.index = FAQIndex([])
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.rebuilds = 0
+
+    def rebuild(self, entries, version=None):
+        index = FAQIndex(entries, version)
+        with self._lock:
+            self.index = index      # atomic swap
+            self.rebuilds += 1
+        logging.info(f"❓ FAQ index built: {len(index)} questions, {len(index.postings)} terms, version {version}")
+        return index
+
+    def match(self, question):
+        """
+        Returns {question, answer, section, sub_section, score}, or None when the best
+        match is below the threshold or too close to the runner-up.
+        """
+        results = self.index.search(question, limit=2)
+        confident = results and results[0][0] >= self.threshold and (
+            len(results) == 1 or results[0][0] - results[1][0] >= self.min_margin)
+        if confident:
+            score, entry = results[0]
+            self.hits += 1
+            return {
+                "question": entry["question"],
+                "answer": entry["answer"],
+                "section": entry["section"],
+                "sub_section": entry["sub_section"],
+                "score": round(score, 3),
+            }
+        self.misses += 1
+        return None
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "enabled": FAQ_MATCH_ENABLED,
+            "version": self.index.version,
+            "questions": len(self.index),
+            "terms": len(self.index.postings),
+            "threshold": self.threshold,
+            "min_margin": self.min_margin,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "rebuilds": self.rebuilds,
+        }
@@ -0,0 +1,34 @@
+import gc
+import os
+import time
+
+# === Gunicorn settings (used by startup.sh for both serving modes) ===
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "800"))
+workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+# Threaded workers: a request waiting on DeepSeek, Sheets or bcrypt holds one thread,
+# not the whole worker (SERVING_MODE=asgi overrides this with -k uvicorn)
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+
+# Import the app (KB text, retrieval index, employee directory) once in the
+# master; workers share those pages copy-on-write instead of rebuilding them.
+preload_app = os.getenv("GUNICORN_PRELOAD", "1") == "1"
+
+_master_started = time.time()
+
+
+def when_ready(server):
+    if preload_app:
+        # Keep the preloaded objects out of the GC's reach so collections in
+        # the workers don't touch (and un-share) their pages
+        gc.freeze()
+    server.log.info(f"🚀 Master ready in {time.time() - _master_started:.2f}s (preload={preload_app})")
+
+
+def post_fork(server, worker):
+    # Network clients and background threads must not exist before fork
+    started = time.time()
+    from app import start_warm_up
+    start_warm_up()
+    server.log.info(f"👷 Worker {worker.pid} serving after {time.time() - started:.2f}s; clients warming in background")
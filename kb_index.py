@@ -0,0 +1,210 @@
+import os
+import re
+import logging
+import numpy as np
+
+# === Retrieval Config ===
+# KB_RETRIEVAL_MODE: "retrieval" sends only the top-k chunks, "full" sends the whole KB (old behaviour)
+KB_RETRIEVAL_MODE = os.getenv("KB_RETRIEVAL_MODE", "retrieval").strip().lower()
+KB_TOP_K = int(os.getenv("KB_TOP_K", "6"))
+KB_TOKEN_BUDGET = int(os.getenv("KB_TOKEN_BUDGET", "1800"))
+KB_CHUNK_CHARS = int(os.getenv("KB_CHUNK_CHARS", "900"))
+
+# BM25 parameters
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+QUOTE_LINE_RE = re.compile(r'^\s*(#.*|(knowledge_text\s*=\s*)?""")\s*$')
+
+STOPWORDS = {
+    "a", "an", "the", "is", "are", "was", "were", "be", "been", "am", "do", "does", "did",
+    "of", "to", "in", "on", "at", "for", "by", "with", "from", "as", "and", "or", "not",
+    "what", "which", "who", "whom", "when", "where", "why", "how", "can", "could", "should",
+    "would", "will", "shall", "may", "i", "me", "my", "we", "our", "you", "your", "it", "its",
+    "this", "that", "these", "those", "there", "tell", "about", "please", "any", "if", "so",
+}
+
+
+def estimate_tokens(text):
+    # Rough heuristic (~4 chars per token), good enough for budgeting
+    return max(1, len(text) // 4)
+
+
+def tokenize(text):
+    tokens = []
+    for tok in TOKEN_RE.findall(text.lower()):
+        if tok in STOPWORDS:
+            continue
+        # Light plural folding so "leaves" matches "leave"
+        if len(tok) > 3 and tok.endswith("s") and not tok.endswith("ss"):
+            tok = tok[:-1]
+        tokens.append(tok)
+    return tokens
+
+
+# === Helper: Detect section headings in kb_content.txt ===
+def _heading(raw_line):
+    """
+    Returns (level, title) for a heading line, otherwise None.
+    Headings are unindented, short, and either end with ':' or have no ':' at all.
+    ALL-CAPS headings start a top-level section (level 1), others a sub-section (level 2).
+    """
+    line = raw_line.strip()
+    if not line or raw_line[:1] in (" ", "\t"):
+        return None
+    if line[0] in "•-*" or line[0].isdigit() or line.endswith("."):
+        return None
+    if line.endswith(":"):
+        if len(line) > 160:
+            return None
+    elif ":" in line or len(line) > 100:
+        return None
+    title = line.rstrip(":").strip()
+    level = 1 if title.upper() == title else 2
+    return level, title
+
+
+def chunk_kb(text, max_chars=KB_CHUNK_CHARS):
+    """
+    Splits the KB into section-aware chunks.
+    Each chunk is a dict with section, sub_section and text (prefixed with its heading path).
+    Paragraphs are packed up to max_chars; long paragraphs (e.g. employee records) are split by line.
+    """
+    chunks = []
+    section, sub_section = "GENERAL", ""
+    paragraphs = []
+    current = []
+
+    def flush_paragraph():
+        if current:
+            paragraphs.append("\n".join(current))
+            current.clear()
+
+    def flush_section():
+        flush_paragraph()
+        if not paragraphs:
+            return
+        heading = section + (f" > {sub_section}" if sub_section else "")
+        pieces = []
+        for para in paragraphs:
+            if len(para) <= max_chars:
+                pieces.append(para)
+                continue
+            buf = []
+            for line in para.split("\n"):
+                if buf and sum(len(b) + 1 for b in buf) + len(line) > max_chars:
+                    pieces.append("\n".join(buf))
+                    buf = []
+                buf.append(line)
+            if buf:
+                pieces.append("\n".join(buf))
+
+        body = []
+        for piece in pieces:
+            if body and sum(len(b) + 2 for b in body) + len(piece) > max_chars:
+                chunks.append({"section": section, "sub_section": sub_section,
+                               "text": heading + ":\n" + "\n\n".join(body)})
+                body = []
+            body.append(piece)
+        if body:
+            chunks.append({"section": section, "sub_section": sub_section,
+                           "text": heading + ":\n" + "\n\n".join(body)})
+        paragraphs.clear()
+
+    for raw_line in text.splitlines():
+        if QUOTE_LINE_RE.match(raw_line):
+            continue
+        head = _heading(raw_line)
+        if head:
+            flush_section()
+            level, title = head
+            if level == 1:
+                section, sub_section = title, ""
+            else:
+                sub_section = title
+            continue
+        if not raw_line.strip():
+            flush_paragraph()
+            continue
+        current.append(raw_line.rstrip())
+    flush_section()
+    return chunks
+
+
+# === BM25 Index over KB chunks ===
+class KBIndex:
+    def __init__(self, text, max_chars=KB_CHUNK_CHARS):
+        self.full_text = text
+        self.chunks = chunk_kb(text, max_chars)
+        for i, chunk in enumerate(self.chunks):
+            chunk["id"] = i
+            chunk["tokens"] = estimate_tokens(chunk["text"])
+        # The company overview before the first heading is useful context for almost every question
+        self.pinned = [c for c in self.chunks if c["section"] == "GENERAL"]
+
+        docs = [tokenize(c["text"]) for c in self.chunks]
+        vocab = {}
+        for doc in docs:
+            for tok in doc:
+                vocab.setdefault(tok, len(vocab))
+        self.vocab = vocab
+
+        n_docs, n_terms = len(docs), len(vocab)
+        tf = np.zeros((n_docs, n_terms), dtype=np.float32)
+        for d, doc in enumerate(docs):
+            for tok in doc:
+                tf[d, vocab[tok]] += 1.0
+
+        doc_len = tf.sum(axis=1)
+        avg_len = float(doc_len.mean()) if n_docs else 0.0
+        df = (tf > 0).sum(axis=0)
+        idf = np.log(1.0 + (n_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+        norm = BM25_K1 * (1.0 - BM25_B + BM25_B * doc_len / (avg_len or 1.0))
+        # Precomputed per-(chunk, term) BM25 weights; a query is a column sum
+        self.weights = (idf * tf * (BM25_K1 + 1.0) / (tf + norm[:, None])).astype(np.float32)
+        logging.info(f"📚 KB index built: {n_docs} chunks, {n_terms} terms")
+
+    def search(self, question, top_k=KB_TOP_K):
+        term_ids = [self.vocab[t] for t in set(tokenize(question)) if t in self.vocab]
+        if not term_ids or not self.chunks:
+            return []
+        scores = self.weights[:, term_ids].sum(axis=1)
+        k = min(top_k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(float(scores[i]), self.chunks[i]) for i in top if scores[i] > 0]
+
+    def build_context(self, question, top_k=KB_TOP_K, token_budget=KB_TOKEN_BUDGET):
+        """
+        Returns the most relevant chunks (in KB order) that fit in token_budget,
+        or None when nothing in the KB matches the question.
+        """
+        hits = self.search(question, top_k)
+        if not hits:
+            return None
+        selected, used = [], 0
+        pinned_ids = {c["id"] for c in self.pinned}
+        candidates = self.pinned + [c for _, c in hits if c["id"] not in pinned_ids]
+        for chunk in candidates:
+            if used + chunk["tokens"] > token_budget:
+                continue
+            selected.append(chunk)
+            used += chunk["tokens"]
+        if not selected:
+            return None
+        selected.sort(key=lambda c: c["id"])
+        return "\n\n".join(c["text"] for c in selected)
+
+    def context_for(self, question, mode=None):
+        """
+        Returns (context_text, mode_used) for the prompt.
+        Falls back to the full KB when retrieval is disabled or finds nothing relevant.
+        """
+        mode = mode or KB_RETRIEVAL_MODE
+        if mode != "full":
+            context = self.build_context(question)
+            if context:
+                return context, "retrieval"
+        return self.full_text, "full"
+
@@ -0,0 +1,122 @@
+import os
+import time
+import hashlib
+import logging
+import threading
+from kb_index import KBIndex
+from employee_directory import EmployeeDirectory
+from prompt_prefix import PromptBuilder
+from lazy import ProcessThread
+
+# === KB reload Config ===
+KB_RELOAD_ENABLED = os.getenv("KB_RELOAD_ENABLED", "1") == "1"
+KB_RELOAD_SECONDS = int(os.getenv("KB_RELOAD_SECONDS", "30"))
+
+
+# === Immutable snapshot of kb_content.txt and everything derived from it ===
+class KBSnapshot:
+    def __init__(self, text, mtime=None):
+        self.text = text
+        self.version = hashlib.sha1(text.encode("utf-8")).hexdigest()[:12]
+        self.mtime = mtime
+        self.loaded_at = time.time()
+        self.index = KBIndex(text)
+        self.directory = EmployeeDirectory(text)
+        self.prompt = PromptBuilder(self.index, self.version)
+
+
+# === Versioned knowledge base, reloaded when the file changes ===
+class KBManager:
+    """
+    Holds the current KBSnapshot. A background thread polls the file's
+    mtime/size every KB_RELOAD_SECONDS; when the content hash changes, the new
+    snapshot is built on that thread and swapped in with a single assignment,
+    so requests always see one consistent version. Listeners (cache
+    invalidation) run after the swap. A file that fails to parse keeps the
+    previous version.
+    """
+
+    def __init__(self, path, reload_seconds=KB_RELOAD_SECONDS):
+        self.path = path
+        self.reload_seconds = reload_seconds
+        self._snapshot = None
+        self._stat = None
+        self._lock = threading.Lock()
+        self._watcher = ProcessThread("kb-watch", self._watch_loop)
+        self.listeners = []
+        self.reloads = 0
+        self.errors = 0
+
+    @property
+    def current(self):
+        return self._snapshot
+
+    def _file_stat(self):
+        st = os.stat(self.path)
+        return st.st_mtime, st.st_size
+
+    def load(self):
+        """
+        Reads the file and swaps in a new snapshot if its content changed.
+        Returns True when the version changed.
+        """
+        with self._lock:
+            stat = self._file_stat()
+            with open(self.path, "r", encoding="utf-8") as f:
+                text = f.read()
+            self._stat = stat
+            previous = self._snapshot
+            if previous is not None and hashlib.sha1(text.encode("utf-8")).hexdigest()[:12] == previous.version:
+                return False    # touched but unchanged
+            if not text.strip():
+                raise ValueError(f"{self.path} is empty")
+            snapshot = KBSnapshot(text, mtime=stat[0])
+            self._snapshot = snapshot   # atomic swap
+            self.reloads += 1
+        logging.info(f"📚 KB version {snapshot.version} loaded: {len(text)} chars, "
+                     f"{len(snapshot.directory)} employees")
+        if previous is not None:
+            for listener in self.listeners:
+                try:
+                    listener(snapshot)
+                except Exception as e:
+                    logging.warning(f"[KB] Listener failed: {e}")
+        return True
+
+    def check(self):
+        """
+        Reloads if the file's mtime or size moved since the last load.
+        """
+        try:
+            if self._file_stat() == self._stat:
+                return False
+            return self.load()
+        except Exception as e:
+            self.errors += 1
+            logging.warning(f"[KB] Reload failed, keeping version {self._snapshot.version}: {e}")
+            return False
+
+    def on_change(self, listener):
+        self.listeners.append(listener)
+
+    # === Background watcher (one thread per process) ===
+    def start(self):
+        if KB_RELOAD_ENABLED:
+            self._watcher.ensure()
+
+    def _watch_loop(self):
+        while True:
+            time.sleep(self.reload_seconds)
+            self.check()
+
+    def stats(self):
+        snapshot = self._snapshot
+        return {
+            "version": snapshot.version if snapshot else None,
+            "chars": len(snapshot.text) if snapshot else 0,
+            "loaded_at": round(snapshot.loaded_at, 3) if snapshot else None,
+            "employees": len(snapshot.directory) if snapshot else 0,
+            "watching": self._watcher.running,
+            "reloads": self.reloads,
+            "errors": self.errors,
+        }
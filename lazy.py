@@ -0,0 +1,157 @@
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+
+
+# === Client created on first use, once per process ===
+class LazyClient:
+    """
+    Proxy for an external client (OpenAI, gspread, Mongo database) that is
+    built by `factory` on first attribute access instead of at import time.
+    Network clients are not fork-safe, so a forked gunicorn worker builds its
+    own instance instead of inheriting the master's.
+    """
+
+    def __init__(self, name, factory):
+        self._name = name
+        self._factory = factory
+        self._instance = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self.init_seconds = None
+        self.errors = 0
+
+    def get(self):
+        pid = os.getpid()
+        if self._pid == pid:
+            return self._instance
+        with self._lock:
+            if self._pid != pid:
+                start = time.time()
+                try:
+                    self._instance = self._factory()
+                except Exception:
+                    self.errors += 1
+                    raise
+                self.init_seconds = round(time.time() - start, 4)
+                self._pid = pid
+                logging.info(f"🔌 {self._name} client ready in {self.init_seconds:.3f}s")
+        return self._instance
+
+    @property
+    def ready(self):
+        return self._pid == os.getpid()
+
+    def __getattr__(self, attr):
+        if attr.startswith("_"):
+            raise AttributeError(attr)
+        return getattr(self.get(), attr)
+
+    def __getitem__(self, key):
+        return self.get()[key]
+
+    def stats(self):
+        return {"ready": self.ready, "init_seconds": self.init_seconds, "errors": self.errors}
+
+
+# === Background thread started once per process ===
+class ProcessThread:
+    """
+    Runs `target` on a daemon thread, started by the first ensure() call in
+    each process. Threads do not survive fork, so a gunicorn worker starts
+    its own instead of relying on one the master started before forking.
+    """
+
+    def __init__(self, name, target):
+        self.name = name
+        self.target = target
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def ensure(self):
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._lock:
+            if self._pid == pid:
+                return
+            threading.Thread(target=self.target, name=self.name, daemon=True).start()
+            self._pid = pid
+
+    @property
+    def running(self):
+        return self._pid == os.getpid()
+
+
+# === Skip an optional backend for a while after it fails ===
+class Backoff:
+    """
+    After fail(), available() is False for `seconds`, so callers bypass an
+    optional backend (Mongo L2 cache, shared rate-limit counters) instead of
+    waiting on it in every request while it is down.
+    """
+
+    def __init__(self, label, seconds, fallback):
+        self.label = label          # log prefix, e.g. "SHARED CACHE"
+        self.seconds = seconds
+        self.fallback = fallback    # what happens meanwhile, e.g. "bypassing L2"
+        self._until = 0.0
+        self.errors = 0
+
+    def available(self):
+        return time.time() >= self._until
+
+    def fail(self, error):
+        self.errors += 1
+        self._until = time.time() + self.seconds
+        logging.warning(f"[{self.label}] Mongo error, {self.fallback} for {self.seconds}s: {error}")
+
+    @property
+    def bypassed(self):
+        return not self.available()
+
+
+# === Startup timing report ===
+class StartupTimer:
+    def __init__(self):
+        self.started = time.time()
+        self.steps = {}
+
+    @contextmanager
+    def step(self, name):
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.steps[name] = round(time.time() - start, 4)
+
+    def total(self):
+        return round(time.time() - self.started, 4)
+
+    def report(self):
+        return {"total_seconds": self.total(), "steps": dict(self.steps)}
+
+    def log(self, label="Startup"):
+        steps = ", ".join(f"{k} {v:.3f}s" for k, v in self.steps.items())
+        logging.info(f"🚀 {label}: {self.total():.3f}s ({steps})")
+
+
+STARTUP = StartupTimer()
+
+
+def warm_in_background(name, tasks):
+    """
+    Runs each (label, fn) in a daemon thread so the worker can serve /health
+    immediately; failures are logged and retried lazily on first real use.
+    """
+    def _run():
+        for label, fn in tasks:
+            start = time.time()
+            try:
+                fn()
+                logging.info(f"🔥 Warm-up {label} done in {time.time() - start:.3f}s")
+            except Exception as e:
+                logging.warning(f"⚠️ Warm-up {label} failed: {e}")
+    threading.Thread(target=_run, name=name, daemon=True).start()
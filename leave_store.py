@@ -0,0 +1,201 @@
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+import gspread
+from singleflight import SingleFlight
+from lazy import ProcessThread
+from metrics import backend_timer
+
+# === Leave cache Config ===
+LEAVE_REFRESH_SECONDS = int(os.getenv("LEAVE_REFRESH_SECONDS", "300"))
+# Only re-download worksheets when the spreadsheet's Drive modifiedTime changed
+LEAVE_CHECK_MODIFIED = os.getenv("LEAVE_CHECK_MODIFIED", "1") == "1"
+# Worksheets kept in memory (least recently used dropped first)
+LEAVE_MAX_SHEETS = int(os.getenv("LEAVE_MAX_SHEETS", "12"))
+# "<Month> <Year>" names outside [current year - LEAVE_YEARS_BACK, current year] are never fetched
+LEAVE_YEARS_BACK = int(os.getenv("LEAVE_YEARS_BACK", "2"))
+
+
+def row_emp_id(row):
+    return str(row.get("EMP ID")).strip()
+
+
+def worksheet_name_for(year, month):
+    return datetime(year, month, 1).strftime("%B %Y")
+
+
+def recent_worksheet_names(today=None):
+    """
+    The current and previous month's worksheet names.
+    """
+    today = today or datetime.now()
+    previous = (today.year, today.month - 1) if today.month > 1 else (today.year - 1, 12)
+    return [worksheet_name_for(today.year, today.month), worksheet_name_for(*previous)]
+
+
+def valid_worksheet_name(name, today=None, years_back=LEAVE_YEARS_BACK):
+    try:
+        year = datetime.strptime(name, "%B %Y").year
+    except (TypeError, ValueError):
+        return False
+    current = (today or datetime.now()).year
+    return current - years_back <= year <= current
+
+
+# === In-memory "<Month> <Year>" worksheets indexed by EMP ID ===
+class LeaveStore:
+    """
+    Each worksheet is downloaded once and kept as {emp_id: row}, at most
+    LEAVE_MAX_SHEETS of them in LRU order; names outside the valid year range
+    are answered as missing without calling the Google API.
+    A background thread checks the spreadsheet every LEAVE_REFRESH_SECONDS;
+    when its modifiedTime moved, the current and previous months are
+    re-downloaded and older months are dropped (reloaded on next use), so
+    lookups are dict reads that never call the Google API.
+    """
+
+    def __init__(self, client_provider, spreadsheet_id, refresh_seconds=LEAVE_REFRESH_SECONDS,
+                 check_modified=LEAVE_CHECK_MODIFIED, max_sheets=LEAVE_MAX_SHEETS):
+        self.client_provider = client_provider
+        self.spreadsheet_id = spreadsheet_id
+        self.refresh_seconds = refresh_seconds
+        self.check_modified = check_modified
+        self.max_sheets = max_sheets
+        self._spreadsheet = None
+        self._sheets = OrderedDict()  # worksheet name -> {"rows": dict or None (missing), "loaded_at": ts}
+        self._lock = threading.Lock()
+        self._refresher = ProcessThread("leave-store-refresh", self._refresh_loop)
+        self._modified_time = None
+        self.flights = SingleFlight("leave-sheets")
+        self.hits = 0
+        self.loads = 0
+        self.refreshes = 0
+        self.evictions = 0
+        self.rejected = 0
+        self.errors = 0
+
+    def _open(self):
+        if self._spreadsheet is None:
+            self._spreadsheet = self.client_provider().open_by_key(self.spreadsheet_id)
+        return self._spreadsheet
+
+    def _download(self, worksheet_name):
+        """
+        Returns {emp_id: row}, or None when the worksheet does not exist.
+        """
+        self.loads += 1
+        try:
+            with backend_timer("sheets", "open_worksheet"):
+                sheet = self._open().worksheet(worksheet_name)
+        except gspread.exceptions.WorksheetNotFound:
+            return None
+        with backend_timer("sheets", "get_all_records"):
+            records = sheet.get_all_records()
+        rows = {}
+        for row in records:
+            rows.setdefault(row_emp_id(row), row)   # first row wins, as before
+        logging.info(f"[LEAVE STORE] Loaded {worksheet_name}: {len(rows)} employees")
+        return rows
+
+    def load(self, worksheet_name):
+        if self.check_modified and self._modified_time is None:
+            # Read before downloading, so the first refresh only reloads if the sheet changed since
+            self._spreadsheet_modified()
+        # Requests racing for the same worksheet share one download
+        rows, _ = self.flights.do(worksheet_name, lambda: self._download(worksheet_name))
+        with self._lock:
+            self._sheets[worksheet_name] = {"rows": rows, "loaded_at": time.time()}
+            self._sheets.move_to_end(worksheet_name)
+            while len(self._sheets) > self.max_sheets:
+                self._sheets.popitem(last=False)
+                self.evictions += 1
+        return rows
+
+    def get_sheet(self, worksheet_name):
+        """
+        Returns {emp_id: row} for the worksheet, or None if it does not exist.
+        Only the first request for a never-seen worksheet downloads it.
+        """
+        if not valid_worksheet_name(worksheet_name):
+            self.rejected += 1
+            return None
+        self._ensure_refresher()
+        with self._lock:
+            entry = self._sheets.get(worksheet_name)
+            if entry is not None:
+                self._sheets.move_to_end(worksheet_name)
+        if entry is not None:
+            self.hits += 1
+            return entry["rows"]
+        return self.load(worksheet_name)
+
+    def lookup(self, worksheet_name, emp_id):
+        rows = self.get_sheet(worksheet_name)
+        if rows is None:
+            return None, False
+        return rows.get(str(emp_id).strip()), True
+
+    # === Background refresh (one thread per process) ===
+    def _ensure_refresher(self):
+        if self.refresh_seconds > 0:
+            self._refresher.ensure()
+
+    def _spreadsheet_modified(self):
+        if not self.check_modified:
+            return True
+        try:
+            with backend_timer("sheets", "modified_time"):
+                sh = self._open()
+                getter = getattr(sh, "get_lastUpdateTime", None)
+                modified = getter() if getter else sh.lastUpdateTime
+        except Exception as e:
+            logging.warning(f"[LEAVE STORE] Could not read modifiedTime, refreshing anyway: {e}")
+            return True
+        changed = modified != self._modified_time
+        self._modified_time = modified
+        return changed
+
+    def refresh(self, today=None):
+        if not self._sheets or not self._spreadsheet_modified():
+            return
+        recent = recent_worksheet_names(today)
+        with self._lock:
+            # Older months are rarely asked for: drop them and reload on demand
+            for name in [n for n in self._sheets if n not in recent]:
+                del self._sheets[name]
+                self.evictions += 1
+            known = [n for n in recent if n in self._sheets]
+        for name in known:
+            try:
+                self.load(name)
+            except Exception as e:
+                # Keep serving the previous copy
+                self.errors += 1
+                logging.warning(f"[LEAVE STORE] Refresh failed for {name}: {e}")
+        self.refreshes += 1
+
+    def _refresh_loop(self):
+        while True:
+            time.sleep(self.refresh_seconds)
+            try:
+                self.refresh()
+            except Exception as e:
+                self.errors += 1
+                logging.warning(f"[LEAVE STORE] Refresh error: {e}")
+
+    def stats(self):
+        return {
+            "worksheets": list(self._sheets),
+            "max_sheets": self.max_sheets,
+            "refresh_seconds": self.refresh_seconds,
+            "hits": self.hits,
+            "loads": self.loads,
+            "refreshes": self.refreshes,
+            "evictions": self.evictions,
+            "rejected": self.rejected,
+            "errors": self.errors,
+            "coalesced": self.flights.coalesced,
+        }
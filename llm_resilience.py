@@ -0,0 +1,354 @@
+import os
+import time
+import random
+import asyncio
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# === LLM resilience Config ===
+# Overall budget for one chat request's DeepSeek work (all attempts + backoff)
+LLM_REQUEST_DEADLINE = float(os.getenv("LLM_REQUEST_DEADLINE", "20"))
+# Per-attempt timeout = clamp(p99 latency * multiplier, min, max); max is used until enough samples exist
+LLM_MIN_ATTEMPT_TIMEOUT = float(os.getenv("LLM_MIN_ATTEMPT_TIMEOUT", "4"))
+LLM_MAX_ATTEMPT_TIMEOUT = float(os.getenv("LLM_MAX_ATTEMPT_TIMEOUT", "15"))
+LLM_TIMEOUT_MULTIPLIER = float(os.getenv("LLM_TIMEOUT_MULTIPLIER", "1.5"))
+LLM_LATENCY_SAMPLES = int(os.getenv("LLM_LATENCY_SAMPLES", "200"))
+LLM_MIN_SAMPLES = 20
+# Hedging: fire a second identical request if the first is slower than p95 (doubles cost for the slow tail)
+LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "0") == "1"
+LLM_HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_DELAY", "1.5"))
+# Hedges in flight per process; a losing hedge keeps running until its own timeout, so beyond this no hedge is fired
+LLM_MAX_HEDGES = int(os.getenv("LLM_MAX_HEDGES", "8"))
+# Circuit breaker: open when the error rate over the last N calls crosses the threshold
+LLM_BREAKER_WINDOW = int(os.getenv("LLM_BREAKER_WINDOW", "20"))
+LLM_BREAKER_MIN_CALLS = int(os.getenv("LLM_BREAKER_MIN_CALLS", "5"))
+LLM_BREAKER_ERROR_RATE = float(os.getenv("LLM_BREAKER_ERROR_RATE", "0.5"))
+LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))
+LLM_BACKOFF_BASE = 0.25
+# While DeepSeek is unavailable, serve a cached paraphrase at this looser similarity
+LLM_DEGRADED_SIMILARITY = float(os.getenv("LLM_DEGRADED_SIMILARITY", "0.7"))
+
+
+# Named wrappers in this process, for /cache-stats and /metrics
+LLM_INSTANCES = {}
+
+
+class CircuitOpen(Exception):
+    pass
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+# === Rolling latency percentiles ===
+class LatencyTracker:
+    def __init__(self, samples=LLM_LATENCY_SAMPLES):
+        self._samples = deque(maxlen=samples)
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, p):
+        with self._lock:
+            data = sorted(self._samples)
+        if len(data) < LLM_MIN_SAMPLES:
+            return None
+        return data[min(len(data) - 1, int(p / 100 * len(data)))]
+
+    def attempt_timeout(self):
+        p99 = self.percentile(99)
+        if p99 is None:
+            return LLM_MAX_ATTEMPT_TIMEOUT
+        return min(LLM_MAX_ATTEMPT_TIMEOUT, max(LLM_MIN_ATTEMPT_TIMEOUT, p99 * LLM_TIMEOUT_MULTIPLIER))
+
+    def hedge_delay(self):
+        p95 = self.percentile(95)
+        return max(LLM_HEDGE_MIN_DELAY, p95) if p95 is not None else None
+
+    def stats(self):
+        return {
+            "samples": len(self._samples),
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "attempt_timeout": round(self.attempt_timeout(), 2),
+        }
+
+
+# === Circuit breaker (closed -> open -> half-open probe -> closed) ===
+class CircuitBreaker:
+    def __init__(self, window=LLM_BREAKER_WINDOW, min_calls=LLM_BREAKER_MIN_CALLS,
+                 error_rate=LLM_BREAKER_ERROR_RATE, cooldown=LLM_BREAKER_COOLDOWN):
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.cooldown = cooldown
+        self._results = deque(maxlen=window)    # True = success
+        self._lock = threading.Lock()
+        self.state = "closed"
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self.opened = 0
+        self.rejected = 0
+
+    def allow(self):
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.time() - self._opened_at >= self.cooldown:
+                self.state = "half_open"
+                self._probe_in_flight = False
+            if self.state == "half_open" and not self._probe_in_flight:
+                # Let one request through to test whether DeepSeek has recovered
+                self._probe_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._results.append(True)
+            if self.state != "closed":
+                logging.info("[LLM BREAKER] Probe succeeded, closing circuit")
+                self.state = "closed"
+                self._results.clear()
+
+    def record_failure(self):
+        with self._lock:
+            self._results.append(False)
+            if self.state == "half_open":
+                self._open()
+                return
+            failures = self._results.count(False)
+            if (self.state == "closed" and len(self._results) >= self.min_calls
+                    and failures / len(self._results) >= self.error_rate):
+                self._open()
+
+    def _open(self):
+        self.state = "open"
+        self._opened_at = time.time()
+        self._probe_in_flight = False
+        self.opened += 1
+        logging.warning(f"[LLM BREAKER] Circuit open for {self.cooldown:.0f}s")
+
+    def stats(self):
+        results = list(self._results)
+        return {
+            "state": self.state,
+            "window_calls": len(results),
+            "window_error_rate": round(results.count(False) / len(results), 3) if results else 0.0,
+            "opened": self.opened,
+            "rejected": self.rejected,
+        }
+
+
+def _backoff(attempt):
+    return LLM_BACKOFF_BASE * (2 ** attempt) * random.uniform(0.5, 1.5)
+
+
+# === Resilient chat.completions.create (thread / WSGI workers) ===
+class ResilientLLM:
+    """
+    Wraps an OpenAI-compatible client. Each request gets an overall deadline;
+    each attempt gets a timeout derived from observed latency; the breaker
+    rejects calls immediately while DeepSeek is failing, so callers drop
+    straight to their cached/fallback answer.
+    """
+
+    def __init__(self, client, breaker=None, latency=None, hedge=LLM_HEDGE_ENABLED, max_hedges=LLM_MAX_HEDGES,
+                 name=None):
+        self.client = client
+        self.breaker = breaker or CircuitBreaker()
+        self.latency = latency or LatencyTracker()
+        self.hedge = hedge
+        self.max_hedges = max_hedges
+        self._hedge_pool = None
+        self._hedge_slots = None
+        self._hedge_pid = None
+        self._lock = threading.Lock()
+        self.attempts = 0
+        self.failures = 0
+        self.hedged = 0
+        self.hedges_skipped = 0
+        self.hedge_wins = 0
+        self.deadline_exceeded = 0
+        if name:
+            LLM_INSTANCES[name] = self
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _per_process(self):
+        # A forked worker must not inherit the parent's pool threads or hedge slots
+        if self._hedge_pid != os.getpid():
+            self._hedge_pool = None
+            self._hedge_slots = threading.BoundedSemaphore(self.max_hedges)
+            self._hedge_pid = os.getpid()
+
+    def _pool(self):
+        self._per_process()
+        if self._hedge_pool is None:
+            self._hedge_pool = ThreadPoolExecutor(max_workers=32, thread_name_prefix="llm-hedge")
+        return self._hedge_pool
+
+    def _take_hedge_slot(self):
+        """
+        The semaphore to release when the hedge finishes, or None when
+        LLM_MAX_HEDGES hedges are already in flight.
+        """
+        self._per_process()
+        slots = self._hedge_slots
+        if not slots.acquire(blocking=False):
+            self._count("hedges_skipped")
+            return None
+        self._count("hedged")
+        return slots
+
+    def _create(self, kwargs, timeout):
+        return self.client.chat.completions.create(timeout=timeout, **kwargs)
+
+    def _attempt(self, kwargs, timeout):
+        delay = self.latency.hedge_delay() if self.hedge and not kwargs.get("stream") else None
+        if delay is None or delay >= timeout:
+            return self._create(kwargs, timeout)
+        pool = self._pool()
+        started = time.time()
+        futures = [pool.submit(self._create, kwargs, timeout)]
+        done, _ = wait(futures, timeout=delay)
+        slots = self._take_hedge_slot() if not done else None
+        if slots is not None:
+            hedge = pool.submit(self._create, kwargs, max(0.1, timeout - (time.time() - started)))
+            hedge.add_done_callback(lambda _: slots.release())
+            futures.append(hedge)
+        last_error = None
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=max(0.0, timeout - (time.time() - started)), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                if future.exception() is None:
+                    if future is not futures[0]:
+                        self._count("hedge_wins")
+                    return future.result()
+                last_error = future.exception()
+        raise last_error or TimeoutError(f"DeepSeek attempt timed out after {timeout:.1f}s")
+
+    def create(self, max_retries=3, deadline=LLM_REQUEST_DEADLINE, **kwargs):
+        if not self.breaker.allow():
+            raise CircuitOpen("DeepSeek circuit open")
+        end = time.time() + deadline
+        last_exception = None
+        for attempt in range(max_retries):
+            remaining = end - time.time()
+            if remaining <= 0:
+                break
+            timeout = min(self.latency.attempt_timeout(), remaining)
+            self._count("attempts")
+            try:
+                start_time = time.time()
+                response = self._attempt(kwargs, timeout)
+                if not kwargs.get("stream"):
+                    self.latency.record(time.time() - start_time)
+                self.breaker.record_success()
+                return response
+            except Exception as e:
+                last_exception = e
+                self._count("failures")
+                self.breaker.record_failure()
+                logging.warning(f"DeepSeek attempt {attempt+1} failed after {time.time() - start_time:.2f}s: {str(e)}")
+                if self.breaker.state == "open":
+                    raise CircuitOpen(f"DeepSeek circuit opened. Last error: {last_exception}")
+            pause = min(_backoff(attempt), end - time.time())
+            if attempt < max_retries - 1 and pause > 0:
+                time.sleep(pause)
+        if time.time() >= end:
+            self._count("deadline_exceeded")
+        raise DeadlineExceeded(f"DeepSeek API failed within {deadline:.0f}s budget. Last error: {last_exception}")
+
+    def stats(self):
+        return {
+            "breaker": self.breaker.stats(),
+            "latency": self.latency.stats(),
+            "attempts": self.attempts,
+            "failures": self.failures,
+            "hedge_enabled": self.hedge,
+            "max_hedges": self.max_hedges,
+            "hedged": self.hedged,
+            "hedges_skipped": self.hedges_skipped,
+            "hedge_wins": self.hedge_wins,
+            "deadline_exceeded": self.deadline_exceeded,
+        }
+
+
+# === Event-loop version (asgi mode); shares breaker and latency with the sync wrapper ===
+class AsyncResilientLLM(ResilientLLM):
+    async def _create_async(self, kwargs, timeout):
+        return await asyncio.wait_for(self.client.chat.completions.create(timeout=timeout, **kwargs), timeout)
+
+    async def _attempt_async(self, kwargs, timeout):
+        delay = self.latency.hedge_delay() if self.hedge and not kwargs.get("stream") else None
+        if delay is None or delay >= timeout:
+            return await self._create_async(kwargs, timeout)
+        primary = asyncio.ensure_future(self._create_async(kwargs, timeout))
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done:
+            return primary.result()
+        slots = self._take_hedge_slot()
+        if slots is None:
+            return await primary
+        backup = asyncio.ensure_future(self._create_async(kwargs, timeout - delay))
+        backup.add_done_callback(lambda _: slots.release())
+        pending = {primary, backup}
+        last_error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is backup:
+                            self._count("hedge_wins")
+                        return task.result()
+                    last_error = task.exception()
+        finally:
+            for task in pending:
+                task.cancel()
+        raise last_error
+
+    async def create_async(self, max_retries=3, deadline=LLM_REQUEST_DEADLINE, **kwargs):
+        if not self.breaker.allow():
+            raise CircuitOpen("DeepSeek circuit open")
+        loop = asyncio.get_running_loop()
+        end = loop.time() + deadline
+        last_exception = None
+        for attempt in range(max_retries):
+            remaining = end - loop.time()
+            if remaining <= 0:
+                break
+            timeout = min(self.latency.attempt_timeout(), remaining)
+            self._count("attempts")
+            start_time = loop.time()
+            try:
+                response = await self._attempt_async(kwargs, timeout)
+                if not kwargs.get("stream"):
+                    self.latency.record(loop.time() - start_time)
+                self.breaker.record_success()
+                return response
+            except Exception as e:
+                last_exception = e
+                self._count("failures")
+                self.breaker.record_failure()
+                logging.warning(f"DeepSeek attempt {attempt+1} failed after {loop.time() - start_time:.2f}s: {str(e)}")
+                if self.breaker.state == "open":
+                    raise CircuitOpen(f"DeepSeek circuit opened. Last error: {last_exception}")
+            pause = min(_backoff(attempt), end - loop.time())
+            if attempt < max_retries - 1 and pause > 0:
+                await asyncio.sleep(pause)
+        if loop.time() >= end:
+            self._count("deadline_exceeded")
+        raise DeadlineExceeded(f"DeepSeek API failed within {deadline:.0f}s budget. Last error: {last_exception}")
@@ -0,0 +1,102 @@
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+
+# === Latency buckets (seconds): sub-ms cache hits up to slow DeepSeek calls ===
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 20.0, 30.0)
+
+
+# === Histogram with labels (Prometheus cumulative-bucket semantics) ===
+class Histogram:
+    def __init__(self, name, help_text, label_names, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series = {}       # label values -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, seconds, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        slot = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[slot] += 1
+            series[-1] += seconds
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {key: list(series) for key, series in self._series.items()}
+        for key in sorted(snapshot):
+            series = snapshot[key]
+            labels = ",".join(f'{n}="{_escape(v)}"' for n, v in zip(self.label_names, key))
+            sep = "," if labels else ""
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{labels}{sep}le="{bound}"}} {cumulative}')
+            cumulative += series[len(self.buckets)]
+            lines.append(f'{self.name}_bucket{{{labels}{sep}le="+Inf"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{labels}}} {series[-1]:.6f}")
+            lines.append(f"{self.name}_count{{{labels}}} {cumulative}")
+        return lines
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# === Process-wide metrics (each gunicorn worker reports its own) ===
+CHAT_STAGE_SECONDS = Histogram(
+    "chat_stage_seconds", "Time spent in each chat pipeline stage", ["stage"])
+CHAT_REQUEST_SECONDS = Histogram(
+    "chat_request_seconds", "End-to-end chat request latency by answer source", ["endpoint", "source"])
+BACKEND_CALL_SECONDS = Histogram(
+    "backend_call_seconds", "MySQL, MongoDB, Google Sheets and bcrypt call latency", ["backend", "op", "outcome"])
+HISTOGRAMS = [CHAT_STAGE_SECONDS, CHAT_REQUEST_SECONDS, BACKEND_CALL_SECONDS]
+
+
+@contextmanager
+def stage_timer(stage):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        CHAT_STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage)
+
+
+@contextmanager
+def backend_timer(backend, op):
+    start = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        BACKEND_CALL_SECONDS.observe(time.perf_counter() - start, backend=backend, op=op, outcome=outcome)
+
+
+def observe_request(endpoint, source, seconds):
+    CHAT_REQUEST_SECONDS.observe(seconds, endpoint=endpoint, source=source or "unknown")
+
+
+def render_prometheus(extra_gauges=None):
+    """
+    Prometheus text exposition (format 0.0.4). extra_gauges is
+    {name: (help, value)} for point-in-time values such as pool sizes.
+    """
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+    for name, (help_text, value) in sorted((extra_gauges or {}).items()):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} gauge")
+        lines.append(f"{name} {value}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,25 @@
+import os
+import hmac
+from functools import wraps
+from flask import request, jsonify
+
+# === Ops endpoints Config ===
+# Shared secret for the monitoring endpoints (sent as X-Ops-Token); unset = those endpoints answer 404
+OPS_TOKEN = os.getenv("OPS_TOKEN", "")
+
+
+def ops_only(view):
+    """
+    Serves the view only to callers sending X-Ops-Token: <OPS_TOKEN>. Pool,
+    cache and rate-limit internals are not for the public: without a
+    configured token the endpoint does not exist, a wrong token gets 403.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not OPS_TOKEN:
+            return jsonify({"error": "Not found"}), 404
+        sent = request.headers.get("X-Ops-Token", "")
+        if not hmac.compare_digest(sent.encode(), OPS_TOKEN.encode()):
+            return jsonify({"error": "Forbidden"}), 403
+        return view(*args, **kwargs)
+    return wrapper
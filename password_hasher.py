@@ -0,0 +1,122 @@
+import os
+import re
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import bcrypt
+
+# === Hashing Config ===
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# 0 = hash on the request thread: bcrypt releases the GIL, so gthread/asyncio.to_thread
+# requests hash on all cores in parallel. Otherwise the total number of hashing
+# processes for the whole server, split across the WEB_CONCURRENCY gunicorn workers.
+HASH_POOL_WORKERS = int(os.getenv("HASH_POOL_WORKERS", "0"))
+HASH_POOL_PER_PROCESS = max(1, HASH_POOL_WORKERS // max(1, int(os.getenv("WEB_CONCURRENCY", "1")))) \
+    if HASH_POOL_WORKERS > 0 else 0
+# Hashes in flight per gunicorn worker (running or queued) before logins get a 503
+HASH_QUEUE_LIMIT = int(os.getenv("HASH_QUEUE_LIMIT", str(max(1, HASH_POOL_PER_PROCESS or os.cpu_count() or 1) * 4)))
+HASH_TIMEOUT = float(os.getenv("HASH_TIMEOUT", "10"))
+
+COST_RE = re.compile(r"^\$2[abxy]?\$(\d{2})\$")
+
+
+class HasherBusy(Exception):
+    """Raised when too many hash jobs are already queued; callers answer 503."""
+    pass
+
+
+# === Executed in the worker processes ===
+def _hash(password, rounds):
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds=rounds))
+
+
+def _check(password, hashed):
+    return bcrypt.checkpw(password, hashed)
+
+
+def hash_cost(hashed):
+    match = COST_RE.match(hashed or "")
+    return int(match.group(1)) if match else None
+
+
+# === Bounded bcrypt hashing, inline or on a process pool ===
+class PasswordHasher:
+    def __init__(self, workers=HASH_POOL_PER_PROCESS, queue_limit=HASH_QUEUE_LIMIT, rounds=BCRYPT_ROUNDS,
+                 timeout=HASH_TIMEOUT):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.rounds = rounds
+        self.timeout = timeout
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.submitted = 0
+        self.rejected = 0
+
+    def _get_executor(self):
+        pid = os.getpid()
+        if self._executor is None or self._pid != pid:
+            with self._lock:
+                if self._executor is None or self._pid != pid:
+                    # "spawn" keeps children independent of the gunicorn worker's threads and sockets
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+                    self._pid = pid
+                    self._in_flight = 0
+        return self._executor
+
+    def _done(self, _future):
+        with self._lock:
+            self._in_flight -= 1
+
+    def _admit(self):
+        with self._lock:
+            if self._in_flight >= self.queue_limit:
+                self.rejected += 1
+                raise HasherBusy(f"{self._in_flight} password hashes already queued")
+            self._in_flight += 1
+            self.submitted += 1
+
+    def _run(self, fn, *args):
+        if self.workers <= 0:
+            self._admit()
+            try:
+                return fn(*args)
+            finally:
+                self._done(None)
+        executor = self._get_executor()
+        self._admit()
+        try:
+            future = executor.submit(fn, *args)
+        except Exception:
+            self._done(None)
+            raise
+        future.add_done_callback(self._done)
+        return future.result(timeout=self.timeout)
+
+    def hash_password(self, password):
+        return self._run(_hash, password.encode(), self.rounds).decode()
+
+    def verify_password(self, password, hashed):
+        return self._run(_check, password.encode(), hashed.encode())
+
+    def needs_rehash(self, hashed):
+        cost = hash_cost(hashed)
+        return cost is not None and cost < self.rounds
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "queue_limit": self.queue_limit,
+            "rounds": self.rounds,
+            "in_flight": self._in_flight,
+            "submitted": self.submitted,
+            "rejected": self.rejected,
+        }
+
+
+HASHER = PasswordHasher()
+if HASH_POOL_PER_PROCESS > 0:
+    logging.info(f"🔐 Password hashing pool: {HASH_POOL_PER_PROCESS} processes per worker, cost {BCRYPT_ROUNDS}")
@@ -0,0 +1,98 @@
+import hashlib
+import logging
+import threading
+
+# === Instructions (never change per request; keep this text byte-stable) ===
+INSTRUCTIONS = (
+    "You are a concise and resourceful Sanathana assistant. "
+    "Always use the knowledge provided to find and present helpful answers, even if the exact information is not available. "
+    "Carefully search, analyze, and extract any facts or related content that may assist the user. "
+    "If there is no exact answer, present the most closely related information, summaries, or inferred details from the knowledge base.\n\n"
+    "Instructions:\n"
+    "1. Use ONLY the knowledge provided—never make up facts.\n"
+    "2. If you cannot find an exact match, provide any relevant, related, or inferred information from the knowledge base.\n"
+    "3. Never respond with phrases like 'I don't have that information' or 'I am unable to answer'.\n"
+    "4. Be direct—avoid greetings, sign-offs, or apologies.\n"
+    "5. Always keep sentences short and crisp.\n"
+    "6. Use clear, simple language that is easy to understand.\n"
+    "7. For list-type queries (such as 'list features' or 'show benefits'):\n"
+    "   - Present information as bullet points\n"
+    "   - Group related items together logically\n"
+    "   - Avoid blank lines between bullets\n"
+    "8. For all other queries, respond with brief, fact-based sentences using the most relevant knowledge.\n"
+    "9. Only include contact details if specifically requested.\n"
+    "10. Always try to give the user the most useful response possible using the available knowledge.\n"
+)
+
+
+# === Prompt assembly around a precomputed, cache-friendly prefix ===
+class PromptBuilder:
+    """
+    DeepSeek caches prompt prefixes: tokens identical to an earlier request's
+    leading tokens are served from cache (faster, cheaper). So the system
+    message is built once per KB version and reused byte-for-byte:
+      full mode:      system = instructions + whole KB;  user = question
+      retrieval mode: system = instructions only;        user = KB excerpts + question
+    Anything that varies per request goes after the stable prefix.
+    """
+
+    def __init__(self, kb_index, kb_version):
+        self.kb_index = kb_index
+        self.kb_version = kb_version
+        self.full_system = INSTRUCTIONS + "\nKnowledge Base:\n" + kb_index.full_text
+        self.retrieval_system = INSTRUCTIONS
+        self.prefix_id = hashlib.sha1(self.full_system.encode("utf-8")).hexdigest()[:12]
+
+    def build(self, user_question, mode=None):
+        kb_context, kb_mode = self.kb_index.context_for(user_question, mode)
+        if kb_mode == "full":
+            logging.info(f"[KB] mode=full prefix={self.prefix_id}")
+            return [
+                {"role": "system", "content": self.full_system},
+                {"role": "user", "content": user_question},
+            ]
+        logging.info(f"[KB] mode={kb_mode} context_chars={len(kb_context)}")
+        return [
+            {"role": "system", "content": self.retrieval_system},
+            {"role": "user", "content": f"Knowledge Base:\n{kb_context}\n\nQuestion: {user_question}"},
+        ]
+
+
+# === Upstream prompt-cache accounting (from the `usage` field) ===
+class PromptCacheStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.responses = 0
+        self.prompt_tokens = 0
+        self.hit_tokens = 0
+        self.miss_tokens = 0
+
+    def record(self, usage):
+        if usage is None:
+            return
+        prompt = getattr(usage, "prompt_tokens", 0) or 0
+        hit = getattr(usage, "prompt_cache_hit_tokens", None)
+        miss = getattr(usage, "prompt_cache_miss_tokens", None)
+        if hit is None:
+            # OpenAI-style usage reports cached tokens under prompt_tokens_details
+            details = getattr(usage, "prompt_tokens_details", None)
+            hit = (getattr(details, "cached_tokens", 0) or 0) if details is not None else 0
+            miss = prompt - hit
+        with self._lock:
+            self.responses += 1
+            self.prompt_tokens += prompt
+            self.hit_tokens += hit or 0
+            self.miss_tokens += miss or 0
+
+    def hit_ratio(self):
+        total = self.hit_tokens + self.miss_tokens
+        return round(self.hit_tokens / total, 4) if total else 0.0
+
+    def stats(self):
+        return {
+            "responses": self.responses,
+            "prompt_tokens": self.prompt_tokens,
+            "cache_hit_tokens": self.hit_tokens,
+            "cache_miss_tokens": self.miss_tokens,
+            "cache_hit_ratio": self.hit_ratio(),
+        }
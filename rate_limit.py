@@ -0,0 +1,307 @@
+import os
+import math
+import time
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from flask import current_app, has_app_context, jsonify
+from pymongo import ReturnDocument
+from metrics import backend_timer
+from lazy import Backoff
+
+# === Rate limit Config ===
+# Token buckets: RATE = tokens refilled per second, BURST = bucket size.
+# Buckets live in each worker's memory; enable RATE_LIMIT_SHARED for limits
+# that hold across workers and instances.
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") == "1"
+RATE_LIMIT_CHAT_RATE = float(os.getenv("RATE_LIMIT_CHAT_RATE", "0.5"))        # per emp_id at one IP
+RATE_LIMIT_CHAT_BURST = float(os.getenv("RATE_LIMIT_CHAT_BURST", "10"))
+# Ceiling per IP across all identities (a whole office behind one NAT)
+RATE_LIMIT_CHAT_IP_RATE = float(os.getenv("RATE_LIMIT_CHAT_IP_RATE", "5"))
+RATE_LIMIT_CHAT_IP_BURST = float(os.getenv("RATE_LIMIT_CHAT_IP_BURST", "100"))
+RATE_LIMIT_GLOBAL_RATE = float(os.getenv("RATE_LIMIT_GLOBAL_RATE", "20"))     # requests that may reach DeepSeek
+RATE_LIMIT_GLOBAL_BURST = float(os.getenv("RATE_LIMIT_GLOBAL_BURST", "40"))
+RATE_LIMIT_AUTH_RATE = float(os.getenv("RATE_LIMIT_AUTH_RATE", "0.1"))        # per user_id at one IP
+RATE_LIMIT_AUTH_BURST = float(os.getenv("RATE_LIMIT_AUTH_BURST", "5"))
+# Looser cap per user_id across all IPs (another IP cannot lock the account out)
+RATE_LIMIT_AUTH_ACCOUNT_RATE = float(os.getenv("RATE_LIMIT_AUTH_ACCOUNT_RATE", "0.5"))
+RATE_LIMIT_AUTH_ACCOUNT_BURST = float(os.getenv("RATE_LIMIT_AUTH_ACCOUNT_BURST", "30"))
+# Abuse ceiling per IP across all user_ids
+RATE_LIMIT_AUTH_IP_RATE = float(os.getenv("RATE_LIMIT_AUTH_IP_RATE", "1"))
+RATE_LIMIT_AUTH_IP_BURST = float(os.getenv("RATE_LIMIT_AUTH_IP_BURST", "50"))
+# Questions already in the answer cache cost this fraction of a token and skip the global bucket
+RATE_LIMIT_CACHED_COST = float(os.getenv("RATE_LIMIT_CACHED_COST", "0.2"))
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "50000"))
+# Take the client IP from X-Forwarded-For only behind a known proxy chain (Azure App
+# Service front end = 1): the entry PROXY_COUNT from the right is the one our own
+# proxy appended; anything left of it is client-supplied.
+RATE_LIMIT_TRUST_FORWARDED = os.getenv("RATE_LIMIT_TRUST_FORWARDED", "0") == "1"
+RATE_LIMIT_PROXY_COUNT = int(os.getenv("RATE_LIMIT_PROXY_COUNT", "1"))
+
+# Shared fixed-window counters in Mongo (sanathana_chatbot_v1.rate_limits)
+RATE_LIMIT_SHARED = os.getenv("RATE_LIMIT_SHARED", "0") == "1"
+RATE_LIMIT_SHARED_COLLECTION = os.getenv("RATE_LIMIT_SHARED_COLLECTION", "rate_limits")
+RATE_LIMIT_SHARED_WINDOW = int(os.getenv("RATE_LIMIT_SHARED_WINDOW", "60"))
+RATE_LIMIT_SHARED_TIMEOUT_MS = int(os.getenv("RATE_LIMIT_SHARED_TIMEOUT_MS", "100"))
+# After a Mongo error, fall back to the local buckets only for this long
+RATE_LIMIT_SHARED_BACKOFF_SECONDS = int(os.getenv("RATE_LIMIT_SHARED_BACKOFF_SECONDS", "30"))
+
+
+def client_ip(headers, remote_addr, trust_forwarded=RATE_LIMIT_TRUST_FORWARDED, proxy_count=RATE_LIMIT_PROXY_COUNT):
+    if trust_forwarded and proxy_count > 0:
+        hops = [hop.strip() for hop in headers.get("X-Forwarded-For", "").split(",") if hop.strip()]
+        if len(hops) >= proxy_count:
+            return hops[-proxy_count]
+    return remote_addr or "unknown"
+
+
+def retry_after_header(seconds):
+    return str(max(1, math.ceil(seconds)))
+
+
+# 🚦 Helper: fast 429 before any backend work is done
+def rate_limited_response(wait):
+    resp = jsonify({"error": "Too many requests, please retry later"})
+    resp.headers["Retry-After"] = retry_after_header(wait)
+    return resp, 429
+
+
+# === In-process token buckets ===
+class TokenBucketLimiter:
+    """
+    One bucket per key, refilled continuously at `rate` tokens/second up to
+    `burst`. Buckets are kept in LRU order and the least recently used are
+    dropped past max_keys (a dropped bucket comes back full).
+    """
+
+    def __init__(self, name, rate, burst, max_keys=RATE_LIMIT_MAX_KEYS):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()   # key -> (tokens, updated_at)
+        self._lock = threading.Lock()
+        self.admitted = 0
+        self.rejected = 0
+
+    def try_acquire(self, key, cost=1.0):
+        """
+        Returns 0.0 when admitted, else the seconds until `cost` tokens are available.
+        """
+        cost = min(cost, self.burst)   # a request larger than the bucket drains it instead of never fitting
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated_at) * self.rate)
+            if tokens >= cost:
+                self._buckets[key] = (tokens - cost, now)
+                wait = 0.0
+            else:
+                self._buckets[key] = (tokens, now)
+                wait = (cost - tokens) / self.rate if self.rate > 0 else float(RATE_LIMIT_SHARED_WINDOW)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        if wait:
+            self.rejected += 1
+        else:
+            self.admitted += 1
+        return wait
+
+    def refund(self, key, cost=1.0):
+        """
+        Gives back what try_acquire took when a later check rejected the request.
+        """
+        cost = min(cost, self.burst)
+        with self._lock:
+            if key in self._buckets:
+                tokens, updated_at = self._buckets[key]
+                self._buckets[key] = (min(self.burst, tokens + cost), updated_at)
+            self.admitted -= 1
+
+    def stats(self):
+        return {
+            "rate": self.rate,
+            "burst": self.burst,
+            "keys": len(self._buckets),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+        }
+
+
+# === Cross-worker fixed-window counters in Mongo ===
+class SharedWindowCounter:
+    """
+    Documents: {_id: "<limit>:<key>:<window start>", count, expires_at}. One
+    atomic $inc per admitted request; a TTL index purges old windows. Any
+    Mongo error fails open (local buckets still apply).
+    """
+
+    def __init__(self, collection_name=RATE_LIMIT_SHARED_COLLECTION, window=RATE_LIMIT_SHARED_WINDOW):
+        self.collection_name = collection_name
+        self.window = window
+        self._indexed = set()
+        self.backoff = Backoff("RATE LIMIT", RATE_LIMIT_SHARED_BACKOFF_SECONDS, "using local limits only")
+        self.rejected = 0
+
+    def _collection(self, db):
+        coll = db[self.collection_name]
+        if id(db) not in self._indexed:
+            try:
+                coll.create_index("expires_at", expireAfterSeconds=0)
+                self._indexed.add(id(db))
+            except Exception as e:
+                logging.warning(f"[RATE LIMIT] Could not ensure indexes: {e}")
+        return coll
+
+    def check(self, db, name, key, limit, cost=1.0):
+        if db is None or not self.backoff.available():
+            return 0.0
+        now = time.time()
+        window_start = int(now // self.window) * self.window
+        try:
+            with backend_timer("mongo", "rate_limit_inc"):
+                doc = self._collection(db).find_one_and_update(
+                    {"_id": f"{name}:{key}:{window_start}"},
+                    {"$inc": {"count": cost},
+                     "$setOnInsert": {"expires_at": datetime.now(timezone.utc) + timedelta(seconds=2 * self.window)}},
+                    upsert=True,
+                    return_document=ReturnDocument.AFTER,
+                    max_time_ms=RATE_LIMIT_SHARED_TIMEOUT_MS,
+                )
+        except Exception as e:
+            self.backoff.fail(e)
+            return 0.0
+        if doc["count"] <= limit:
+            return 0.0
+        self.rejected += 1
+        self.release(db, name, key, cost)     # a rejected request does not use up the window
+        return window_start + self.window - now
+
+    def release(self, db, name, key, cost=1.0):
+        if db is None or not self.backoff.available():
+            return
+        window_start = int(time.time() // self.window) * self.window
+        try:
+            with backend_timer("mongo", "rate_limit_release"):
+                self._collection(db).find_one_and_update(
+                    {"_id": f"{name}:{key}:{window_start}"},
+                    {"$inc": {"count": -cost}},
+                    max_time_ms=RATE_LIMIT_SHARED_TIMEOUT_MS,
+                )
+        except Exception as e:
+            self.backoff.fail(e)
+
+    def stats(self):
+        return {
+            "window_seconds": self.window,
+            "rejected": self.rejected,
+            "errors": self.backoff.errors,
+            "bypassed": self.backoff.bypassed,
+        }
+
+
+def _mongo_from_app():
+    if not has_app_context():
+        return None
+    return getattr(current_app, "mongo_chatbot", None)
+
+
+# === Admission control for chat and auth endpoints ===
+class AdmissionController:
+    """
+    Decides before any work is done whether a request may proceed. Returns
+    0.0 to admit, otherwise the Retry-After in seconds for a 429.
+
+    Chat: a wide per-IP ceiling and a tight bucket per identity at that IP
+    (emp_id comes from the request body, so rotating it only helps up to the
+    IP ceiling). Only requests that may reach DeepSeek are charged to the
+    global bucket, so answers already in the cache keep flowing (at a fraction
+    of a token) when the upstream budget is spent.
+    Auth: a wide per-IP ceiling, a tight bucket per user_id at that IP and a
+    looser one per user_id, checked before bcrypt.
+    A request is charged to all of its buckets or to none: when a later bucket
+    rejects it, the tokens taken from the earlier ones are refunded.
+    """
+
+    def __init__(self, enabled=RATE_LIMIT_ENABLED, shared=RATE_LIMIT_SHARED, db_provider=None):
+        self.enabled = enabled
+        self.chat_ip = TokenBucketLimiter("chat-ip", RATE_LIMIT_CHAT_IP_RATE, RATE_LIMIT_CHAT_IP_BURST)
+        self.chat = TokenBucketLimiter("chat", RATE_LIMIT_CHAT_RATE, RATE_LIMIT_CHAT_BURST)
+        self.upstream = TokenBucketLimiter("global", RATE_LIMIT_GLOBAL_RATE, RATE_LIMIT_GLOBAL_BURST)
+        self.auth_user = TokenBucketLimiter("auth-user", RATE_LIMIT_AUTH_RATE, RATE_LIMIT_AUTH_BURST)
+        self.auth_account = TokenBucketLimiter("auth-account", RATE_LIMIT_AUTH_ACCOUNT_RATE,
+                                               RATE_LIMIT_AUTH_ACCOUNT_BURST)
+        self.auth_ip = TokenBucketLimiter("auth-ip", RATE_LIMIT_AUTH_IP_RATE, RATE_LIMIT_AUTH_IP_BURST)
+        self.shared = SharedWindowCounter() if shared else None
+        self.db_provider = db_provider or _mongo_from_app
+
+    def _acquire(self, limiter, key, cost=1.0):
+        wait = limiter.try_acquire(key, cost)
+        if wait or self.shared is None:
+            return wait
+        # Same budget per window as the bucket allows: burst + refill over the window
+        limit = limiter.burst + limiter.rate * self.shared.window
+        wait = self.shared.check(self.db_provider(), limiter.name, key, limit, cost)
+        if wait:
+            limiter.refund(key, cost)
+        return wait
+
+    def _release(self, limiter, key, cost):
+        limiter.refund(key, cost)
+        if self.shared is not None:
+            self.shared.release(self.db_provider(), limiter.name, key, cost)
+
+    def _acquire_all(self, charges):
+        """
+        charges: [(limiter, key, cost)]. Admits only if every bucket does.
+        """
+        taken = []
+        for limiter, key, cost in charges:
+            wait = self._acquire(limiter, key, cost)
+            if wait:
+                for charge in reversed(taken):
+                    self._release(*charge)
+                return wait
+            taken.append((limiter, key, cost))
+        return 0.0
+
+    def admit_chat(self, ip, emp_id=None, cacheable=False):
+        return self.admit_chat_batch(ip, emp_id, cached=1 if cacheable else 0, uncached=0 if cacheable else 1)
+
+    def admit_chat_batch(self, ip, emp_id, cached, uncached):
+        """
+        One decision for several questions (chat-batch): `cached` of them are
+        already in the answer cache, `uncached` may reach DeepSeek.
+        """
+        if not self.enabled:
+            return 0.0
+        cost = cached * RATE_LIMIT_CACHED_COST + uncached
+        charges = [(self.chat_ip, ip, cost), (self.chat, f"{ip}:{emp_id}" if emp_id else ip, cost)]
+        if uncached:
+            charges.append((self.upstream, "*", uncached))
+        return self._acquire_all(charges)
+
+    def admit_auth(self, user_id, ip):
+        if not self.enabled:
+            return 0.0
+        charges = [(self.auth_ip, ip, 1.0)]
+        if user_id:
+            charges += [(self.auth_user, f"{ip}:{user_id}", 1.0), (self.auth_account, user_id, 1.0)]
+        return self._acquire_all(charges)
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "chat_ip": self.chat_ip.stats(),
+            "chat": self.chat.stats(),
+            "global": self.upstream.stats(),
+            "auth_user": self.auth_user.stats(),
+            "auth_account": self.auth_account.stats(),
+            "auth_ip": self.auth_ip.stats(),
+            "shared": self.shared.stats() if self.shared is not None else {"enabled": False},
+        }
+
+
+ADMISSION = AdmissionController()
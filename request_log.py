@@ -0,0 +1,232 @@
+import os
+import time
+import json
+import queue
+import socket
+import logging
+from collections import Counter, deque
+from datetime import datetime, timedelta, timezone
+from pymongo.errors import DuplicateKeyError
+from response_cache import normalize_key
+from lazy import ProcessThread
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# === Request log Config ===
+REQUEST_LOG_ENABLED = os.getenv("REQUEST_LOG_ENABLED", "1") == "1"
+REQUEST_LOG_PATH = os.getenv("REQUEST_LOG_PATH", os.path.join(BASE_DIR, "requests.jsonl"))
+REQUEST_LOG_QUEUE_SIZE = int(os.getenv("REQUEST_LOG_QUEUE_SIZE", "10000"))
+REQUEST_LOG_FLUSH_SECONDS = float(os.getenv("REQUEST_LOG_FLUSH_SECONDS", "2"))
+# Cache warming: replay the N most frequent logged questions at worker start (0 = off)
+CACHE_WARM_TOP_N = int(os.getenv("CACHE_WARM_TOP_N", "50"))
+CACHE_WARM_MIN_COUNT = int(os.getenv("CACHE_WARM_MIN_COUNT", "2"))
+CACHE_WARM_MAX_LINES = int(os.getenv("CACHE_WARM_MAX_LINES", "100000"))
+# Only the worker holding this Mongo lease warms; the rest get its answers from L2
+CACHE_WARM_LOCK_COLLECTION = os.getenv("CACHE_WARM_LOCK_COLLECTION", "locks")
+CACHE_WARM_LOCK_SECONDS = int(os.getenv("CACHE_WARM_LOCK_SECONDS", "600"))
+
+# Branches whose answers are cacheable and independent of the asking employee
+WARMABLE_BRANCHES = {"llm", "cache", "semantic_cache", "fallback"}
+
+
+def cache_outcome(meta):
+    source = meta.get("source")
+    if source == "cache":
+        return "hit"
+    if source == "semantic_cache":
+        return "semantic_hit"
+    if meta.get("coalesced"):
+        return "coalesced"
+    if source in ("llm", "fallback"):
+        return "miss"
+    return "bypass"     # answered by leave / birthday / FAQ lookups
+
+
+# === Append-only JSONL request log, written by a background thread ===
+class RequestLog:
+    """
+    record() only enqueues; a per-process writer thread appends batches to the
+    file, so a slow disk never adds latency to a chat request. When the queue
+    is full, records are dropped and counted.
+    """
+
+    def __init__(self, path=REQUEST_LOG_PATH, enabled=REQUEST_LOG_ENABLED,
+                 queue_size=REQUEST_LOG_QUEUE_SIZE, flush_seconds=REQUEST_LOG_FLUSH_SECONDS):
+        self.path = path
+        self.enabled = enabled
+        self.flush_seconds = flush_seconds
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._writer = ProcessThread("request-log-writer", self._writer_loop)
+        self.queued = 0
+        self.dropped = 0
+        self.written = 0
+        self.errors = 0
+
+    def record(self, endpoint, question, emp_id, meta, seconds):
+        if not self.enabled:
+            return
+        self._ensure_writer()
+        entry = {
+            "ts": round(time.time(), 3),
+            "ep": endpoint,
+            "q": question,
+            "emp": bool(emp_id),
+            "branch": meta.get("source"),
+            "cache": cache_outcome(meta),
+            "ms": round(seconds * 1000, 1),
+        }
+        try:
+            self._queue.put_nowait(entry)
+            self.queued += 1
+        except queue.Full:
+            self.dropped += 1
+
+    # === Writer (one per process; restarted after gunicorn fork) ===
+    def _ensure_writer(self):
+        self._writer.ensure()
+
+    def _writer_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.time() + self.flush_seconds
+            while time.time() < deadline:
+                try:
+                    batch.append(self._queue.get(timeout=max(0.0, deadline - time.time())))
+                except queue.Empty:
+                    break
+            data = "".join(json.dumps(e, ensure_ascii=False, separators=(",", ":")) + "\n" for e in batch)
+            try:
+                # One append per batch; O_APPEND keeps workers from overwriting each other
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(data)
+                self.written += len(batch)
+            except OSError as e:
+                self.errors += 1
+                logging.warning(f"[REQUEST LOG] Write failed, dropped {len(batch)} records: {e}")
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "path": self.path,
+            "queued": self.queued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "pending": self._queue.qsize(),
+            "errors": self.errors,
+        }
+
+
+def read_records(path=REQUEST_LOG_PATH, max_lines=CACHE_WARM_MAX_LINES):
+    """
+    Yields request records from the last `max_lines` lines of the log.
+    Lines that are not request records (blank, malformed, other JSON) are skipped.
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            lines = deque(f, maxlen=max_lines)
+    except OSError:
+        return
+    for line in lines:
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            continue
+        if isinstance(entry, dict) and isinstance(entry.get("q"), str) and "branch" in entry:
+            yield entry
+
+
+def top_questions(records, n=CACHE_WARM_TOP_N, min_count=CACHE_WARM_MIN_COUNT):
+    """
+    Most frequent cacheable questions, grouped by normalized cache key; each
+    group is represented by its most common original wording.
+    """
+    counts = Counter()
+    wordings = {}
+    for entry in records:
+        if entry.get("branch") not in WARMABLE_BRANCHES:
+            continue
+        key = normalize_key(entry["q"])
+        if not key:
+            continue
+        counts[key] += 1
+        wordings.setdefault(key, Counter())[entry["q"]] += 1
+    return [wordings[key].most_common(1)[0][0] for key, count in counts.most_common(n) if count >= min_count]
+
+
+# === Warm-up lease: one worker across all instances replays at a time ===
+class WarmLease:
+    """
+    Document {_id: "cache-warm", owner, expires_at} in CACHE_WARM_LOCK_COLLECTION.
+    claim() only matches an expired lease; while another worker's lease is
+    live, inserting the same _id fails. renew() extends the lease during a
+    long replay and returns False once it was lost. Without Mongo nobody
+    warms, rather than every worker calling DeepSeek N times.
+    """
+
+    def __init__(self, db, lease_seconds=CACHE_WARM_LOCK_SECONDS, owner=None):
+        self.db = db
+        self.lease_seconds = lease_seconds
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}"
+        self._renewed_at = 0.0
+
+    def _expires_at(self):
+        return datetime.now(timezone.utc) + timedelta(seconds=self.lease_seconds)
+
+    def claim(self):
+        try:
+            self.db[CACHE_WARM_LOCK_COLLECTION].find_one_and_update(
+                {"_id": "cache-warm", "expires_at": {"$lt": datetime.now(timezone.utc)}},
+                {"$set": {"owner": self.owner, "expires_at": self._expires_at()}},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            logging.info("[CACHE WARM] Another worker holds the warm-up lease; skipping")
+            return False
+        except Exception as e:
+            logging.warning(f"[CACHE WARM] Could not take the warm-up lease, skipping: {e}")
+            return False
+        self._renewed_at = time.time()
+        return True
+
+    def renew(self):
+        """
+        Extends the lease once a third of it has passed. False when it is no longer ours.
+        """
+        if time.time() < self._renewed_at + self.lease_seconds / 3:
+            return True
+        try:
+            doc = self.db[CACHE_WARM_LOCK_COLLECTION].find_one_and_update(
+                {"_id": "cache-warm", "owner": self.owner},
+                {"$set": {"expires_at": self._expires_at()}},
+            )
+        except Exception as e:
+            logging.warning(f"[CACHE WARM] Could not renew the warm-up lease, stopping: {e}")
+            return False
+        if doc is None:
+            logging.info("[CACHE WARM] Warm-up lease taken over by another worker; stopping")
+            return False
+        self._renewed_at = time.time()
+        return True
+
+
+def warm_answer_cache(answer_fn, is_cached, path=REQUEST_LOG_PATH, top_n=CACHE_WARM_TOP_N, should_stop=None):
+    """
+    Replays the top-N historical questions through answer_fn (ask_deepseek)
+    so popular answers are cached before real traffic arrives. Returns
+    (replayed, already_cached).
+    """
+    if top_n <= 0:
+        return 0, 0
+    questions = top_questions(read_records(path), top_n)
+    replayed = cached = 0
+    for question in questions:
+        if should_stop and should_stop():
+            logging.info("[CACHE WARM] Stopping early")
+            break
+        if is_cached(question):
+            cached += 1
+            continue
+        answer_fn(question)
+        replayed += 1
+    logging.info(f"🔥 Cache warm-up: {len(questions)} popular questions, {replayed} replayed, {cached} already cached")
+    return replayed, cached
@@ -0,0 +1,149 @@
+import os
+import re
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+# === Cache Config ===
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1000"))
+RESPONSE_CACHE_TTL_SECONDS = int(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "86400"))
+
+PUNCT_RE = re.compile(r"[^\w\s]")
+SPACE_RE = re.compile(r"\s+")
+# "what's" / "let's" are contractions, not possessives: spell them out before dropping possessive 's
+CONTRACTION_RE = re.compile(r"\b(let|it|that|what|who|where|when|how|there|here|he|she)'s\b")
+POSSESSIVE_RE = re.compile(r"(?<=\w)'s\b")
+
+# Filler words only; question words (what/who/when/how) are kept so
+# "who founded sanathana" and "when was sanathana founded" stay distinct.
+KEY_STOPWORDS = {
+    "a", "an", "the", "is", "are", "was", "were", "be", "do", "does", "did",
+    "please", "pls", "kindly", "tell", "me", "can", "could", "you", "hi", "hello", "hey",
+    "about", "us", "know", "let",
+}
+
+
+def _expand_contraction(match):
+    word = match.group(1)
+    return f"{word} us" if word == "let" else f"{word} is"
+
+
+def normalize_key(question):
+    """
+    Folds case, punctuation, whitespace and filler words:
+    "What is Sanathana" and "what is sanathana?" map to the same key.
+    Only a possessive 's is dropped ("Sanathana's" -> "sanathana").
+    """
+    text = CONTRACTION_RE.sub(_expand_contraction, question.lower().replace("’", "'"))
+    text = POSSESSIVE_RE.sub("", text)
+    text = PUNCT_RE.sub(" ", text)
+    words = [w for w in SPACE_RE.split(text) if w and w not in KEY_STOPWORDS]
+    return " ".join(words)
+
+
+# === Bounded LRU cache with TTL and KB-version stamping ===
+class ResponseCache:
+    def __init__(self, max_entries=RESPONSE_CACHE_MAX_ENTRIES, ttl_seconds=RESPONSE_CACHE_TTL_SECONDS, kb_version=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.kb_version = kb_version
+        self._entries = OrderedDict()   # key -> (value, expires_at or None, kb_version or None)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, question):
+        key = normalize_key(question)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at, version = entry
+            if expires_at is not None and expires_at < now:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            if version is not None and version != self.kb_version:
+                del self._entries[key]
+                self.invalidations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def contains(self, question):
+        """
+        True if get() would hit; does not touch hit/miss counters or LRU order.
+        """
+        entry = self._entries.get(normalize_key(question))
+        if entry is None:
+            return False
+        _, expires_at, version = entry
+        if expires_at is not None and expires_at < time.time():
+            return False
+        return version is None or version == self.kb_version
+
+    def set(self, question, value, ttl=None, pinned=False):
+        """
+        Stores a reply. Pinned entries (seed answers) never expire and survive KB reloads.
+        """
+        key = normalize_key(question)
+        if not key:
+            return
+        if pinned:
+            expires_at, version = None, None
+        else:
+            expires_at = time.time() + (ttl if ttl is not None else self.ttl_seconds)
+            version = self.kb_version
+        with self._lock:
+            self._entries[key] = (value, expires_at, version)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def set_kb_version(self, kb_version):
+        """
+        Switches to a new KB version and drops entries built from any other version.
+        """
+        with self._lock:
+            if kb_version == self.kb_version:
+                return 0
+            self.kb_version = kb_version
+            stale = [k for k, (_, _, v) in self._entries.items() if v is not None and v != kb_version]
+            for k in stale:
+                del self._entries[k]
+            self.invalidations += len(stale)
+        logging.info(f"♻️ Response cache moved to KB version {kb_version}, dropped {len(stale)} entries")
+        return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "kb_version": self.kb_version,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
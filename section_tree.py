@@ -0,0 +1,150 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from metrics import backend_timer
+from lazy import ProcessThread
+
+# === Section tree Config ===
+SECTION_TREE_REFRESH_SECONDS = int(os.getenv("SECTION_TREE_REFRESH_SECONDS", "60"))
+SECTION_TREE_USE_CHANGE_STREAM = os.getenv("SECTION_TREE_USE_CHANGE_STREAM", "1") == "1"
+# After a failed first load, fail fast for this long instead of waiting on Mongo every request
+SECTION_TREE_RETRY_SECONDS = int(os.getenv("SECTION_TREE_RETRY_SECONDS", "30"))
+
+
+# === Immutable snapshot of the `sections` collection ===
+class SectionSnapshot:
+    def __init__(self, docs):
+        self.docs = docs
+        self.version = hashlib.sha1(json.dumps(docs, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+        self.section_names = [d["section_name"] for d in docs if "section_name" in d]
+        self.nodes = {}     # name -> ready-to-send /section-questions payload
+
+        # Same precedence as the old Mongo queries: top-level sections,
+        # then direct sub-sections, then deeper sub-sections (depth-first)
+        for doc in docs:
+            if "section_name" in doc and doc["section_name"] not in self.nodes:
+                if doc.get("sub_sections"):
+                    payload = {"sub_sections": [s["sub_section_name"] for s in doc["sub_sections"]]}
+                else:
+                    payload = {"questions": doc.get("questions", [])}
+                self.nodes[doc["section_name"]] = payload
+        for doc in docs:
+            for sub in doc.get("sub_sections") or []:
+                self._add_sub(sub)
+        for doc in docs:
+            self._walk(doc.get("sub_sections") or [])
+
+    def _add_sub(self, sub):
+        name = sub.get("sub_section_name")
+        if name is not None and name not in self.nodes:
+            self.nodes[name] = {
+                "sub_sections": [ss["sub_section_name"] for ss in sub.get("sub_sections", [])],
+                "questions": sub.get("questions", []),
+            }
+
+    def _walk(self, subs):
+        for sub in subs:
+            self._add_sub(sub)
+            if sub.get("sub_sections"):
+                self._walk(sub["sub_sections"])
+
+    def lookup(self, name):
+        return self.nodes.get(name)
+
+
+# === In-process section tree kept in sync with Mongo ===
+class SectionTree:
+    """
+    Loads the whole `sections` collection once and answers /sections and
+    /section-questions from memory. A background thread reloads it when a
+    change stream reports a write, or every SECTION_TREE_REFRESH_SECONDS when
+    change streams are unavailable (e.g. Cosmos DB / standalone Mongo).
+    """
+
+    def __init__(self, collection_name="sections", refresh_seconds=SECTION_TREE_REFRESH_SECONDS):
+        self.collection_name = collection_name
+        self.refresh_seconds = refresh_seconds
+        self._snapshot = None
+        self._db = None
+        self._lock = threading.Lock()
+        self._watcher = ProcessThread("section-tree-watch", self._watch_loop)
+        self.reloads = 0
+        self.errors = 0
+        self.mode = None
+        self.listeners = []
+        self._retry_at = 0.0
+
+    def reload(self, db=None):
+        db = db if db is not None else self._db
+        with backend_timer("mongo", "sections_find"):
+            docs = list(db[self.collection_name].find({}, {"_id": 0}))
+        snapshot = SectionSnapshot(docs)
+        changed = self._snapshot is None or snapshot.version != self._snapshot.version
+        self._snapshot = snapshot   # atomic swap
+        self._db = db
+        self.reloads += 1
+        if changed:
+            logging.info(f"🌳 Section tree loaded: {len(docs)} sections, {len(snapshot.nodes)} nodes, version {snapshot.version}")
+            for listener in self.listeners:
+                try:
+                    listener(snapshot)
+                except Exception as e:
+                    logging.warning(f"[SECTION TREE] Listener failed: {e}")
+        return snapshot
+
+    def get(self, db):
+        """
+        Returns the current snapshot, loading it on first use.
+        """
+        if self._snapshot is None:
+            if time.time() < self._retry_at:
+                raise RuntimeError("Section tree unavailable, retrying later")
+            with self._lock:
+                if self._snapshot is None:
+                    try:
+                        self.reload(db)
+                    except Exception:
+                        self.errors += 1
+                        self._retry_at = time.time() + SECTION_TREE_RETRY_SECONDS
+                        raise
+        self._ensure_watcher()
+        return self._snapshot
+
+    def on_change(self, listener):
+        self.listeners.append(listener)
+
+    # === Background refresh (one thread per process) ===
+    def _ensure_watcher(self):
+        self._watcher.ensure()
+
+    def _watch_loop(self):
+        if SECTION_TREE_USE_CHANGE_STREAM:
+            try:
+                self.mode = "change_stream"
+                with self._db[self.collection_name].watch() as stream:
+                    for _change in stream:
+                        self.reload()
+            except Exception as e:
+                logging.info(f"[SECTION TREE] Change stream unavailable, polling every {self.refresh_seconds}s: {e}")
+        self.mode = "polling"
+        while True:
+            time.sleep(self.refresh_seconds)
+            try:
+                self.reload()
+            except Exception as e:
+                self.errors += 1
+                logging.warning(f"[SECTION TREE] Reload failed, keeping previous version: {e}")
+
+    def stats(self):
+        snapshot = self._snapshot
+        return {
+            "version": snapshot.version if snapshot else None,
+            "sections": len(snapshot.section_names) if snapshot else 0,
+            "nodes": len(snapshot.nodes) if snapshot else 0,
+            "mode": self.mode,
+            "reloads": self.reloads,
+            "errors": self.errors,
+        }
@@ -0,0 +1,194 @@
+import os
+import re
+import zlib
+import difflib
+import logging
+import threading
+import numpy as np
+from response_cache import normalize_key
+from kb_index import tokenize
+
+# === Semantic cache Config ===
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "1") == "1"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.85"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "500"))
+SEMANTIC_CACHE_DIM = int(os.getenv("SEMANTIC_CACHE_DIM", "4096"))
+NGRAM_SIZES = (3, 4, 5)
+WORD_WEIGHT = 2.0
+# Two questions whose content words differ only by typos of this similarity count as the same
+TERM_TYPO_CUTOFF = 0.8
+
+DIGITS_RE = re.compile(r"\d+")
+MONTHS = {
+    "january", "february", "march", "april", "may", "june",
+    "july", "august", "september", "october", "november", "december"
+}
+# Dropped by tokenize() as stopwords, but they flip the answer; "isn't" normalizes to "isn t"
+NEGATIONS = {"not", "no", "never", "without", "except", "cannot"}
+CONTRACTED_NOT_RE = re.compile(r"\b\w+n t\b")
+
+
+def _negations(key):
+    found = {w for w in key.split() if w in NEGATIONS}
+    if CONTRACTED_NOT_RE.search(key):
+        found.add("not")
+    return found
+
+
+def _features(text):
+    """
+    Yields (feature, weight): whole content words plus their character n-grams,
+    so "leave"/"leaves" and small typos still overlap. Negations are kept as words.
+    """
+    for word in _negations(text):
+        yield "w:" + word, WORD_WEIGHT
+    for word in tokenize(text):
+        yield "w:" + word, WORD_WEIGHT
+        padded = f" {word} "
+        for n in NGRAM_SIZES:
+            for i in range(len(padded) - n + 1):
+                yield padded[i:i + n], 1.0
+
+
+def _slot(gram, dim):
+    return zlib.crc32(gram.encode("utf-8")) % dim
+
+
+def _guard_terms(key):
+    # Numbers, month names and negations change the meaning of an otherwise identical question
+    words = key.split()
+    return (frozenset(DIGITS_RE.findall(key)) | frozenset(w for w in words if w in MONTHS)
+            | frozenset(_negations(key)))
+
+
+def _content_terms(key):
+    return frozenset(tokenize(key))
+
+
+def _same_terms(a, b):
+    """
+    True when every content word on either side is present, or present up to a
+    typo, on the other: "middle management" is not "management".
+    """
+    for word in a ^ b:
+        other = b if word in a else a
+        if not difflib.get_close_matches(word, other, n=1, cutoff=TERM_TYPO_CUTOFF):
+            return False
+    return True
+
+
+# === Hashed character n-gram TF-IDF vectors with cosine search ===
+class SemanticCache:
+    def __init__(self, threshold=SEMANTIC_CACHE_THRESHOLD, max_entries=SEMANTIC_CACHE_MAX_ENTRIES,
+                 dim=SEMANTIC_CACHE_DIM, kb_version=None):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.dim = dim
+        self.kb_version = kb_version
+        self.idf = np.ones(dim, dtype=np.float32)
+        self._matrix = np.zeros((max_entries, dim), dtype=np.float32)
+        self._entries = [None] * max_entries   # (question, answer, guard_terms, content_terms)
+        self._slots = {}                       # normalized key -> row
+        self._size = 0
+        self._next = 0
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.hits = 0
+
+    def fit_idf(self, corpus):
+        """
+        Weights n-grams by inverse document frequency over a reference corpus
+        (the KB lines), so common words like "leave" count less than "casual".
+        """
+        df = np.zeros(self.dim, dtype=np.float32)
+        n_docs = 0
+        for doc in corpus:
+            slots = {_slot(f, self.dim) for f, _ in _features(doc)}
+            if not slots:
+                continue
+            n_docs += 1
+            df[list(slots)] += 1.0
+        if n_docs:
+            self.idf = np.log((1.0 + n_docs) / (1.0 + df)).astype(np.float32) + 1.0
+
+    def vectorize(self, text):
+        vec = np.zeros(self.dim, dtype=np.float32)
+        for feature, weight in _features(text):
+            vec[_slot(feature, self.dim)] += weight
+        np.log1p(vec, out=vec)
+        vec *= self.idf
+        norm = float(np.linalg.norm(vec))
+        if norm:
+            vec /= norm
+        return vec
+
+    def lookup(self, question, threshold=None):
+        """
+        Returns {"question", "answer", "similarity"} for the closest cached
+        question at or above the threshold with the same guard terms and the
+        same content words (up to typos), otherwise None.
+        """
+        threshold = self.threshold if threshold is None else threshold
+        key = normalize_key(question)
+        if not key:
+            return None
+        vec = self.vectorize(key)
+        guard = _guard_terms(key)
+        terms = _content_terms(key)
+        with self._lock:
+            self.lookups += 1
+            if not self._size:
+                return None
+            sims = self._matrix[:self._size] @ vec
+            row = int(np.argmax(sims))
+            similarity = float(sims[row])
+            cached_q, answer, cached_guard, cached_terms = self._entries[row]
+            if similarity < threshold or cached_guard != guard or not _same_terms(cached_terms, terms):
+                return None
+            self.hits += 1
+        return {"question": cached_q, "answer": answer, "similarity": round(similarity, 4)}
+
+    def add(self, question, answer):
+        key = normalize_key(question)
+        if not key:
+            return
+        vec = self.vectorize(key)
+        with self._lock:
+            row = self._slots.get(key)
+            if row is None:
+                # Ring buffer: once full, overwrite the oldest row
+                row = self._next
+                old = self._entries[row]
+                if old is not None:
+                    self._slots.pop(normalize_key(old[0]), None)
+                self._next = (self._next + 1) % self.max_entries
+                self._size = min(self._size + 1, self.max_entries)
+                self._slots[key] = row
+            self._matrix[row] = vec
+            self._entries[row] = (question, answer, _guard_terms(key), _content_terms(key))
+
+    def set_kb_version(self, kb_version):
+        with self._lock:
+            if kb_version == self.kb_version:
+                return
+            self.kb_version = kb_version
+            self._matrix[:] = 0.0
+            self._entries = [None] * self.max_entries
+            self._slots.clear()
+            self._size = 0
+            self._next = 0
+        logging.info(f"♻️ Semantic cache cleared for KB version {kb_version}")
+
+    def hit_rate(self):
+        return round(self.hits / self.lookups, 4) if self.lookups else 0.0
+
+    def stats(self):
+        return {
+            "enabled": SEMANTIC_CACHE_ENABLED,
+            "size": self._size,
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "hit_rate": self.hit_rate(),
+        }
@@ -0,0 +1,181 @@
+import os
+import queue
+import logging
+from datetime import datetime, timedelta, timezone
+from pymongo import UpdateOne
+from response_cache import normalize_key, RESPONSE_CACHE_TTL_SECONDS
+from metrics import backend_timer
+from lazy import ProcessThread, Backoff
+
+# === Shared (cross-worker) cache Config ===
+SHARED_CACHE_ENABLED = os.getenv("SHARED_CACHE_ENABLED", "1") == "1"
+SHARED_CACHE_COLLECTION = os.getenv("SHARED_CACHE_COLLECTION", "answer_cache")
+SHARED_CACHE_TTL_SECONDS = int(os.getenv("SHARED_CACHE_TTL_SECONDS", str(RESPONSE_CACHE_TTL_SECONDS)))
+SHARED_CACHE_QUEUE_SIZE = int(os.getenv("SHARED_CACHE_QUEUE_SIZE", "500"))
+SHARED_CACHE_READ_TIMEOUT_MS = int(os.getenv("SHARED_CACHE_READ_TIMEOUT_MS", "150"))
+# After a Mongo error, skip L2 for this long instead of stalling every request
+SHARED_CACHE_BACKOFF_SECONDS = int(os.getenv("SHARED_CACHE_BACKOFF_SECONDS", "30"))
+
+
+# === L2: answers persisted in Mongo (sanathana_chatbot_v1.answer_cache) ===
+class MongoAnswerCache:
+    """
+    Documents: {_id: normalized question, answer, kb_version, created_at, expires_at}.
+    A TTL index on expires_at lets Mongo purge old answers; writes go through a
+    background queue so the reply path never waits on Mongo.
+    """
+
+    def __init__(self, collection_name=SHARED_CACHE_COLLECTION, ttl_seconds=SHARED_CACHE_TTL_SECONDS,
+                 queue_size=SHARED_CACHE_QUEUE_SIZE):
+        self.collection_name = collection_name
+        self.ttl_seconds = ttl_seconds
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._writer = ProcessThread("shared-cache-writer", self._writer_loop)
+        self._indexed = set()
+        self.backoff = Backoff("SHARED CACHE", SHARED_CACHE_BACKOFF_SECONDS, "bypassing L2")
+        self.hits = 0
+        self.misses = 0
+        self.writes_queued = 0
+        self.writes_dropped = 0
+        self.writes_flushed = 0
+
+    def _collection(self, db):
+        coll = db[self.collection_name]
+        if id(db) not in self._indexed:
+            try:
+                coll.create_index("expires_at", expireAfterSeconds=0)
+                coll.create_index("kb_version")
+                self._indexed.add(id(db))
+            except Exception as e:
+                logging.warning(f"[SHARED CACHE] Could not ensure indexes: {e}")
+        return coll
+
+    def _available(self, db):
+        return db is not None and self.backoff.available()
+
+    def _fail(self, e):
+        self.backoff.fail(e)
+
+    def get(self, db, key, kb_version):
+        if not self._available(db):
+            return None
+        try:
+            with backend_timer("mongo", "answer_cache_get"):
+                doc = self._collection(db).find_one(
+                    {"_id": key, "kb_version": kb_version,
+                     "expires_at": {"$gt": datetime.now(timezone.utc)}},
+                    {"answer": 1},
+                    max_time_ms=SHARED_CACHE_READ_TIMEOUT_MS,
+                )
+        except Exception as e:
+            self._fail(e)
+            return None
+        if doc is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return doc["answer"]
+
+    def put(self, db, key, answer, kb_version):
+        if not self._available(db):
+            return
+        self._ensure_writer()
+        now = datetime.now(timezone.utc)
+        doc = {
+            "answer": answer,
+            "kb_version": kb_version,
+            "created_at": now,
+            "expires_at": now + timedelta(seconds=self.ttl_seconds),
+        }
+        try:
+            self._queue.put_nowait((db, key, doc))
+            self.writes_queued += 1
+        except queue.Full:
+            self.writes_dropped += 1
+
+    # === Write-behind worker (one per process; restarted after gunicorn fork) ===
+    def _ensure_writer(self):
+        self._writer.ensure()
+
+    def _writer_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < 50:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            by_db = {}
+            for db, key, doc in batch:
+                by_db.setdefault(id(db), (db, []))[1].append(
+                    UpdateOne({"_id": key}, {"$set": doc}, upsert=True))
+            for db, ops in by_db.values():
+                try:
+                    with backend_timer("mongo", "answer_cache_bulk_write"):
+                        self._collection(db).bulk_write(ops, ordered=False)
+                    self.writes_flushed += len(ops)
+                except Exception as e:
+                    self._fail(e)
+
+    def stats(self):
+        return {
+            "enabled": SHARED_CACHE_ENABLED,
+            "collection": self.collection_name,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.backoff.errors,
+            "writes_queued": self.writes_queued,
+            "writes_dropped": self.writes_dropped,
+            "writes_flushed": self.writes_flushed,
+            "pending_writes": self._queue.qsize(),
+            "bypassed": self.backoff.bypassed,
+        }
+
+
+# === L1 (in-process ResponseCache) in front of L2 (Mongo) ===
+class TieredCache:
+    def __init__(self, l1, l2=None, db_provider=None):
+        self.l1 = l1
+        self.l2 = l2 if SHARED_CACHE_ENABLED else None
+        self.db_provider = db_provider or (lambda: None)
+
+    @property
+    def kb_version(self):
+        return self.l1.kb_version
+
+    def get(self, question):
+        value = self.l1.get(question)
+        if value is not None or self.l2 is None:
+            return value
+        value = self.l2.get(self.db_provider(), normalize_key(question), self.l1.kb_version)
+        if value is not None:
+            self.l1.set(question, value)
+        return value
+
+    def contains(self, question):
+        # L1 only: used for admission decisions, which must not wait on Mongo
+        return self.l1.contains(question)
+
+    def set(self, question, value, ttl=None, pinned=False):
+        self.l1.set(question, value, ttl=ttl, pinned=pinned)
+        if pinned or self.l2 is None:
+            return
+        key = normalize_key(question)
+        if key:
+            self.l2.put(self.db_provider(), key, value, self.l1.kb_version)
+
+    def set_kb_version(self, kb_version):
+        # L2 lookups filter on kb_version, so old Mongo entries simply stop matching
+        return self.l1.set_kb_version(kb_version)
+
+    def clear(self):
+        self.l1.clear()
+
+    def __len__(self):
+        return len(self.l1)
+
+    def stats(self):
+        data = self.l1.stats()
+        data["shared"] = self.l2.stats() if self.l2 is not None else {"enabled": False}
+        return data
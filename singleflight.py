@@ -0,0 +1,126 @@
+import os
+import asyncio
+import logging
+import threading
+
+# === Single-flight: concurrent identical calls share one execution ===
+
+
+class _Call:
+    __slots__ = ("event", "result", "error", "waiters")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    do(key, fn) runs fn() once per key at a time. Callers arriving while a call
+    for the same key is in flight wait for it and get the same result (or the
+    same exception) instead of starting their own upstream request.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._reset()
+
+    def _reset(self):
+        # Threads do not survive fork: a child must not wait on its parent's calls
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.leaders = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.timeouts = 0
+
+    def do(self, key, fn, timeout=None):
+        """
+        Returns (result, shared). shared is True when the result came from
+        another caller's in-flight call.
+        """
+        if self._pid != os.getpid():
+            self._reset()
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+            else:
+                call.waiters += 1
+                self.coalesced += 1
+
+        if not leader:
+            if not call.event.wait(timeout):
+                self.timeouts += 1
+                raise TimeoutError(f"{self.name}: timed out waiting for in-flight call")
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            self.errors += 1
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+            if call.waiters:
+                logging.info(f"[SINGLE FLIGHT] {self.name}: {call.waiters} request(s) shared one call")
+        return call.result, False
+
+    def stats(self):
+        return {
+            "in_flight": len(self._calls),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+        }
+
+
+class AsyncSingleFlight:
+    """
+    Event-loop version of SingleFlight. The shared call runs as its own task,
+    so a cancelled (disconnected) leader does not cancel it for the waiters.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._tasks = {}
+        self.leaders = 0
+        self.coalesced = 0
+        self.errors = 0
+
+    async def do(self, key, coro_fn):
+        task = self._tasks.get(key)
+        shared = task is not None
+        if shared:
+            self.coalesced += 1
+        else:
+            self.leaders += 1
+            task = asyncio.ensure_future(coro_fn())
+            self._tasks[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+        return await asyncio.shield(task), shared
+
+    def _done(self, key, task):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        if not task.cancelled() and task.exception() is not None:
+            self.errors += 1
+
+    def stats(self):
+        return {
+            "in_flight": len(self._tasks),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+        }
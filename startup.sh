@@ -1 +1,7 @@
-gunicorn app:app -b 0.0.0.0:8000 --timeout 800
+# Settings (bind, timeout, preload, post-fork warm-up) live in gunicorn.conf.py
+# SERVING_MODE=asgi runs the chat endpoints on an asyncio event loop (see asgi.py)
+if [ "$SERVING_MODE" = "asgi" ]; then
+    gunicorn -c gunicorn.conf.py asgi:application -k uvicorn.workers.UvicornWorker
+else
+    gunicorn -c gunicorn.conf.py app:app
+fi
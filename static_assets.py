@@ -0,0 +1,159 @@
+import os
+import re
+import gzip
+import hashlib
+import logging
+import mimetypes
+
+try:
+    import brotli       # optional: pip install brotli
+except ImportError:
+    brotli = None
+
+# === Static assets Config ===
+# STATIC_PRECOMPRESS=0 serves the React build straight from disk (old behaviour)
+STATIC_PRECOMPRESS = os.getenv("STATIC_PRECOMPRESS", "1") == "1"
+STATIC_MIN_COMPRESS_BYTES = int(os.getenv("STATIC_MIN_COMPRESS_BYTES", "1024"))
+STATIC_MAX_FILE_BYTES = int(os.getenv("STATIC_MAX_FILE_BYTES", str(8 * 1024 * 1024)))
+STATIC_GZIP_LEVEL = int(os.getenv("STATIC_GZIP_LEVEL", "9"))
+STATIC_BROTLI_QUALITY = int(os.getenv("STATIC_BROTLI_QUALITY", "11"))
+STATIC_IMMUTABLE_MAX_AGE = int(os.getenv("STATIC_IMMUTABLE_MAX_AGE", "31536000"))
+
+# Text formats worth compressing; images and fonts are already compressed
+COMPRESSIBLE_EXTENSIONS = {".html", ".js", ".css", ".json", ".map", ".svg", ".txt", ".xml", ".ico", ".webmanifest"}
+# Content-hashed CRA build output: main.3f2a1b9c.js, 787.1a2b3c4d.chunk.js, logo.5d5d9eef.svg
+HASHED_NAME_RE = re.compile(r"\.[0-9a-f]{8,}\.(?:chunk\.)?[A-Za-z0-9]+$")
+
+IMMUTABLE_CACHE_CONTROL = f"public, max-age={STATIC_IMMUTABLE_MAX_AGE}, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+
+def is_hashed(path):
+    return bool(HASHED_NAME_RE.search(path))
+
+
+def cache_control_for(path):
+    # Hashed names change whenever their content does; everything else must be revalidated
+    return IMMUTABLE_CACHE_CONTROL if is_hashed(path) else REVALIDATE_CACHE_CONTROL
+
+
+def accepted_encodings(header):
+    """
+    "gzip, deflate, br;q=0.5" -> {"gzip": 1.0, "deflate": 1.0, "br": 0.5}
+    """
+    accepted = {}
+    for part in (header or "").split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    return accepted
+
+
+def etag_matches(if_none_match, etag):
+    for candidate in (if_none_match or "").split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/").strip('"') == etag:
+            return True
+    return False
+
+
+# === One build file held in memory with its precompressed variants ===
+class StaticAsset:
+    def __init__(self, path, data):
+        self.path = path
+        self.mimetype = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        if self.mimetype.startswith("text/") or self.mimetype in ("application/javascript", "application/json"):
+            self.mimetype += "; charset=utf-8"
+        self.cache_control = cache_control_for(path)
+        digest = hashlib.sha1(data).hexdigest()[:16]
+        self.variants = {None: (data, digest)}     # encoding -> (body, etag)
+        if len(data) >= STATIC_MIN_COMPRESS_BYTES and os.path.splitext(path)[1].lower() in COMPRESSIBLE_EXTENSIONS:
+            # Keep a variant only if it saves at least 10%
+            compressed = gzip.compress(data, compresslevel=STATIC_GZIP_LEVEL, mtime=0)
+            if len(compressed) < len(data) * 0.9:
+                self.variants["gzip"] = (compressed, f"{digest}-gz")
+            if brotli is not None:
+                compressed = brotli.compress(data, quality=STATIC_BROTLI_QUALITY)
+                if len(compressed) < len(data) * 0.9:
+                    self.variants["br"] = (compressed, f"{digest}-br")
+
+    def select(self, accept_encoding):
+        """
+        Returns (body, content_encoding or None, etag) for the client's Accept-Encoding.
+        """
+        accepted = accepted_encodings(accept_encoding)
+        for encoding in ("br", "gzip"):
+            if encoding in self.variants and accepted.get(encoding, accepted.get("*", 0)) > 0:
+                body, etag = self.variants[encoding]
+                return body, encoding, etag
+        body, etag = self.variants[None]
+        return body, None, etag
+
+    def nbytes(self):
+        return sum(len(body) for body, _ in self.variants.values())
+
+
+# === The React build, loaded once (before fork with gunicorn --preload) ===
+class StaticAssets:
+    """
+    Reads every file of the build into memory at startup and precompresses the
+    text ones, so asset requests are a dict lookup plus a write: no disk
+    reads, no per-request compression. Files over STATIC_MAX_FILE_BYTES stay
+    on disk and are served with the same cache headers.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.assets = {}    # "static/js/main.3f2a1b9c.js" -> StaticAsset
+        self.on_disk = 0
+        self.served = 0
+        self.not_modified = 0
+
+    def load(self):
+        if not os.path.isdir(self.root):
+            logging.warning(f"[STATIC] Build folder {self.root} not found; nothing to serve")
+            return
+        raw = 0
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                full = os.path.join(dirpath, filename)
+                rel = os.path.relpath(full, self.root).replace(os.sep, "/")
+                if os.path.getsize(full) > STATIC_MAX_FILE_BYTES:
+                    self.on_disk += 1
+                    continue
+                with open(full, "rb") as f:
+                    data = f.read()
+                raw += len(data)
+                self.assets[rel] = StaticAsset(rel, data)
+        logging.info(f"📦 Static assets: {len(self.assets)} files in memory ({raw / 1024:.0f} KB raw, "
+                     f"{self.nbytes() / 1024:.0f} KB with variants), brotli={'on' if brotli else 'off'}")
+
+    def get(self, path):
+        return self.assets.get(path)
+
+    def nbytes(self):
+        return sum(asset.nbytes() for asset in self.assets.values())
+
+    def stats(self):
+        encodings = {}
+        for asset in self.assets.values():
+            for encoding in asset.variants:
+                encodings[encoding or "identity"] = encodings.get(encoding or "identity", 0) + 1
+        return {
+            "root": self.root,
+            "files": len(self.assets),
+            "bytes": self.nbytes(),
+            "variants": encodings,
+            "on_disk": self.on_disk,
+            "brotli": brotli is not None,
+            "served": self.served,
+            "not_modified": self.not_modified,
+        }
@@ -0,0 +1,20 @@
+import os
+import sys
+import tempfile
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+os.environ.setdefault("REQUEST_LOG_PATH", os.path.join(tempfile.gettempdir(), "test-requests.jsonl"))
+
+
+@pytest.fixture(scope="session")
+def bench_env():
+    """
+    The Flask app with every external service faked (see bench/boot.py).
+    """
+    from bench.boot import boot
+    return boot(llm_latency=0.05, llm_jitter=0.0, sheets_latency=0.0, mongo_latency=0.0, users=2,
+                warm_up=False)
@@ -0,0 +1,70 @@
+import time
+import asyncio
+import threading
+
+
+async def asgi_get(app, path):
+    sent = []
+    received = False
+
+    async def receive():
+        nonlocal received
+        if received:
+            await asyncio.sleep(3600)
+        received = True
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": b"", "root_path": "", "headers": [(b"host", b"test")],
+        "client": ("127.0.0.1", 50000), "server": ("test", 80),
+    }
+    await app(scope, receive, send)
+    status = next(m["status"] for m in sent if m["type"] == "http.response.start")
+    body = b"".join(m.get("body", b"") for m in sent if m["type"] == "http.response.body")
+    return status, body
+
+
+def slow_wsgi_app(delay, seen_threads):
+    def app(environ, start_response):
+        seen_threads.add(threading.get_ident())
+        time.sleep(delay)
+        start_response("200 OK", [("Content-Type", "text/plain")])
+        return [b"ok"]
+    return app
+
+
+async def gather_gets(app, path, n):
+    return await asyncio.gather(*(asgi_get(app, path) for _ in range(n)))
+
+
+def test_fallback_serves_sync_requests_in_parallel(bench_env):
+    from asgi import wsgi_adapter
+    seen = set()
+    adapter = wsgi_adapter(slow_wsgi_app(0.2, seen), threads=16)
+    started = time.perf_counter()
+    results = asyncio.run(gather_gets(adapter, "/slow", 16))
+    elapsed = time.perf_counter() - started
+    assert all(status == 200 and body == b"ok" for status, body in results)
+    assert elapsed < 1.0          # one shared thread would take 16 * 0.2s
+    assert len(seen) > 1
+
+
+def test_fallback_pool_is_bounded(bench_env):
+    from asgi import wsgi_adapter
+    seen = set()
+    adapter = wsgi_adapter(slow_wsgi_app(0.1, seen), threads=4)
+    started = time.perf_counter()
+    asyncio.run(gather_gets(adapter, "/slow", 12))
+    assert time.perf_counter() - started >= 0.3
+    assert len(seen) <= 4
+
+
+def test_application_falls_back_to_flask_concurrently(bench_env):
+    import asgi
+    results = asyncio.run(gather_gets(asgi.application, "/health", 32))
+    assert [status for status, _ in results] == [200] * 32
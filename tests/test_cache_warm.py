@@ -0,0 +1,63 @@
+import uuid
+from bench.fakes import FakeMongoClient
+from request_log import WarmLease, top_questions, warm_answer_cache
+
+
+def fresh_db():
+    return FakeMongoClient().get_database(f"test-{uuid.uuid4().hex}")
+
+
+def records(*pairs):
+    return [{"q": q, "branch": branch} for q, branch in pairs]
+
+
+def test_top_questions_only_replays_cacheable_branches():
+    log = records(("what is the dress code", "llm"), ("what is the dress code", "cache"),
+                  ("how many casual leaves do I get", "llm"), ("how many casual leaves do I get", "semantic_cache"),
+                  ("my leave balance", "leave"), ("my leave balance", "leave"),
+                  ("upcoming birthdays", "birthday"), ("upcoming birthdays", "birthday"))
+    assert top_questions(log, n=10, min_count=2) == ["what is the dress code", "how many casual leaves do I get"]
+
+
+def test_only_one_worker_claims_the_lease():
+    db = fresh_db()
+    assert WarmLease(db, owner="worker-1").claim()
+    assert not WarmLease(db, owner="worker-2").claim()
+    assert db["locks"].find_one({"_id": "cache-warm"})["owner"] == "worker-1"
+
+
+def test_expired_lease_can_be_taken_over():
+    db = fresh_db()
+    first = WarmLease(db, lease_seconds=-1, owner="worker-1")
+    assert first.claim()
+    assert WarmLease(db, owner="worker-2").claim()
+    assert db["locks"].find_one({"_id": "cache-warm"})["owner"] == "worker-2"
+    assert not first.renew()        # worker-1 must stop replaying
+
+
+def test_renew_extends_the_lease():
+    db = fresh_db()
+    lease = WarmLease(db, lease_seconds=600, owner="worker-1")
+    assert lease.claim()
+    before = db["locks"].find_one({"_id": "cache-warm"})["expires_at"]
+    assert lease.renew()            # too early: no round trip, still ours
+    lease._renewed_at = 0.0
+    assert lease.renew()
+    assert db["locks"].find_one({"_id": "cache-warm"})["expires_at"] >= before
+    assert not WarmLease(db, owner="worker-2").claim()
+
+
+def test_no_mongo_means_no_warming():
+    class Down:
+        def __getitem__(self, name):
+            raise ConnectionError("mongo down")
+    assert not WarmLease(Down()).claim()
+
+
+def test_warm_answer_cache_stops_when_asked(tmp_path):
+    path = tmp_path / "requests.jsonl"
+    path.write_text("".join(f'{{"q": "{q}", "branch": "llm"}}\n' for q in ["dress code"] * 3 + ["canteen menu"] * 2))
+    replayed = []
+    warm_answer_cache(replayed.append, is_cached=lambda q: False, path=str(path), top_n=10,
+                      should_stop=lambda: len(replayed) >= 1)
+    assert replayed == ["dress code"]
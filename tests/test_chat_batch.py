@@ -0,0 +1,82 @@
+import time
+import pytest
+
+SLOW = "what is the history of sanathana"
+
+
+@pytest.fixture
+def chatbot(bench_env, monkeypatch):
+    import chatbot
+    calls = []
+
+    def answer(question, deadline=None):
+        calls.append(question)
+        if question == SLOW:
+            time.sleep(1.0)
+        if "broken" in question:
+            raise RuntimeError("upstream 500")
+        return f"answer to {question}"
+
+    def local(question, emp_id, meta):
+        if question == "cached question":
+            meta["source"] = "cache"
+            return "cached answer"
+        return None
+    monkeypatch.setattr(chatbot, "answer_with_deepseek", answer)
+    monkeypatch.setattr(chatbot, "resolve_locally", local)
+    monkeypatch.setattr(chatbot, "SEMANTIC_CACHE_ENABLED", False)
+    monkeypatch.setattr(chatbot, "calls", calls, raising=False)
+    return chatbot
+
+
+def test_batch_answers_locally_first_and_dedupes(chatbot):
+    questions = ["cached question", "what are the office timings", "What are the office timings?"]
+    results, llm_calls = chatbot.answer_batch(questions, deadline=5)
+    assert results[0] == {"response": "cached answer", "meta": {"source": "cache"}}
+    assert llm_calls == 1
+    assert chatbot.calls == ["what are the office timings"]
+    assert results[1]["response"] == results[2]["response"] == "answer to what are the office timings"
+    assert results[2]["meta"]["source"] == "llm"
+
+
+def test_batch_deadline_degrades_only_the_slow_question(chatbot):
+    started = time.time()
+    results, _ = chatbot.answer_batch(["what is the leave policy", SLOW], deadline=0.3)
+    assert time.time() - started < 0.9
+    assert results[0]["meta"] == {"source": "llm"}
+    assert results[1]["meta"] == {"llm_error": "deadline", "source": "fallback"}
+    assert results[1]["response"] == chatbot.fallback_reply(SLOW)
+
+
+def test_batch_errors_get_the_degraded_reply(chatbot):
+    results, _ = chatbot.answer_batch(["broken question"], deadline=5)
+    assert results[0]["meta"] == {"llm_error": "error", "source": "fallback"}
+
+
+def test_settle_batch_marks_missing_outcomes_as_deadline(chatbot):
+    pending = {"a": ("when was sanathana founded", [0, 1])}
+    results = chatbot.settle_batch([None, None], pending, {})
+    assert results[0] == results[1]
+    assert results[0]["meta"]["llm_error"] == "deadline"
+    assert results[0]["response"] == "Founded in 2017"
+
+
+def test_parse_batch_request_validates_messages(chatbot):
+    assert chatbot.parse_batch_request({"messages": [" hi "], "emp_id": "E1"}) == (["hi"], "E1")
+    assert chatbot.parse_batch_request({"messages": []}) == (None, None)
+    assert chatbot.parse_batch_request({"messages": ["ok", ""]}) == (None, None)
+    assert chatbot.parse_batch_request({"messages": ["x" * 501]}) == (None, None)
+    too_many = ["q"] * (chatbot.CHAT_BATCH_MAX_MESSAGES + 1)
+    assert chatbot.parse_batch_request({"messages": too_many}) == (None, None)
+    assert chatbot.parse_batch_request(["not", "a", "dict"]) == (None, None)
+
+
+def test_batch_endpoint(chatbot):
+    from app import app
+    with app.test_client() as http:
+        assert http.post("/chatbot/chat-batch", json={"messages": []}).status_code == 400
+        resp = http.post("/chatbot/chat-batch", json={"messages": ["cached question", "where is the office"]})
+    body = resp.get_json()
+    assert resp.status_code == 200
+    assert body["meta"]["count"] == 2 and body["meta"]["llm_calls"] == 1
+    assert [r["message"] for r in body["responses"]] == ["cached question", "where is the office"]
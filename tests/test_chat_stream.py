@@ -0,0 +1,103 @@
+import json
+import asyncio
+from types import SimpleNamespace
+import pytest
+
+SENTENCES = ["Leave is applied ", "in HRMS. ", "Approval takes ", "a day. ", "Your manager ", "gets a mail. ", "Extra."]
+
+
+def chunk(text):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+
+
+class FakeStream:
+    def __init__(self, parts):
+        self.parts = list(parts)
+        self.consumed = 0
+        self.closed = False
+
+    def __iter__(self):
+        for part in self.parts:
+            self.consumed += 1
+            yield chunk(part)
+
+    def close(self):
+        self.closed = True
+
+
+class AsyncFakeStream(FakeStream):
+    async def __aiter__(self):
+        for part in self.parts:
+            self.consumed += 1
+            yield chunk(part)
+
+    async def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def chatbot(bench_env, monkeypatch):
+    import chatbot
+    remembered = []
+    monkeypatch.setattr(chatbot, "resolve_locally", lambda question, emp_id, meta: None)
+    monkeypatch.setattr(chatbot, "remember_reply", lambda question, reply, kb_version: remembered.append(reply))
+    monkeypatch.setattr(chatbot, "remembered", remembered, raising=False)
+    return chatbot
+
+
+def test_stream_stops_upstream_at_the_two_sentence_cutoff(chatbot, monkeypatch):
+    stream = FakeStream(SENTENCES)
+    monkeypatch.setattr(chatbot, "call_deepseek_with_retry", lambda **kwargs: stream)
+    meta = {}
+    text = "".join(chatbot.stream_deepseek("how do I apply for leave", None, meta))
+    assert text == "Leave is applied in HRMS. Approval takes a day."
+    assert stream.consumed == 4             # stopped as soon as the second sentence ended
+    assert stream.closed
+    assert meta["source"] == "llm"
+    assert chatbot.remembered == [text]
+
+
+def test_stream_falls_back_before_the_first_delta(chatbot, monkeypatch):
+    def fail(**kwargs):
+        raise chatbot.CircuitOpen("open")
+    monkeypatch.setattr(chatbot, "call_deepseek_with_retry", fail)
+    meta = {}
+    parts = list(chatbot.stream_deepseek("who founded sanathana", None, meta))
+    assert len(parts) == 1
+    assert meta["llm_error"] == "circuit_open"
+    assert chatbot.remembered == []
+
+
+def test_sse_endpoint_sends_deltas_then_done(chatbot, monkeypatch):
+    from app import app
+    monkeypatch.setattr(chatbot, "call_deepseek_with_retry", lambda **kwargs: FakeStream(SENTENCES))
+    with app.test_client() as http:
+        resp = http.post("/chatbot/chat-stream", json={"message": "how do I apply for leave"})
+        body = resp.get_data(as_text=True)
+    assert resp.mimetype == "text/event-stream"
+    events = [block for block in body.split("\n\n") if block]
+    assert events[-1].startswith("event: done\n")
+    done = json.loads(events[-1].split("data: ", 1)[1])
+    assert done["response"] == "Leave is applied in HRMS. Approval takes a day."
+    deltas = [json.loads(e.split("data: ", 1)[1])["delta"] for e in events[:-1]]
+    assert "".join(deltas) == done["response"]
+
+
+def test_async_stream_has_the_same_cutoff(chatbot, monkeypatch):
+    import chatbot_async
+    stream = AsyncFakeStream(SENTENCES)
+
+    async def no_local_answer(question, emp_id, meta):
+        return None
+
+    async def connect(**kwargs):
+        return stream
+    monkeypatch.setattr(chatbot_async, "resolve_locally_async", no_local_answer)
+    monkeypatch.setattr(chatbot_async, "call_deepseek_with_retry_async", connect)
+    monkeypatch.setattr(chatbot_async, "remember_reply", lambda *args: None)
+
+    async def collect():
+        return [part async for part in chatbot_async.stream_deepseek_async("how do I apply for leave")]
+    assert "".join(asyncio.run(collect())) == "Leave is applied in HRMS. Approval takes a day."
+    assert stream.consumed == 4
+    assert stream.closed
@@ -0,0 +1,102 @@
+import pytest
+import db
+from db import ConnectionPool, PoolTimeout
+
+
+class FakeConn:
+    def __init__(self, n):
+        self.n = n
+        self.closed = False
+        self.connected = True
+
+    def rollback(self):
+        pass
+
+    def is_connected(self):
+        return self.connected
+
+    def close(self):
+        self.closed = True
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    c = Clock()
+    monkeypatch.setattr(db.time, "time", c)
+    return c
+
+
+def make_pool(**kwargs):
+    made = []
+
+    def connect():
+        made.append(FakeConn(len(made)))
+        return made[-1]
+    return ConnectionPool(connect=connect, **kwargs), made
+
+
+def test_connections_are_reused(clock):
+    pool, made = make_pool(size=2)
+    with pool.connection() as first:
+        pass
+    with pool.connection() as second:
+        assert second is first
+    assert len(made) == 1
+    assert pool.stats()["checkouts"] == 2
+
+
+def test_old_connections_are_recycled(clock):
+    pool, made = make_pool(size=1, recycle=60)
+    with pool.connection():
+        pass
+    clock.now += 61
+    with pool.connection() as conn:
+        assert conn is made[1]
+    assert made[0].closed
+    assert pool.stats()["recycled"] == 1
+
+
+def test_idle_connections_are_health_checked(clock):
+    pool, made = make_pool(size=1, ping_after=30)
+    with pool.connection():
+        pass
+    made[0].connected = False
+    clock.now += 10
+    with pool.connection() as conn:
+        assert conn is made[0]          # not idle long enough to be pinged
+    clock.now += 31
+    with pool.connection() as conn:
+        assert conn is made[1]
+    assert pool.stats()["health_check_failures"] == 1
+
+
+def test_exhausted_pool_times_out():
+    pool, _ = make_pool(size=1, timeout=0.05)
+    conn = pool.acquire()
+    with pytest.raises(PoolTimeout):
+        pool.acquire()
+    pool.release(conn)
+    assert pool.stats()["timeouts"] == 1
+    assert pool.stats()["in_use"] == 0
+
+
+def test_child_process_starts_with_an_empty_pool(clock):
+    pool, made = make_pool(size=1)
+    with pool.connection():
+        pass
+    parent_conn = pool.acquire()
+    pool._pid -= 1                      # as seen from a forked child
+    child_conn = pool.acquire()
+    assert child_conn is made[1]        # the parent's connections are never handed out
+    assert pool.stats()["checkouts"] == 1
+    pool.release(child_conn)
+    assert pool.stats()["idle"] == 1
+    assert not parent_conn.closed       # the parent's socket is left alone
@@ -0,0 +1,59 @@
+from datetime import date
+from employee_directory import EmployeeDirectory, parse_employees
+
+KB = """EMPLOYEES
+Employee ID: S001, EMPLOYEE NAME : Shiva Kumar, DATE OF BIRTH: 05-03-1990, DEPARTMENT: Engineering
+Employee ID: S002, EMPLOYEE NAME : Priya Sharma, DATE OF BIRTH: 28-02-1992, DEPARTMENT: HR
+Employee ID: S003, EMPLOYEE NAME : Ravi Kumar, DATE OF BIRTH: 29-02-1988, DEPARTMENT: Sales
+Employee ID: S004, EMPLOYEE NAME : Anita Rao, DEPARTMENT: Finance
+Sanathana was founded in 2012.
+"""
+
+
+def test_parse_employees_keeps_records_without_dob():
+    employees = parse_employees(KB)
+    assert [e.emp_id for e in employees] == ["S001", "S002", "S003", "S004"]
+    assert employees[0].name == "Shiva Kumar"
+    assert employees[0].dob == date(1990, 3, 5)
+    assert employees[3].dob is None and employees[3].birthday_line() is None
+
+
+def test_birthday_line_formats_the_date():
+    shiva = parse_employees(KB)[0]
+    assert shiva.birthday_line() == "Shiva Kumar's birthday is 05-Mar-1990."
+
+
+def test_birthdays_in_month_are_sorted_by_day():
+    directory = EmployeeDirectory(KB)
+    assert directory.birthdays_in_month(2) == ["Priya Sharma - 28-Feb", "Ravi Kumar - 29-Feb"]
+    assert directory.birthdays_in_month(7) == []
+
+
+def test_find_by_token_prefix_substring_and_fuzzy():
+    directory = EmployeeDirectory(KB)
+    assert [e.emp_id for e in directory.find("kumar")] == ["S001", "S003"]
+    assert [e.emp_id for e in directory.find("pri")] == ["S002"]
+    assert [e.emp_id for e in directory.find("shiva kumar")] == ["S001"]
+    assert [e.emp_id for e in directory.find("anitha")] == ["S004"]
+    assert directory.find("  ") == []
+
+
+def test_find_in_question_prefers_all_words():
+    directory = EmployeeDirectory(KB)
+    assert [e.emp_id for e in directory.find_in_question("When is Shiva Kumar's birthday?")] == ["S001"]
+    assert [e.emp_id for e in directory.find_in_question("birthday of kumar")] == ["S001", "S003"]
+    assert directory.find_in_question("when is the next holiday") == []
+
+
+def test_upcoming_birthdays_wrap_the_year_and_handle_feb_29():
+    directory = EmployeeDirectory(KB)
+    upcoming = directory.upcoming_birthdays(10, today=date(2025, 2, 25))
+    assert [(e.emp_id, when, days) for e, when, days in upcoming] == [
+        ("S002", date(2025, 2, 28), 3),
+        ("S003", date(2025, 2, 28), 3),      # 29-Feb in a non-leap year
+        ("S001", date(2025, 3, 5), 8),
+    ]
+    upcoming = directory.upcoming_birthdays(5, today=date(2025, 12, 30))
+    assert upcoming == []
+    upcoming = directory.upcoming_birthdays(70, today=date(2025, 12, 30))
+    assert upcoming[0][1] == date(2026, 2, 28)
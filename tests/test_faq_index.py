@@ -0,0 +1,57 @@
+import pytest
+from bench.fakes import sample_sections
+from faq_index import FAQIndex, FAQMatcher
+
+
+def sample_entries():
+    entries = []
+    for sec in sample_sections():
+        for q in sec["questions"]:
+            entries.append(dict(q, section=sec["section_name"]))
+        for sub in sec.get("sub_sections", []):
+            for q in sub["questions"]:
+                entries.append(dict(q, section=sec["section_name"], sub_section=sub["sub_section_name"]))
+    return entries
+
+
+@pytest.fixture
+def matcher():
+    m = FAQMatcher()
+    m.rebuild(sample_entries(), version="test")
+    return m
+
+
+@pytest.mark.parametrize("question, expected", [
+    ("How do I apply for leave?", "How do I apply for leave?"),
+    ("what's the notice period", "What is the notice period?"),
+    ("how do i reset my pasword", "How do I reset my password?"),
+    ("office timings", "What are the office timings?"),
+    ("when is my salary credited", "When is salary credited?"),
+])
+def test_rephrased_questions_match(matcher, question, expected):
+    match = matcher.match(question)
+    assert match is not None
+    assert match["question"] == expected
+
+
+@pytest.mark.parametrize("question", [
+    "What is the notice period for interns?",
+    "how do I apply for maternity leave?",
+    "office timings on Saturday",
+    "reset my laptop password",
+])
+def test_more_specific_questions_do_not_match_generic_answers(matcher, question):
+    assert matcher.match(question) is None
+
+
+def test_unknown_words_lower_the_score():
+    index = FAQIndex(sample_entries())
+    generic = index.search("What is the notice period?")[0][0]
+    specific = index.search("What is the notice period for interns?")[0][0]
+    assert specific < generic
+    assert index.search("maternity paternity sabbatical") == []
+
+
+def test_numbers_must_agree():
+    index = FAQIndex([{"question": "How many leaves in 2024?", "answer": "24"}])
+    assert index.search("How many leaves in 2025?") == []
@@ -0,0 +1,70 @@
+from kb_index import KBIndex, chunk_kb, tokenize
+
+KB = """Sanathana is an analytics company founded in 2012.
+
+HR POLICIES
+Leave Policy:
+Employees get 12 casual leaves and 8 sick leaves per year.
+Unused casual leave lapses in December.
+
+Dress Code:
+Business casual from Monday to Thursday, casual on Friday.
+
+OFFICE
+Locations:
+Head office in Hyderabad, branch office in Bengaluru.
+"""
+
+
+def test_chunks_follow_headings():
+    chunks = chunk_kb(KB)
+    assert [(c["section"], c["sub_section"]) for c in chunks] == [
+        ("GENERAL", ""),
+        ("HR POLICIES", "Leave Policy"),
+        ("HR POLICIES", "Dress Code"),
+        ("OFFICE", "Locations"),
+    ]
+    assert chunks[1]["text"].startswith("HR POLICIES > Leave Policy:\n")
+
+
+def test_long_paragraphs_are_split_by_line():
+    records = "\n".join(f"EMP{n:03d}, Name: Employee {n}, Department: Engineering" for n in range(40))
+    chunks = chunk_kb("EMPLOYEES\n" + records, max_chars=300)
+    assert len(chunks) > 1
+    assert all(len(c["text"]) <= 300 + len("EMPLOYEES:\n") for c in chunks)
+    assert "EMP039" in chunks[-1]["text"]
+
+
+def test_tokenize_drops_stopwords_and_folds_plurals():
+    assert tokenize("How many leaves do I get?") == ["many", "leave", "get"]
+
+
+def test_search_ranks_the_matching_section_first():
+    index = KBIndex(KB)
+    score, chunk = index.search("how many sick leaves")[0]
+    assert chunk["sub_section"] == "Leave Policy"
+    assert score > 0
+    assert index.search("quantum chromodynamics") == []
+
+
+def test_context_always_includes_pinned_chunks():
+    index = KBIndex(KB)
+    context = index.build_context("where is the head office")
+    assert context.startswith("GENERAL:\nSanathana is an analytics company")
+    assert "Hyderabad" in context
+    assert "Dress Code" not in context
+
+
+def test_context_respects_the_token_budget():
+    index = KBIndex(KB)
+    pinned = index.pinned[0]["tokens"]
+    context = index.build_context("dress code on friday", token_budget=pinned)
+    assert "Friday" not in context                # did not fit next to the pinned overview
+    assert "Sanathana" in context
+
+
+def test_context_for_falls_back_to_the_full_kb():
+    index = KBIndex(KB)
+    assert index.context_for("quantum chromodynamics") == (KB, "full")
+    assert index.context_for("dress code", mode="full") == (KB, "full")
+    assert index.context_for("dress code")[1] == "retrieval"
@@ -0,0 +1,88 @@
+import os
+from kb_manager import KBManager
+
+KB_V1 = """Sanathana is an analytics company.
+
+HR POLICIES
+Leave Policy:
+Employees get 12 casual leaves per year.
+"""
+KB_V2 = KB_V1.replace("12 casual", "15 casual")
+
+
+def write(path, text, bump):
+    path.write_text(text, encoding="utf-8")
+    # Make sure the watcher sees a new mtime even on coarse filesystems
+    st = os.stat(path)
+    os.utime(path, (st.st_atime, st.st_mtime + bump))
+
+
+def make_manager(tmp_path):
+    path = tmp_path / "kb_content.txt"
+    write(path, KB_V1, 0)
+    kb = KBManager(str(path), reload_seconds=0)
+    kb.load()
+    seen = []
+    kb.on_change(lambda snapshot: seen.append(snapshot.version))
+    return kb, path, seen
+
+
+def test_first_load_does_not_notify(tmp_path):
+    kb, _, seen = make_manager(tmp_path)
+    assert kb.current.text == KB_V1
+    assert seen == []
+    assert kb.check() is False              # nothing moved
+
+
+def test_changed_file_swaps_the_snapshot_and_notifies(tmp_path):
+    kb, path, seen = make_manager(tmp_path)
+    old = kb.current
+    write(path, KB_V2, 10)
+    assert kb.check() is True
+    assert kb.current is not old
+    assert seen == [kb.current.version]
+    assert "15 casual" in kb.current.text
+    assert kb.current.version != old.version
+
+
+def test_touched_but_unchanged_file_keeps_the_version(tmp_path):
+    kb, path, seen = make_manager(tmp_path)
+    old = kb.current
+    write(path, KB_V1, 10)
+    assert kb.check() is False
+    assert kb.current is old
+    assert seen == []
+
+
+def test_empty_file_keeps_the_previous_version(tmp_path):
+    kb, path, seen = make_manager(tmp_path)
+    old = kb.current
+    write(path, "  \n", 10)
+    assert kb.check() is False
+    assert kb.current is old
+    assert kb.stats()["errors"] == 1
+    assert seen == []
+    write(path, KB_V2, 20)                  # fixed file is picked up again
+    assert kb.check() is True
+    assert seen == [kb.current.version]
+
+
+def test_a_failing_listener_does_not_block_the_others(tmp_path):
+    kb, path, seen = make_manager(tmp_path)
+    kb.listeners.insert(0, lambda snapshot: 1 / 0)
+    write(path, KB_V2, 10)
+    assert kb.check() is True
+    assert seen == [kb.current.version]
+
+
+def test_reload_drops_answers_built_from_the_old_version(tmp_path):
+    from response_cache import ResponseCache
+    kb, path, _ = make_manager(tmp_path)
+    cache = ResponseCache(max_entries=10, ttl_seconds=60, kb_version=kb.current.version)
+    kb.on_change(lambda snapshot: cache.set_kb_version(snapshot.version))
+    cache.set("how many casual leaves", "12 per year.")
+    cache.set("what is sanathana", "An analytics company.", pinned=True)
+    write(path, KB_V2, 10)
+    assert kb.check() is True
+    assert cache.get("how many casual leaves") is None
+    assert cache.get("what is sanathana") == "An analytics company."
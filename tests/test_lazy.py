@@ -0,0 +1,58 @@
+import threading
+import pytest
+import lazy
+from lazy import Backoff, LazyClient, ProcessThread
+
+
+def test_process_thread_starts_once_per_process(monkeypatch):
+    started = []
+    gate = threading.Event()
+
+    def target():
+        started.append(threading.current_thread().name)
+        gate.wait(5)
+
+    worker = ProcessThread("test-worker", target)
+    for _ in range(5):
+        worker.ensure()
+    assert worker.running
+    # A forked child sees a different pid and starts its own thread
+    monkeypatch.setattr(lazy.os, "getpid", lambda: -1)
+    assert not worker.running
+    worker.ensure()
+    gate.set()
+    for t in threading.enumerate():
+        if t.name == "test-worker":
+            t.join(5)
+    assert started == ["test-worker", "test-worker"]
+
+
+def test_backoff_bypasses_until_it_expires(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(lazy.time, "time", lambda: now[0])
+    backoff = Backoff("TEST", 30, "skipping")
+    assert backoff.available()
+    backoff.fail(RuntimeError("down"))
+    assert backoff.bypassed and backoff.errors == 1
+    now[0] += 29
+    assert not backoff.available()
+    now[0] += 1
+    assert backoff.available()
+
+
+def test_lazy_client_builds_once_and_retries_after_failure():
+    built = []
+
+    def factory():
+        built.append(1)
+        if len(built) == 1:
+            raise ConnectionError("not yet")
+        return {"db": "ok"}
+
+    client = LazyClient("Test", factory)
+    with pytest.raises(ConnectionError):
+        client.get()
+    assert client["db"] == "ok"
+    assert client.get() is client.get()
+    assert len(built) == 2
+    assert client.stats()["errors"] == 1
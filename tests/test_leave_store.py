@@ -0,0 +1,78 @@
+from datetime import datetime
+from bench import fakes
+from leave_store import LeaveStore, recent_worksheet_names, valid_worksheet_name
+
+TODAY = datetime.now()
+
+
+def make_store(months=6, max_sheets=3):
+    client = fakes.FakeGspreadClient(fakes.leave_sheets(["E1", "E2"], months=months), latency=0.0)
+    store = LeaveStore(lambda: client, "sheet-id", refresh_seconds=0, check_modified=False, max_sheets=max_sheets)
+    return store, client
+
+
+def test_recent_worksheet_names_cross_the_year():
+    assert recent_worksheet_names(datetime(2025, 1, 15)) == ["January 2025", "December 2024"]
+    assert recent_worksheet_names(datetime(2025, 6, 1)) == ["June 2025", "May 2025"]
+
+
+def test_valid_worksheet_name_range():
+    today = datetime(2025, 6, 1)
+    assert valid_worksheet_name("March 2025", today)
+    assert valid_worksheet_name("January 2023", today, years_back=2)
+    assert not valid_worksheet_name("January 2022", today, years_back=2)
+    assert not valid_worksheet_name("January 2026", today)
+    assert not valid_worksheet_name("Smarch 2025", today)
+
+
+def test_lookup_loads_once():
+    store, _ = make_store()
+    name = recent_worksheet_names()[0]
+    row, found = store.lookup(name, "E1")
+    assert found and row["EMP NAME"] == "Employee E1"
+    store.lookup(name, "E2")
+    assert store.stats()["loads"] == 1
+    assert store.stats()["hits"] == 1
+
+
+def test_out_of_range_names_never_reach_sheets():
+    store, _ = make_store()
+    assert store.lookup(f"January {TODAY.year - 10}", "E1") == (None, False)
+    assert store.lookup("Nonsense 2024", "E1") == (None, False)
+    assert store.stats()["loads"] == 0
+    assert store.stats()["rejected"] == 2
+
+
+def test_store_is_lru_bounded():
+    store, _ = make_store(months=6, max_sheets=3)
+    names = list(fakes.leave_sheets(["E1"], months=6))
+    for name in names[:3]:
+        store.get_sheet(name)
+    store.get_sheet(names[0])               # most recently used again
+    store.get_sheet(names[3])
+    assert store.stats()["worksheets"] == [names[2], names[0], names[3]]
+    assert store.stats()["evictions"] == 1
+
+
+def test_refresh_reloads_recent_months_and_drops_older_ones():
+    store, _ = make_store(months=4, max_sheets=10)
+    names = list(fakes.leave_sheets(["E1"], months=4))
+    for name in names:
+        store.get_sheet(name)
+    loads = store.stats()["loads"]
+    store.refresh()
+    assert store.stats()["loads"] == loads + 2
+    assert store.stats()["worksheets"] == recent_worksheet_names()
+    store.get_sheet(names[3])               # an older month comes back lazily
+    assert store.stats()["loads"] == loads + 3
+
+
+def test_first_refresh_skips_unchanged_spreadsheet():
+    client = fakes.FakeGspreadClient(fakes.leave_sheets(["E1"], months=2), latency=0.0)
+    store = LeaveStore(lambda: client, "sheet-id", refresh_seconds=0, check_modified=True)
+    store.get_sheet(recent_worksheet_names()[0])
+    store.refresh()
+    assert store.stats()["loads"] == 1
+    client.spreadsheet.lastUpdateTime = "2024-02-01T00:00:00.000Z"
+    store.refresh()
+    assert store.stats()["loads"] == 2
@@ -0,0 +1,80 @@
+import time
+import asyncio
+import pytest
+import llm_resilience
+from llm_resilience import AsyncResilientLLM, LatencyTracker, ResilientLLM
+
+
+class SlowCompletions:
+    def __init__(self, delay):
+        self.delay = delay
+
+    def create(self, timeout=None, **kwargs):
+        time.sleep(self.delay)
+        return "ok"
+
+
+class AsyncSlowCompletions(SlowCompletions):
+    async def create(self, timeout=None, **kwargs):
+        await asyncio.sleep(self.delay)
+        return "ok"
+
+
+class FakeClient:
+    def __init__(self, completions):
+        self.chat = type("Chat", (), {"completions": completions})()
+
+
+class FastHedges(LatencyTracker):
+    def hedge_delay(self):
+        return 0.01
+
+
+@pytest.fixture
+def fast_hedges():
+    return FastHedges()
+
+
+def test_hedge_is_skipped_when_all_slots_are_taken(fast_hedges):
+    llm = ResilientLLM(FakeClient(SlowCompletions(0.1)), latency=fast_hedges, hedge=True, max_hedges=1)
+    held = llm._take_hedge_slot()
+    assert llm.create(messages=[]) == "ok"
+    assert (llm.hedged, llm.hedges_skipped) == (1, 1)
+    held.release()
+    assert llm.create(messages=[]) == "ok"
+    assert llm.hedged == 2
+
+
+def test_hedge_slot_is_released_when_the_hedge_finishes(fast_hedges):
+    llm = ResilientLLM(FakeClient(SlowCompletions(0.05)), latency=fast_hedges, hedge=True, max_hedges=1)
+    for _ in range(3):
+        assert llm.create(messages=[]) == "ok"
+        time.sleep(0.1)         # the losing request finishes in the background
+    assert (llm.hedged, llm.hedges_skipped) == (3, 0)
+
+
+def test_async_hedges_share_the_cap(fast_hedges):
+    llm = AsyncResilientLLM(FakeClient(AsyncSlowCompletions(0.1)), latency=fast_hedges, hedge=True, max_hedges=1)
+    held = llm._take_hedge_slot()
+    assert asyncio.run(llm.create_async(messages=[])) == "ok"
+    assert (llm.hedged, llm.hedges_skipped, llm.attempts) == (1, 1, 1)
+    held.release()
+    assert asyncio.run(llm.create_async(messages=[])) == "ok"
+    stats = llm.stats()
+    assert (stats["hedged"], stats["attempts"]) == (2, 2)
+
+
+def test_named_wrappers_are_registered():
+    llm = ResilientLLM(FakeClient(SlowCompletions(0.0)), name="test_llm")
+    assert llm_resilience.LLM_INSTANCES["test_llm"] is llm
+    llm_resilience.LLM_INSTANCES.pop("test_llm")
+
+
+def test_async_stats_are_exported(bench_env):
+    import chatbot_async
+    from app import app
+
+    with app.test_client() as http:
+        body = http.get("/metrics").get_data(as_text=True)
+    assert "deepseek_async_attempts " in body
+    assert chatbot_async.ASYNC_LLM is llm_resilience.LLM_INSTANCES["deepseek_async"]
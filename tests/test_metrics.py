@@ -0,0 +1,53 @@
+import pytest
+import metrics
+from metrics import BACKEND_CALL_SECONDS, Histogram, backend_timer, render_prometheus
+
+
+def test_histogram_buckets_are_cumulative():
+    h = Histogram("t_seconds", "test", ["stage"], buckets=(0.1, 1.0))
+    h.observe(0.05, stage="a")
+    h.observe(0.5, stage="a")
+    h.observe(5.0, stage="a")
+    lines = h.render()
+    assert lines[:2] == ["# HELP t_seconds test", "# TYPE t_seconds histogram"]
+    assert 't_seconds_bucket{stage="a",le="0.1"} 1' in lines
+    assert 't_seconds_bucket{stage="a",le="1.0"} 2' in lines
+    assert 't_seconds_bucket{stage="a",le="+Inf"} 3' in lines
+    assert 't_seconds_sum{stage="a"} 5.550000' in lines
+    assert 't_seconds_count{stage="a"} 3' in lines
+
+
+def test_label_values_are_escaped():
+    h = Histogram("t_seconds", "test", ["source"], buckets=(1.0,))
+    h.observe(0.1, source='say "hi"\n')
+    assert 't_seconds_count{source="say \\"hi\\"\\n"} 1' in h.render()
+
+
+def test_backend_timer_records_the_outcome():
+    with backend_timer("test-backend", "ok-op"):
+        pass
+    with pytest.raises(RuntimeError):
+        with backend_timer("test-backend", "bad-op"):
+            raise RuntimeError("boom")
+    text = "\n".join(BACKEND_CALL_SECONDS.render())
+    assert 'backend_call_seconds_count{backend="test-backend",op="ok-op",outcome="ok"} 1' in text
+    assert 'backend_call_seconds_count{backend="test-backend",op="bad-op",outcome="error"} 1' in text
+
+
+def test_render_prometheus_appends_gauges(monkeypatch):
+    monkeypatch.setattr(metrics, "HISTOGRAMS", [])
+    text = render_prometheus({"b_gauge": ("Second", 2), "a_gauge": ("First", 1)})
+    assert text == ("# HELP a_gauge First\n# TYPE a_gauge gauge\na_gauge 1\n"
+                    "# HELP b_gauge Second\n# TYPE b_gauge gauge\nb_gauge 2\n")
+
+
+def test_metrics_endpoint(bench_env):
+    from app import app
+    with app.test_client() as http:
+        http.get("/health")
+        resp = http.get("/metrics")
+    assert resp.status_code == 200
+    assert resp.mimetype == "text/plain"
+    body = resp.get_data(as_text=True)
+    assert "# TYPE chat_stage_seconds histogram" in body
+    assert "# TYPE deepseek_circuit_open gauge" in body
@@ -0,0 +1,37 @@
+import pytest
+import ops_auth
+
+
+@pytest.fixture
+def http(bench_env):
+    from app import app
+    with app.test_client() as client:
+        yield client
+
+
+def test_db_stats_is_hidden_without_a_token(http, monkeypatch):
+    monkeypatch.setattr(ops_auth, "OPS_TOKEN", "")
+    assert http.get("/auth/db-stats", headers={"X-Ops-Token": ""}).status_code == 404
+
+
+def test_db_stats_rejects_a_wrong_token(http, monkeypatch):
+    monkeypatch.setattr(ops_auth, "OPS_TOKEN", "s3cret")
+    assert http.get("/auth/db-stats").status_code == 403
+    assert http.get("/auth/db-stats", headers={"X-Ops-Token": "guess"}).status_code == 403
+
+
+def test_db_stats_with_the_token(http, monkeypatch):
+    monkeypatch.setattr(ops_auth, "OPS_TOKEN", "s3cret")
+    resp = http.get("/auth/db-stats", headers={"X-Ops-Token": "s3cret"})
+    assert resp.status_code == 200
+    assert "mysql_pool" in resp.get_json()
+
+
+def test_cache_stats_needs_the_token(http, monkeypatch):
+    monkeypatch.setattr(ops_auth, "OPS_TOKEN", "")
+    assert http.get("/chatbot/cache-stats").status_code == 404
+    monkeypatch.setattr(ops_auth, "OPS_TOKEN", "s3cret")
+    assert http.get("/chatbot/cache-stats", headers={"X-Ops-Token": "guess"}).status_code == 403
+    resp = http.get("/chatbot/cache-stats", headers={"X-Ops-Token": "s3cret"})
+    assert resp.status_code == 200
+    assert "rate_limit" in resp.get_json()
@@ -0,0 +1,41 @@
+import threading
+import pytest
+import password_hasher
+from password_hasher import PasswordHasher, HasherBusy
+
+
+def test_inline_hash_and_verify():
+    hasher = PasswordHasher(workers=0, queue_limit=4, rounds=4)
+    hashed = hasher.hash_password("secret")
+    assert hasher.verify_password("secret", hashed)
+    assert not hasher.verify_password("wrong", hashed)
+    assert hasher.stats()["in_flight"] == 0
+
+
+def test_inline_hashing_is_bounded(monkeypatch):
+    release = threading.Event()
+    started = threading.Event()
+
+    def slow_check(password, hashed):
+        started.set()
+        release.wait(5)
+        return True
+
+    monkeypatch.setattr(password_hasher, "_check", slow_check)
+    hasher = PasswordHasher(workers=0, queue_limit=1, rounds=4)
+    worker = threading.Thread(target=hasher.verify_password, args=("a", "b"))
+    worker.start()
+    assert started.wait(5)
+    with pytest.raises(HasherBusy):
+        hasher.verify_password("a", "b")
+    release.set()
+    worker.join()
+    assert hasher.stats()["rejected"] == 1
+    assert hasher.verify_password("a", "b")
+
+
+def test_needs_rehash():
+    hasher = PasswordHasher(workers=0, rounds=12)
+    assert hasher.needs_rehash("$2b$10$" + "a" * 53)
+    assert not hasher.needs_rehash("$2b$12$" + "a" * 53)
+    assert not hasher.needs_rehash("plain")
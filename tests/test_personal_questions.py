@@ -0,0 +1,33 @@
+def test_leave_question_is_answered_from_the_sheet_not_the_cache(bench_env):
+    import chatbot
+    emp_id = bench_env.emp_ids[0]
+    question = "how many leaves do I have this month"
+    chatbot.RESPONSE_CACHE.set(question, "Generic leave policy answer")
+    with bench_env.app.app_context():
+        reply = chatbot.resolve_locally(question, emp_id, {})
+        assert emp_id in reply
+        assert "Generic" not in reply
+        # Without an emp_id the same wording is a generic question and is served from the cache
+        meta = {}
+        assert chatbot.resolve_locally(question, None, meta) == "Generic leave policy answer"
+        assert meta["source"] == "cache"
+
+
+def test_generic_leave_policy_answers_are_cached(bench_env):
+    import chatbot
+    with bench_env.app.app_context():
+        chatbot.remember_reply("How many casual leaves do I get?", "12 casual leaves per year")
+        meta = {}
+        assert chatbot.resolve_locally("how many casual leaves do i get", None, meta) == "12 casual leaves per year"
+        assert meta["source"] == "cache"
+
+
+def test_birthday_lookup_runs_before_the_cache(bench_env):
+    import chatbot
+    question = "any birthdays in the next 30 days"
+    chatbot.RESPONSE_CACHE.set(question, "Stale birthday list")
+    meta = {}
+    with bench_env.app.app_context():
+        reply = chatbot.resolve_locally(question, None, meta)
+    assert meta["source"] == "birthday"
+    assert reply != "Stale birthday list"
@@ -0,0 +1,58 @@
+from types import SimpleNamespace
+from kb_index import KBIndex
+from prompt_prefix import INSTRUCTIONS, PromptBuilder, PromptCacheStats
+
+KB = """Sanathana is an analytics company.
+
+HR POLICIES
+Leave Policy:
+Employees get 12 casual leaves per year.
+
+Dress Code:
+Business casual on weekdays.
+"""
+
+
+def test_system_message_is_byte_stable_across_questions():
+    builder = PromptBuilder(KBIndex(KB), "v1")
+    first = builder.build("how many casual leaves", mode="full")
+    second = builder.build("what is the dress code", mode="full")
+    assert first[0] == second[0]
+    assert first[0]["content"] == INSTRUCTIONS + "\nKnowledge Base:\n" + KB
+    assert first[1] == {"role": "user", "content": "how many casual leaves"}
+
+
+def test_retrieval_mode_puts_excerpts_after_the_prefix():
+    builder = PromptBuilder(KBIndex(KB), "v1")
+    system, user = builder.build("how many leaves per year")
+    assert system == {"role": "system", "content": INSTRUCTIONS}
+    assert user["content"].startswith("Knowledge Base:\n")
+    assert "12 casual leaves" in user["content"]
+    assert "Dress Code" not in user["content"]
+    assert user["content"].endswith("\n\nQuestion: how many leaves per year")
+
+
+def test_retrieval_without_matches_uses_the_full_prefix():
+    builder = PromptBuilder(KBIndex(KB), "v1")
+    assert builder.build("quantum chromodynamics")[0]["content"] == builder.full_system
+
+
+def test_prefix_id_follows_the_kb_text():
+    assert PromptBuilder(KBIndex(KB), "v1").prefix_id == PromptBuilder(KBIndex(KB), "v2").prefix_id
+    assert PromptBuilder(KBIndex(KB + "\nMore."), "v1").prefix_id != PromptBuilder(KBIndex(KB), "v1").prefix_id
+
+
+def test_cache_stats_read_deepseek_and_openai_usage():
+    stats = PromptCacheStats()
+    stats.record(SimpleNamespace(prompt_tokens=100, prompt_cache_hit_tokens=80, prompt_cache_miss_tokens=20))
+    stats.record(SimpleNamespace(prompt_tokens=50, prompt_tokens_details=SimpleNamespace(cached_tokens=10)))
+    stats.record(SimpleNamespace(prompt_tokens=30))
+    stats.record(None)
+    assert stats.stats() == {
+        "responses": 3,
+        "prompt_tokens": 180,
+        "cache_hit_tokens": 90,
+        "cache_miss_tokens": 90,
+        "cache_hit_ratio": 0.5,
+    }
+    assert PromptCacheStats().hit_ratio() == 0.0
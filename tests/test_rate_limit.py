@@ -0,0 +1,138 @@
+import pytest
+import rate_limit
+from rate_limit import AdmissionController, TokenBucketLimiter, client_ip
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    c = Clock()
+    monkeypatch.setattr(rate_limit.time, "monotonic", c)
+    return c
+
+
+def test_client_ip_ignores_forwarded_by_default():
+    headers = {"X-Forwarded-For": "6.6.6.6"}
+    assert client_ip(headers, "10.0.0.1") == "10.0.0.1"
+
+
+def test_client_ip_takes_the_hop_our_proxy_appended():
+    headers = {"X-Forwarded-For": "6.6.6.6, 203.0.113.7"}     # client-supplied, then our proxy's
+    assert client_ip(headers, "10.0.0.1", trust_forwarded=True, proxy_count=1) == "203.0.113.7"
+    headers = {"X-Forwarded-For": "6.6.6.6, 203.0.113.7, 10.1.1.1"}
+    assert client_ip(headers, "10.0.0.1", trust_forwarded=True, proxy_count=2) == "203.0.113.7"
+
+
+def test_client_ip_short_chain_falls_back_to_peer():
+    assert client_ip({"X-Forwarded-For": "203.0.113.7"}, "10.0.0.1", trust_forwarded=True, proxy_count=2) == "10.0.0.1"
+    assert client_ip({}, None, trust_forwarded=True) == "unknown"
+
+
+def test_bucket_refills_over_time(clock):
+    bucket = TokenBucketLimiter("t", rate=1.0, burst=2)
+    assert bucket.try_acquire("k") == 0.0
+    assert bucket.try_acquire("k") == 0.0
+    assert bucket.try_acquire("k") == pytest.approx(1.0)
+    clock.now += 1.0
+    assert bucket.try_acquire("k") == 0.0
+    assert bucket.stats()["rejected"] == 1
+
+
+def test_bucket_drops_least_recently_used_keys(clock):
+    bucket = TokenBucketLimiter("t", rate=0.0, burst=1, max_keys=2)
+    for key in ("a", "b", "c"):
+        assert bucket.try_acquire(key) == 0.0
+    assert bucket.stats()["keys"] == 2
+    assert bucket.try_acquire("a") == 0.0     # evicted, so it comes back full
+    assert bucket.try_acquire("c") > 0.0
+
+
+def test_auth_allows_many_users_behind_one_ip(clock):
+    admission = AdmissionController(enabled=True, shared=False)
+    for n in range(20):
+        assert admission.admit_auth(f"user{n}", "203.0.113.7") == 0.0
+
+
+def test_auth_limits_one_user_at_one_ip(clock):
+    admission = AdmissionController(enabled=True, shared=False)
+    waits = [admission.admit_auth("user1", "203.0.113.7") for _ in range(int(rate_limit.RATE_LIMIT_AUTH_BURST) + 1)]
+    assert all(w == 0.0 for w in waits[:-1])
+    assert waits[-1] > 0.0
+
+
+def test_auth_one_ip_cannot_lock_out_another(clock):
+    admission = AdmissionController(enabled=True, shared=False)
+    for _ in range(int(rate_limit.RATE_LIMIT_AUTH_BURST) + 1):
+        admission.admit_auth("user1", "6.6.6.6")
+    assert admission.admit_auth("user1", "203.0.113.7") == 0.0
+
+
+def test_auth_account_cap_spans_ips(clock):
+    admission = AdmissionController(enabled=True, shared=False)
+    burst = int(rate_limit.RATE_LIMIT_AUTH_ACCOUNT_BURST)
+    waits = [admission.admit_auth("user1", f"203.0.113.{n}") for n in range(burst + 1)]
+    assert all(w == 0.0 for w in waits[:-1])
+    assert waits[-1] > 0.0
+
+
+def test_rejection_refunds_earlier_buckets(clock):
+    admission = AdmissionController(enabled=True, shared=False)
+    admission.upstream = TokenBucketLimiter("global", rate=0.0, burst=1)
+    assert admission.admit_chat("1.1.1.1", "E1") == 0.0
+    for _ in range(50):
+        assert admission.admit_chat("1.1.1.1", "E1") > 0.0
+    # Rejected by the global bucket only, so E1's own tokens were all given back
+    assert admission.chat.stats()["admitted"] == 1
+    assert admission.admit_chat("1.1.1.1", "E1", cacheable=True) == 0.0
+
+
+def test_shared_counter_refunds_rejected_requests():
+    from bench.fakes import FakeMongoClient
+
+    db = FakeMongoClient()["rate_limit_refund_test"]
+    counter = rate_limit.SharedWindowCounter()
+    assert counter.check(db, "t", "k", limit=2) == 0.0
+    assert counter.check(db, "t", "k", limit=2) == 0.0
+    assert counter.check(db, "t", "k", limit=2) > 0.0
+    counter.release(db, "t", "k")
+    assert counter.check(db, "t", "k", limit=2) == 0.0
+    assert counter.rejected == 1
+
+
+def test_chat_identity_bucket_is_per_ip_and_emp(clock):
+    admission = AdmissionController(enabled=True, shared=False)
+    burst = int(rate_limit.RATE_LIMIT_CHAT_BURST)
+    for _ in range(burst):
+        assert admission.admit_chat("203.0.113.7", "E1") == 0.0
+    assert admission.admit_chat("203.0.113.7", "E1") > 0.0
+    # A colleague at the same office IP has their own bucket
+    assert admission.admit_chat("203.0.113.7", "E2") == 0.0
+
+
+def test_chat_rotating_emp_id_hits_the_ip_ceiling(clock):
+    admission = AdmissionController(enabled=True, shared=False)
+    admission.upstream = TokenBucketLimiter("global", rate=0.0, burst=10000)
+    waits = [admission.admit_chat("203.0.113.7", f"E{n}") for n in range(int(rate_limit.RATE_LIMIT_CHAT_IP_BURST) + 1)]
+    assert all(w == 0.0 for w in waits[:-1])
+    assert waits[-1] > 0.0
+
+
+def test_cached_questions_skip_the_global_bucket(clock):
+    admission = AdmissionController(enabled=True, shared=False)
+    admission.upstream = TokenBucketLimiter("global", rate=0.0, burst=1)
+    assert admission.admit_chat("1.1.1.1", "E1") == 0.0
+    assert admission.admit_chat("1.1.1.1", "E2") > 0.0
+    assert admission.admit_chat("1.1.1.1", "E2", cacheable=True) == 0.0
+
+
+def test_disabled_admits_everything():
+    admission = AdmissionController(enabled=False, shared=False)
+    assert admission.admit_chat_batch("1.1.1.1", None, cached=0, uncached=1000) == 0.0
+    assert admission.admit_auth("user", "1.1.1.1") == 0.0
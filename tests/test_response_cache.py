@@ -0,0 +1,30 @@
+from response_cache import ResponseCache, normalize_key
+
+
+def test_contractions_match_their_spelled_out_form():
+    assert normalize_key("What's the dress code?") == normalize_key("what is the dress code")
+    assert normalize_key("It's a holiday tomorrow?") == normalize_key("it is a holiday tomorrow")
+    assert normalize_key("That's the leave policy?") == normalize_key("that is the leave policy")
+    assert normalize_key("Let's see the holiday list") == normalize_key("let us see the holiday list")
+
+
+def test_contractions_keep_their_words():
+    assert normalize_key("it's") == "it"
+    assert normalize_key("that's all") == "that all"
+    assert normalize_key("let's see the holiday list") == "see holiday list"
+
+
+def test_possessive_s_is_dropped():
+    assert normalize_key("Sanathana's leave policy") == "sanathana leave policy"
+    assert normalize_key("the CEO’s name") == "ceo name"
+
+
+def test_quoted_words_starting_with_s_survive():
+    assert normalize_key("what does 'sick leave' mean") == "what sick leave mean"
+    assert normalize_key("outlet's timings") == "outlet timings"
+
+
+def test_cache_hits_across_contractions():
+    cache = ResponseCache(max_entries=10, ttl_seconds=60)
+    cache.set("what is the dress code", "Business casual.")
+    assert cache.get("What's the dress code?") == "Business casual."
@@ -0,0 +1,82 @@
+import pytest
+from bench.fakes import FakeMongoClient
+from section_tree import SectionSnapshot, SectionTree
+
+DEEP = [{"question": "deep?", "answer": "deep"}]
+DIRECT = [{"question": "direct?", "answer": "direct"}]
+
+DOCS = [
+    {"section_name": "A", "questions": [], "sub_sections": [
+        {"sub_section_name": "B", "sub_sections": [{"sub_section_name": "Shared", "questions": DEEP}]},
+    ]},
+    {"section_name": "C", "sub_sections": [
+        {"sub_section_name": "Shared", "questions": DIRECT},
+        {"sub_section_name": "A", "questions": DIRECT},
+    ]},
+    {"section_name": "D", "questions": DIRECT},
+]
+
+
+def test_top_level_sections_win_over_sub_sections():
+    snapshot = SectionSnapshot(DOCS)
+    assert snapshot.section_names == ["A", "C", "D"]
+    assert snapshot.lookup("A") == {"sub_sections": ["B"]}
+    assert snapshot.lookup("D") == {"questions": DIRECT}
+
+
+def test_direct_sub_sections_win_over_deeper_ones():
+    snapshot = SectionSnapshot(DOCS)
+    assert snapshot.lookup("Shared") == {"sub_sections": [], "questions": DIRECT}
+    assert snapshot.lookup("B") == {"sub_sections": ["Shared"], "questions": []}
+    assert snapshot.lookup("missing") is None
+
+
+def test_version_follows_content_not_key_order():
+    reordered = [{k: d[k] for k in reversed(list(d))} for d in DOCS]
+    assert SectionSnapshot(reordered).version == SectionSnapshot(DOCS).version
+    changed = DOCS[:-1] + [{"section_name": "D", "questions": DEEP}]
+    assert SectionSnapshot(changed).version != SectionSnapshot(DOCS).version
+
+
+def test_listeners_run_only_when_the_version_changes():
+    db = FakeMongoClient()["section_tree_test"]
+    db["sections"].insert_many([dict(d) for d in DOCS])
+    tree = SectionTree()
+    seen = []
+    tree.on_change(lambda snapshot: seen.append(snapshot.version))
+    first = tree.reload(db)
+    tree.reload(db)
+    assert seen == [first.version]
+    db["sections"].insert_many([{"section_name": "E", "questions": DIRECT}])
+    assert tree.reload(db).section_names[-1] == "E"
+    assert len(seen) == 2
+
+
+@pytest.fixture
+def http(bench_env):
+    from app import app
+    with app.test_client() as client:
+        yield client
+
+
+def test_sections_answer_304_for_the_current_etag(http):
+    first = http.get("/chatbot/sections")
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    again = http.get("/chatbot/sections", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.data == b""
+    stale = http.get("/chatbot/sections", headers={"If-None-Match": '"stale"'})
+    assert stale.status_code == 200
+    assert stale.get_json() == first.get_json()
+
+
+def test_section_questions_share_the_tree_etag(http):
+    sections = http.get("/chatbot/sections")
+    payroll = http.get("/chatbot/section-questions?section=Payroll")
+    assert payroll.status_code == 200
+    assert payroll.headers["ETag"] == sections.headers["ETag"]
+    assert payroll.get_json()["questions"][0]["question"] == "When is salary credited?"
+    cached = http.get("/chatbot/section-questions?section=Payroll", headers={"If-None-Match": payroll.headers["ETag"]})
+    assert cached.status_code == 304
+    assert http.get("/chatbot/section-questions?section=Nope").status_code == 404
@@ -0,0 +1,70 @@
+import os
+import pytest
+from semantic_cache import SemanticCache, _guard_terms
+from response_cache import normalize_key
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="module")
+def kb_idf():
+    cache = SemanticCache()
+    with open(os.path.join(ROOT, "kb_content.txt"), encoding="utf-8") as f:
+        cache.fit_idf(f.read().splitlines())
+    return cache.idf
+
+
+@pytest.fixture
+def cache(kb_idf):
+    c = SemanticCache(max_entries=16)
+    c.idf = kb_idf
+    return c
+
+
+@pytest.mark.parametrize("cached, asked", [
+    ("how many casual leaves do I get", "How many casual leave do i get?"),
+    ("what is the dress code", "What's the dress code?"),
+])
+def test_rephrasings_hit(cache, cached, asked):
+    cache.add(cached, "answer")
+    hit = cache.lookup(asked)
+    assert hit is not None
+    assert hit["question"] == cached
+
+
+@pytest.mark.parametrize("cached, asked", [
+    ("is work from home allowed", "is work from home not allowed"),
+    ("who is eligible for paternity leave", "who is not eligible for paternity leave"),
+    ("is work from home allowed", "isn't work from home allowed?"),
+    ("can I carry forward leave", "can I carry forward leave without approval"),
+])
+def test_negation_misses(cache, cached, asked):
+    cache.add(cached, "answer")
+    assert cache.lookup(asked) is None
+
+
+@pytest.mark.parametrize("cached, asked", [
+    ("train travel class for management", "train travel class for middle management"),
+    ("hotel accommodation for senior management", "hotel accommodation for junior management"),
+])
+def test_extra_or_changed_modifier_misses(cache, cached, asked):
+    cache.add(cached, "answer")
+    assert cache.lookup(asked) is None
+
+
+def test_numbers_and_months_must_agree(cache):
+    cache.add("what is the leave policy for 2024", "answer")
+    cache.add("holidays in march", "answer")
+    assert cache.lookup("what is the leave policy for 2025") is None
+    assert cache.lookup("holidays in april") is None
+
+
+def test_guard_terms_include_negations():
+    assert _guard_terms(normalize_key("who is not eligible")) == {"not"}
+    assert _guard_terms(normalize_key("don't I get leave in May 2024")) == {"not", "may", "2024"}
+
+
+def test_kb_version_change_clears(cache):
+    cache.add("what is the dress code", "answer")
+    cache.set_kb_version("v2")
+    assert cache.lookup("what is the dress code") is None
@@ -0,0 +1,101 @@
+import time
+import asyncio
+import threading
+import pytest
+from singleflight import SingleFlight, AsyncSingleFlight
+
+
+def run_concurrently(n, fn):
+    results = [None] * n
+    errors = [None] * n
+
+    def _run(i):
+        try:
+            results[i] = fn()
+        except Exception as e:
+            errors[i] = e
+    threads = [threading.Thread(target=_run, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+    return results, errors
+
+
+def test_concurrent_calls_share_one_execution():
+    flights = SingleFlight("test")
+    calls = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.2)
+        return "answer"
+
+    results, errors = run_concurrently(8, lambda: flights.do("k", slow))
+    assert len(calls) == 1
+    assert [r[0] for r in results] == ["answer"] * 8
+    assert sorted(r[1] for r in results) == [False] + [True] * 7
+    assert flights.stats()["coalesced"] == 7
+    assert flights.stats()["in_flight"] == 0
+
+
+def test_errors_reach_every_waiter():
+    flights = SingleFlight("test")
+
+    def failing():
+        time.sleep(0.2)
+        raise ValueError("upstream down")
+
+    _, errors = run_concurrently(4, lambda: flights.do("k", failing))
+    assert all(isinstance(e, ValueError) for e in errors)
+    assert flights.stats()["errors"] == 1
+
+
+def test_different_keys_and_sequential_calls_do_not_share():
+    flights = SingleFlight("test")
+    assert flights.do("a", lambda: 1) == (1, False)
+    assert flights.do("a", lambda: 2) == (2, False)
+    assert flights.do("b", lambda: 3) == (3, False)
+
+
+def test_waiter_timeout():
+    flights = SingleFlight("test")
+    started = threading.Event()
+    release = threading.Event()
+
+    def leader():
+        started.set()
+        release.wait(5)
+        return "late"
+
+    t = threading.Thread(target=flights.do, args=("k", leader))
+    t.start()
+    assert started.wait(5)
+    with pytest.raises(TimeoutError):
+        flights.do("k", lambda: "never", timeout=0.05)
+    release.set()
+    t.join(5)
+    assert flights.stats()["timeouts"] == 1
+
+
+def test_async_calls_share_one_task_and_survive_leader_cancel():
+    flights = AsyncSingleFlight("test")
+    calls = []
+
+    async def slow():
+        calls.append(1)
+        await asyncio.sleep(0.1)
+        return "answer"
+
+    async def main():
+        leader = asyncio.ensure_future(flights.do("k", slow))
+        await asyncio.sleep(0)
+        waiters = [asyncio.ensure_future(flights.do("k", slow)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return await asyncio.gather(*waiters)
+
+    results = asyncio.run(main())
+    assert len(calls) == 1
+    assert results == [("answer", True)] * 3
+    assert flights.stats()["in_flight"] == 0
@@ -0,0 +1,89 @@
+import gzip
+import pytest
+import static_assets
+from static_assets import (
+    IMMUTABLE_CACHE_CONTROL, REVALIDATE_CACHE_CONTROL, StaticAsset, StaticAssets,
+    accepted_encodings, cache_control_for, etag_matches,
+)
+
+SCRIPT = b"function hello() { return 'hello world'; }\n" * 100
+
+
+def test_accepted_encodings_reads_q_values():
+    assert accepted_encodings("gzip, deflate, br;q=0.5") == {"gzip": 1.0, "deflate": 1.0, "br": 0.5}
+    assert accepted_encodings("br;q=oops") == {"br": 0.0}
+    assert accepted_encodings(None) == {}
+
+
+def test_hashed_files_are_immutable():
+    assert cache_control_for("static/js/main.3f2a1b9c.js") == IMMUTABLE_CACHE_CONTROL
+    assert cache_control_for("static/js/787.1a2b3c4d.chunk.js") == IMMUTABLE_CACHE_CONTROL
+    assert cache_control_for("index.html") == REVALIDATE_CACHE_CONTROL
+    assert cache_control_for("manifest.json") == REVALIDATE_CACHE_CONTROL
+
+
+def test_gzip_variant_is_selected_when_accepted(monkeypatch):
+    monkeypatch.setattr(static_assets, "brotli", None)
+    asset = StaticAsset("static/js/main.3f2a1b9c.js", SCRIPT)
+    body, encoding, etag = asset.select("gzip, deflate")
+    assert encoding == "gzip"
+    assert gzip.decompress(body) == SCRIPT
+    assert etag.endswith("-gz")
+    body, encoding, plain_etag = asset.select("gzip;q=0")
+    assert (body, encoding) == (SCRIPT, None)
+    assert plain_etag != etag
+    assert asset.mimetype.endswith("javascript; charset=utf-8")
+
+
+def test_brotli_is_preferred_when_available():
+    if static_assets.brotli is None:
+        pytest.skip("brotli is not installed")
+    asset = StaticAsset("static/js/main.3f2a1b9c.js", SCRIPT)
+    assert asset.select("gzip, br")[1] == "br"
+    assert asset.select("gzip, br;q=0")[1] == "gzip"
+    assert asset.select("*")[1] == "br"
+
+
+def test_small_and_binary_files_are_not_compressed():
+    assert list(StaticAsset("favicon.svg", b"<svg/>").variants) == [None]
+    assert list(StaticAsset("logo.png", SCRIPT).variants) == [None]
+
+
+def test_etag_matches_weak_quoted_and_wildcard():
+    assert etag_matches('"abc"', "abc")
+    assert etag_matches('W/"abc", "def"', "abc")
+    assert etag_matches("*", "abc")
+    assert not etag_matches('"abc-gz"', "abc")
+    assert not etag_matches(None, "abc")
+
+
+def test_build_is_loaded_into_memory(tmp_path, monkeypatch):
+    monkeypatch.setattr(static_assets, "STATIC_MAX_FILE_BYTES", 2048)
+    (tmp_path / "static" / "js").mkdir(parents=True)
+    (tmp_path / "index.html").write_bytes(b"<html></html>")
+    (tmp_path / "static" / "js" / "main.3f2a1b9c.js").write_bytes(SCRIPT[:2000])
+    (tmp_path / "static" / "js" / "big.0123abcd.js").write_bytes(SCRIPT)
+    assets = StaticAssets(str(tmp_path))
+    assets.load()
+    assert sorted(assets.assets) == ["index.html", "static/js/main.3f2a1b9c.js"]
+    assert assets.stats()["on_disk"] == 1
+    assert assets.get("index.html").cache_control == REVALIDATE_CACHE_CONTROL
+    assert assets.get("missing.js") is None
+
+
+def test_app_serves_variants_with_etag_and_304(bench_env, monkeypatch):
+    import app as app_module
+    monkeypatch.setattr(static_assets, "brotli", None)
+    path = "static/js/main.3f2a1b9c.js"
+    monkeypatch.setitem(app_module.STATIC.assets, path, StaticAsset(path, SCRIPT))
+    with app_module.app.test_client() as http:
+        resp = http.get(f"/{path}", headers={"Accept-Encoding": "gzip"})
+        assert resp.status_code == 200
+        assert resp.headers["Content-Encoding"] == "gzip"
+        assert resp.headers["Cache-Control"] == IMMUTABLE_CACHE_CONTROL
+        assert resp.headers["Vary"] == "Accept-Encoding"
+        etag = resp.headers["ETag"]
+        again = http.get(f"/{path}", headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+        assert again.status_code == 304
+        # The identity body has its own ETag, so the gzip one does not validate it
+        assert http.get(f"/{path}", headers={"If-None-Match": etag}).status_code == 200